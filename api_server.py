@@ -4,27 +4,296 @@ Servidor FastAPI para Documentação de Workflows N8N - GG.AI Labs
 API de alta performance com respostas abaixo de 100ms.
 """
 
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, field_validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 import json
+import mimetypes
 import os
 import asyncio
+import time
+from functools import wraps
 from pathlib import Path
-import uvicorn
 
-from workflow_db import WorkflowDatabase
+from workflow_db import WorkflowDatabase, query_deadline
+from workflow_shards import open_workflow_database, shard_count_from_env
+from index_jobs import ReindexJobManager
+from index_snapshots import SnapshotFollower, latest_version
+from workflow_metrics import (
+    file_read_bytes, http_request_duration, http_requests, query_cancellations, render_metrics, timed_read
+)
+from workflow_tracing import finish_trace, server_timing, span, start_trace
+from workflow_profiling import profile_authorized, profiled_call, profiling_request, save_profile
+from urllib.parse import parse_qs, quote
+from starlette.datastructures import Headers
+from workflow_compression import compress_variants, content_etag, decompress_identity, negotiate_encoding
+
+class TracedRoute(APIRoute):
+    """Rota com spans 'route' (validação, handler e serialização) e 'handler' (só o endpoint).
+    
+    O handler também é o trecho medido pelo cProfile em requisições com ?profile=1.
+    """
+    
+    def get_route_handler(self):
+        call = self.dependant.call
+        if not getattr(call, '__traced__', False):
+            if asyncio.iscoroutinefunction(call):
+                @wraps(call)
+                async def traced_call(*args, **kwargs):
+                    with span('handler'), profiled_call():
+                        return await call(*args, **kwargs)
+            else:
+                @wraps(call)
+                def traced_call(*args, **kwargs):
+                    with span('handler'), profiled_call():
+                        return call(*args, **kwargs)
+            traced_call.__traced__ = True
+            self.dependant.call = traced_call
+        handler = super().get_route_handler()
+        
+        async def traced_handler(request):
+            with span('route'):
+                return await handler(request)
+        return traced_handler
 
 app = FastAPI(
     title="GG.AI Labs - API de Documentação de Workflows N8N",
     description="API rápida para navegação e busca de documentação de workflows",
     version="2.0.0"
 )
+app.router.route_class = TracedRoute
+
+# Orçamento (segundos) das consultas SQLite por prefixo de rota; vale o prefixo mais longo
+QUERY_BUDGETS = {
+    '/api/': 5.0,
+    '/api/stats': 2.0,
+    '/api/workflows': 2.0,
+    '/api/workflows/category/': 2.0,
+    '/api/duplicates': 3.0,
+    '/api/credential-coverage': 3.0,
+    '/api/pattern-search': 5.0,
+}
+# Rotas sem consultas de busca (jobs e snapshots)
+QUERY_BUDGET_EXEMPT = ('/api/reindex', '/api/snapshot')
+
+def query_budget_for(path: str) -> Optional[Any]:
+    """(prefixo, orçamento) aplicável ao caminho, ou None quando não há limite."""
+    if path.startswith(QUERY_BUDGET_EXEMPT):
+        return None
+    matches = [prefix for prefix in QUERY_BUDGETS if path.startswith(prefix)]
+    if not matches:
+        return None
+    prefix = max(matches, key=len)
+    return prefix, QUERY_BUDGETS[prefix]
+
+class QueryDeadlineMiddleware:
+    """Aplica prazos às consultas SQLite de cada requisição.
+    
+    As consultas passam a rodar sob query_deadline: o progress handler do
+    SQLite aborta a instrução que excede o orçamento da rota e a desconexão do
+    cliente interrompe as consultas em andamento. A resposta é substituída por
+    um 503 (orçamento do servidor) ou 408 (prazo pedido pelo cliente em
+    X-Request-Deadline-Ms) com o que já havia sido calculado.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        match = query_budget_for(scope['path']) if scope['type'] == 'http' else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+        route, budget = match
+        expiry_reason = 'deadline'
+        headers = dict(scope.get('headers') or [])
+        try:
+            requested = float(headers.get(b'x-request-deadline-ms', b'')) / 1000
+            if 0 < requested < budget:
+                budget, expiry_reason = requested, 'client_deadline'
+        except ValueError:
+            pass
+        
+        with query_deadline(budget, expiry_reason) as deadline:
+            messages: asyncio.Queue = asyncio.Queue()
+            state = {'complete': False, 'replaced': False}
+            
+            async def watch_disconnect():
+                while True:
+                    message = await receive()
+                    await messages.put(message)
+                    if message['type'] == 'http.disconnect':
+                        if not state['complete']:
+                            deadline.cancel('client_disconnected')
+                        return
+            
+            async def send_or_replace(message):
+                if message['type'] == 'http.response.start' and deadline.reason:
+                    state['replaced'] = True
+                    await self._send_cancelled(send, route, deadline)
+                    return
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    state['complete'] = True
+                if not state['replaced']:
+                    await send(message)
+            
+            watcher = asyncio.create_task(watch_disconnect())
+            try:
+                await self.app(scope, messages.get, send_or_replace)
+            finally:
+                watcher.cancel()
+    
+    @staticmethod
+    async def _send_cancelled(send, route: str, deadline):
+        query_cancellations.inc(route, deadline.reason)
+        timed_out = deadline.reason in ('deadline', 'client_deadline')
+        status = 503 if deadline.reason == 'deadline' else 408
+        payload = {
+            "detail": (f"Consulta excedeu o tempo limite de {deadline.budget * 1000:.0f} ms" if timed_out
+                       else "Consulta cancelada: o cliente encerrou a conexão"),
+            "error": "query_timeout" if timed_out else "query_cancelled",
+            "reason": deadline.reason,
+            "budget_ms": round(deadline.budget * 1000),
+            "elapsed_ms": round(deadline.elapsed * 1000),
+            "partial": deadline.partial,
+        }
+        body = json.dumps(payload).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        if status == 503:
+            headers.append((b'retry-after', b'1'))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+class RequestMetricsMiddleware:
+    """Registra latência e status de cada requisição por rota (modelo do caminho).
+    
+    O rótulo é o caminho declarado da rota (ex.: /api/workflows/{filename}),
+    definido pelo roteador no escopo, para manter a cardinalidade fixa.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, scope['method'], route)
+            http_requests.inc(scope['method'], route, status[0])
 
+class TracingMiddleware:
+    """Abre o trace da requisição e devolve as etapas no cabeçalho Server-Timing.
+    
+    Os spans vão para o arquivo de traces (WORKFLOW_TRACE_FILE) conforme a
+    amostragem; veja workflow_tracing.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get('headers') or [])
+        trace = start_trace(headers.get(b'traceparent', b'').decode('latin-1'))
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+        
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                timing = server_timing(trace)
+                if timing:
+                    message = dict(message, headers=list(message.get('headers', [])) + [
+                        (b'server-timing', timing.encode('latin-1'))
+                    ])
+            await send(message)
+        
+        try:
+            with span('request'):
+                await self.app(scope, receive, send_with_timing)
+        finally:
+            # Raiz nomeada pelo modelo da rota, conhecido só depois do roteamento
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            _, span_id, parent_id, start_us, duration, _ = trace.spans[-1]
+            trace.spans[-1] = (f"{scope['method']} {route}", span_id, parent_id, start_us, duration, {
+                'http.method': scope['method'],
+                'http.path': scope['path'],
+                'http.route': route,
+                'http.status_code': status[0],
+            })
+            finish_trace(trace)
+
+class ProfilingMiddleware:
+    """Perfil cProfile de uma requisição com ?profile=1 e o cabeçalho X-Admin-Token.
+    
+    Responde com o relatório em texto (funções por tempo acumulado) no lugar do
+    corpo original; o arquivo .prof fica em WORKFLOW_PROFILE_DIR e o status
+    original vai em X-Profiled-Status. Sem WORKFLOW_ADMIN_TOKEN o recurso fica
+    desativado.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or b'profile=' not in scope.get('query_string', b''):
+            await self.app(scope, receive, send)
+            return
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        if query.get('profile', [''])[0] not in ('1', 'true'):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get('headers') or [])
+        if not profile_authorized(headers.get(b'x-admin-token', b'').decode('latin-1')):
+            await self._send_text(send, 403, "Perfil requer um token de administrador válido\n")
+            return
+        with profiling_request() as profile:
+            if profile is None:
+                await self._send_text(send, 409, "Outro perfil já está em andamento\n")
+                return
+            status = [500]
+            
+            async def discard_body(message):
+                if message['type'] == 'http.response.start':
+                    status[0] = message['status']
+            
+            await self.app(scope, receive, discard_body)
+        path, report = await asyncio.to_thread(save_profile, profile, f"{scope['method']}-{scope['path']}")
+        await self._send_text(send, 200, report, [
+            (b'x-profile-file', path.encode('utf-8')),
+            (b'x-profiled-status', str(status[0]).encode()),
+        ])
+    
+    @staticmethod
+    async def _send_text(send, status: int, text: str, extra_headers=None):
+        body = text.encode('utf-8')
+        headers = [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers + (extra_headers or [])})
+        await send({'type': 'http.response.body', 'body': body})
+
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryDeadlineMiddleware)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 app.add_middleware(
     CORSMiddleware,
@@ -33,21 +302,94 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
+# Abertos no startup, não no import: importar o módulo não toca o banco
+db = None
+reindex_jobs = None
+
+# Nós que seguem snapshots publicados (workflow_db.py --publish) nunca indexam localmente
+SNAPSHOT_DIR = os.environ.get('WORKFLOW_SNAPSHOT_DIR')
+snapshot_follower = None
 
-db = WorkflowDatabase()
+# Estado da inicialização, informado por /ready
+startup_state = {"status": "starting", "index_job": None, "error": None}
+
+def open_services():
+    """Abre o banco (sem DDL quando a versão do esquema confere), os jobs e o seguidor de snapshots."""
+    global db, reindex_jobs, snapshot_follower
+    if SNAPSHOT_DIR and shard_count_from_env() > 1:
+        # Snapshots são arquivos de banco únicos; o índice particionado não os instala
+        raise RuntimeError("WORKFLOW_SNAPSHOT_DIR não pode ser usado com WORKFLOW_DB_SHARDS > 1")
+    db = open_workflow_database()
+    reindex_jobs = ReindexJobManager(db.db_path, db.workflows_dir)
+    if SNAPSHOT_DIR:
+        snapshot_follower = SnapshotFollower(
+            db, SNAPSHOT_DIR, interval=float(os.environ.get('WORKFLOW_SNAPSHOT_INTERVAL', '30'))
+        )
+
+async def install_snapshot():
+    """Instala o snapshot mais recente em segundo plano e passa a acompanhar os novos."""
+    try:
+        await asyncio.to_thread(snapshot_follower.sync)
+    except Exception as e:
+        print(f"❌ Falha ao instalar snapshot de {SNAPSHOT_DIR}: {e}")
+    snapshot_follower.start()
+    startup_state["status"] = "ready" if await asyncio.to_thread(db.has_workflows) else "empty"
 
 @app.on_event("startup")
 async def startup_event():
-    """Verifica a conectividade com o banco de dados ao iniciar."""
+    """Abre o banco sem atrasar o bind da porta; um banco vazio é indexado em segundo plano.
+    
+    O uvicorn só escuta na porta depois deste evento, então nada aqui percorre
+    o banco: a indexação inicial roda como job de reindexação (outro processo)
+    e a instalação de snapshots numa tarefa. /ready informa o andamento.
+    """
     try:
-        stats = db.get_stats()
-        if stats['total'] == 0:
-            print("⚠️  Aviso: Nenhum workflow encontrado no banco. Execute o indexador primeiro.")
-        else:
-            print(f"✅ Banco de dados conectado: {stats['total']} workflows indexados")
+        await asyncio.to_thread(open_services)
     except Exception as e:
-        print(f"❌ Falha ao conectar no banco de dados: {e}")
+        print(f"❌ Falha ao abrir o banco de dados: {e}")
         raise
+    if static_files:
+        # Até terminar, os arquivos estáticos são servidos (e comprimidos) como antes
+        app.state.static_task = asyncio.create_task(asyncio.to_thread(static_files.precompress))
+    if snapshot_follower:
+        startup_state["status"] = "syncing_snapshot"
+        app.state.snapshot_task = asyncio.create_task(install_snapshot())  # referência mantida até terminar
+    elif not await asyncio.to_thread(db.has_workflows):
+        print("🔄 Banco vazio. Indexando workflows em segundo plano (acompanhe em /ready)...")
+        job = await asyncio.to_thread(reindex_jobs.submit)
+        startup_state.update(status="indexing", index_job=job["job_id"])
+    else:
+        print(f"✅ Banco de dados conectado: {db.db_path}")
+        startup_state["status"] = "ready"
+
+def precompressed_response(variants: Dict[str, Any], request_headers: Headers, media_type: str,
+                           etag: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve a variante pré-comprimida que o cliente aceita (Accept-Encoding).
+
+    O GZipMiddleware não recomprime respostas com Content-Encoding; clientes
+    sem gzip nem brotli recebem o conteúdo descomprimido do gzip guardado.
+    """
+    encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), variants)
+    response_headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if etag:
+        # Um ETag por representação: as variantes não são intercambiáveis byte a byte
+        response_headers["ETag"] = f'{etag[:-1]}-{encoding}"' if encoding else etag
+        if request_headers.get("if-none-match") == response_headers["ETag"]:
+            return Response(status_code=304, headers=response_headers)
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+        content = variants[encoding]
+    else:
+        content = decompress_identity(variants)
+    return Response(content=content, media_type=media_type, headers=response_headers)
+
+class NodeMatch(BaseModel):
+    node_name: str
+    node_type: str
+    snippet: str
 
 class WorkflowSummary(BaseModel):
     id: Optional[int] = None
@@ -56,17 +398,25 @@ class WorkflowSummary(BaseModel):
     active: bool
     description: str = ""
     trigger_type: str = "Manual"
-    complexity: str = "low"
+    complexity: str = "baixa"
     node_count: int = 0
     integrations: List[str] = []
     tags: List[str] = []
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    duplicate_count: int = 0
+    graph_depth: int = 0
+    max_fan_out: int = 0
+    branch_count: int = 0
+    has_cycle: bool = False
+    disconnected_nodes: int = 0
+    entry_points: int = 0
+    matches: Optional[List[NodeMatch]] = None
 
     class Config:
         validate_assignment = True
 
-    @field_validator('active', mode='before')
+    @field_validator('active', 'has_cycle', mode='before')
     @classmethod
     def convert_active(cls, v):
         if isinstance(v, int):
@@ -82,6 +432,120 @@ class SearchResponse(BaseModel):
     query: str
     filters: Dict[str, Any]
 
+class WorkflowFields(BaseModel):
+    """Item de uma listagem com fields=: id e apenas os campos pedidos."""
+    id: int
+    filename: Optional[str] = None
+    name: Optional[str] = None
+    active: Optional[bool] = None
+    description: Optional[str] = None
+    trigger_type: Optional[str] = None
+    complexity: Optional[str] = None
+    node_count: Optional[int] = None
+    integrations: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    duplicate_count: Optional[int] = None
+    graph_depth: Optional[int] = None
+    max_fan_out: Optional[int] = None
+    branch_count: Optional[int] = None
+    has_cycle: Optional[bool] = None
+    disconnected_nodes: Optional[int] = None
+    entry_points: Optional[int] = None
+    matches: Optional[List[NodeMatch]] = None
+
+class ProjectedSearchResponse(BaseModel):
+    """Listagem com fields= (format=objects)."""
+    workflows: List[WorkflowFields]
+    total: int
+    page: int
+    per_page: int
+    pages: int
+    query: str
+    filters: Dict[str, Any]
+
+class ColumnarSearchResponse(BaseModel):
+    """Listagem com format=columnar: em columns, id e cada campo pedido (todos sem
+    fields=) mapeados para um array de valores na ordem dos resultados."""
+    columns: Dict[str, List[Any]]
+    total: int
+    page: int
+    per_page: int
+    pages: int
+    query: str
+    filters: Dict[str, Any]
+
+# Formatos possíveis das listagens com fields= e format= (documentação do OpenAPI)
+WorkflowListResponse = Union[SearchResponse, ProjectedSearchResponse, ColumnarSearchResponse]
+
+# Campos aceitos em fields= nas listagens; id é sempre incluído
+SUMMARY_FIELDS = WorkflowDatabase.SUMMARY_COLUMNS + ('matches',)
+
+def parse_fields(fields: Optional[str], columnar: bool) -> Optional[List[str]]:
+    """Valida fields=; None quando a listagem completa (pré-serializada) atende."""
+    if not fields:
+        return list(SUMMARY_FIELDS) if columnar else None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown = [field for field in requested if field not in SUMMARY_FIELDS and field != 'id']
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(unknown)}")
+    return [field for field in requested if field != 'id']
+
+def search_envelope(total: int, page: int, per_page: int, query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": (total + per_page - 1) // per_page,
+        "query": query,
+        "filters": filters,
+    }
+
+def projected_search_response(workflows: List[Dict[str, Any]], fields: List[str], columnar: bool,
+                              total: int, page: int, per_page: int,
+                              query: str, filters: Dict[str, Any]) -> Response:
+    """Monta uma listagem apenas com id e os campos pedidos em fields=.
+
+    Com columnar=True os resultados vêm em "columns", um array por campo na
+    ordem dos resultados, em vez de repetir as chaves em cada item.
+    """
+    columns = [field for field in fields if field != 'matches']
+    with span('json.assemble', rows=len(workflows)):
+        items = []
+        for workflow in workflows:
+            item = {'id': workflow['id'], **WorkflowDatabase.summary_fields(workflow, columns)}
+            if 'matches' in fields:
+                item['matches'] = workflow.get('matches')
+            items.append(item)
+        if columnar:
+            results = {"columns": {field: [item[field] for item in items] for field in ['id'] + fields}}
+        else:
+            results = {"workflows": items}
+        body = json.dumps({**results, **search_envelope(total, page, per_page, query, filters)},
+                          ensure_ascii=False, separators=(",", ":"))
+    return Response(content=body.encode('utf-8'), media_type="application/json")
+
+def serialized_search_response(workflows: List[Dict[str, Any]], total: int, page: int, per_page: int,
+                               query: str, filters: Dict[str, Any]) -> Response:
+    """Monta um SearchResponse em JSON sem construir modelos Pydantic.
+
+    Cada workflow traz o seu item já serializado em 'summary' (buscas com
+    serialized=True); o response_model das rotas serve apenas para documentar
+    o schema no OpenAPI.
+    """
+    with span('json.assemble', rows=len(workflows)):
+        items = [
+            workflow['summary'][:-1] + ',"matches":' + (
+                'null' if workflow.get('matches') is None
+                else json.dumps(workflow['matches'], ensure_ascii=False, separators=(",", ":"))) + '}'
+            for workflow in workflows
+        ]
+        envelope = json.dumps(search_envelope(total, page, per_page, query, filters),
+                              ensure_ascii=False, separators=(",", ":"))
+        body = '{"workflows":[' + ','.join(items) + '],' + envelope[1:]
+    return Response(content=body.encode('utf-8'), media_type="application/json")
+
 class StatsResponse(BaseModel):
     total: int
     active: int
@@ -93,8 +557,11 @@ class StatsResponse(BaseModel):
     last_indexed: str
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Exibe a página principal de documentação."""
+    variants = static_files.variants.get("index.html") if static_files else None
+    if variants:
+        return precompressed_response(variants, request.headers, variants["media_type"], etag=variants["etag"])
     static_dir = Path("static")
     index_file = static_dir / "index.html"
     if not index_file.exists():
@@ -110,7 +577,41 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Endpoint de saúde."""
-    return {"status": "ok", "version": "2.0.0", "mensagem": "API de Workflows N8N rodando"}
+    return {
+        "status": "ok",
+        "version": "2.0.0",
+        "mensagem": "API de Workflows N8N rodando",
+        "query_cancellations": [
+            {"route": route, "reason": reason, "count": int(count)}
+            for (route, reason), count in query_cancellations.items()
+        ],
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Prontidão: 200 com o índice disponível, 503 durante a abertura do banco, o snapshot ou a indexação inicial.
+    
+    /health só diz que o processo responde; balanceadores devem usar /ready.
+    """
+    if startup_state["status"] == "indexing":
+        job = reindex_jobs.get(startup_state["index_job"]) or {}
+        if job.get("status") == "completed":
+            startup_state["status"] = "ready"
+        elif job.get("status") not in ("queued", "running"):
+            startup_state.update(status="index_failed", error=job.get("error"))
+    elif startup_state["status"] == "empty" and await asyncio.to_thread(db.has_workflows):
+        startup_state["status"] = "ready"  # snapshot publicado depois do startup
+    if startup_state["status"] == "ready":
+        return {"status": "ready"}
+    content = {"status": startup_state["status"], "error": startup_state["error"]}
+    if startup_state["index_job"]:
+        content["job"] = reindex_jobs.get(startup_state["index_job"])
+    return JSONResponse(status_code=503, content=content, headers={"Retry-After": "5"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Métricas no formato de exposição de texto do Prometheus (deste processo)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api/version")
 async def get_version():
@@ -118,7 +619,7 @@ async def get_version():
     return {"version": "2.0.0"}
 
 @app.get("/api/stats", response_model=StatsResponse)
-async def get_stats():
+def get_stats():
     """Obtém estatísticas do banco de dados de workflows."""
     try:
         stats = db.get_stats()
@@ -126,70 +627,165 @@ async def get_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar estatísticas: {str(e)}")
 
-@app.get("/api/workflows", response_model=SearchResponse)
-async def search_workflows(
+@app.get("/api/workflows", response_model=WorkflowListResponse)
+def search_workflows(
     q: str = Query("", description="Consulta de busca"),
+    scope: str = Query("metadata", pattern="^(metadata|content)$", description="metadata: nome, descrição, integrações e tags; content: código, prompts e demais parâmetros dos nós"),
     trigger: str = Query("all", description="Filtrar por tipo de disparo"),
     complexity: str = Query("all", description="Filtrar por complexidade"),
     active_only: bool = Query(False, description="Apenas workflows ativos"),
+    collapse_duplicates: bool = Query(False, description="Oculta cópias duplicadas, mantendo apenas o workflow canônico"),
+    sort: str = Query("", description="Ordenação: recent, name, nodes, depth, fan_out, branches"),
+    min_depth: Optional[int] = Query(None, ge=0, description="Profundidade mínima do grafo"),
+    max_depth: Optional[int] = Query(None, ge=0, description="Profundidade máxima do grafo"),
+    min_fan_out: Optional[int] = Query(None, ge=0, description="Fan-out mínimo"),
+    max_fan_out: Optional[int] = Query(None, ge=0, description="Fan-out máximo"),
+    min_branches: Optional[int] = Query(None, ge=0, description="Número mínimo de ramificações"),
+    max_branches: Optional[int] = Query(None, ge=0, description="Número máximo de ramificações"),
+    has_cycle: Optional[bool] = Query(None, description="Apenas workflows com (true) ou sem (false) ciclos"),
+    fields: Optional[str] = Query(None, description="Campos de cada workflow, separados por vírgula (ex.: name,trigger_type,integrations); id é sempre incluído"),
+    response_format: str = Query("objects", alias="format", pattern="^(objects|columnar)$", description="objects: lista de workflows; columnar: um array por campo em columns, sem repetir as chaves"),
     page: int = Query(1, ge=1, description="Página"),
     per_page: int = Query(20, ge=1, le=100, description="Itens por página")
 ):
     """Busca e filtra workflows com paginação."""
+    if sort and sort not in db.SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida: {sort}")
+    metric_ranges = {
+        'graph_depth': (min_depth, max_depth),
+        'max_fan_out': (min_fan_out, max_fan_out),
+        'branch_count': (min_branches, max_branches),
+    }
+    if has_cycle is not None:
+        metric_ranges['has_cycle'] = (int(has_cycle), int(has_cycle))
+    if scope == "content" and not q.strip():
+        raise HTTPException(status_code=400, detail="A busca com scope=content exige o parâmetro q")
+    selected = parse_fields(fields, response_format == "columnar")
+    columns = None if selected is None else [field for field in selected if field != 'matches']
     try:
         offset = (page - 1) * per_page
 
-        workflows, total = db.search_workflows(
-            query=q,
-            trigger_filter=trigger,
-            complexity_filter=complexity,
-            active_only=active_only,
-            limit=per_page,
-            offset=offset
-        )
-
-        workflow_summaries = []
-        for workflow in workflows:
-            try:
-                clean_workflow = {
-                    'id': workflow.get('id'),
-                    'filename': workflow.get('filename', ''),
-                    'name': workflow.get('name', ''),
-                    'active': workflow.get('active', False),
-                    'description': workflow.get('description', ''),
-                    'trigger_type': workflow.get('trigger_type', 'Manual'),
-                    'complexity': workflow.get('complexity', 'low'),
-                    'node_count': workflow.get('node_count', 0),
-                    'integrations': workflow.get('integrations', []),
-                    'tags': workflow.get('tags', []),
-                    'created_at': workflow.get('created_at'),
-                    'updated_at': workflow.get('updated_at')
-                }
-                workflow_summaries.append(WorkflowSummary(**clean_workflow))
-            except Exception as e:
-                print(f"Erro ao converter workflow {workflow.get('filename', 'desconhecido')}: {e}")
-                continue
-
-        pages = (total + per_page - 1) // per_page
+        if scope == "content":
+            workflows, total = db.search_node_content(
+                query=q,
+                trigger_filter=trigger,
+                complexity_filter=complexity,
+                active_only=active_only,
+                limit=per_page,
+                offset=offset,
+                serialized=True,
+                columns=columns
+            )
+        else:
+            workflows, total = db.search_workflows(
+                query=q,
+                trigger_filter=trigger,
+                complexity_filter=complexity,
+                active_only=active_only,
+                limit=per_page,
+                offset=offset,
+                collapse_duplicates=collapse_duplicates,
+                sort=sort,
+                metric_ranges=metric_ranges,
+                serialized=True,
+                columns=columns
+            )
 
-        return SearchResponse(
-            workflows=workflow_summaries,
-            total=total,
-            page=page,
-            per_page=per_page,
-            pages=pages,
-            query=q,
-            filters={
-                "trigger": trigger,
-                "complexity": complexity,
-                "active_only": active_only
+        filters = {
+            "scope": scope,
+            "trigger": trigger,
+            "complexity": complexity,
+            "active_only": active_only,
+            "collapse_duplicates": collapse_duplicates,
+            "sort": sort,
+            "graph": {
+                column: [minimum, maximum]
+                for column, (minimum, maximum) in metric_ranges.items()
+                if minimum is not None or maximum is not None
             }
-        )
+        }
+        if selected is not None:
+            return projected_search_response(workflows, selected, response_format == "columnar",
+                                             total=total, page=page, per_page=per_page,
+                                             query=q, filters=filters)
+        return serialized_search_response(workflows, total=total, page=page, per_page=per_page,
+                                          query=q, filters=filters)
+    except ValueError as e:
+        # Expressão de busca que o FTS5 não consegue interpretar (ex.: aspas sem fechamento)
+        raise HTTPException(status_code=400, detail=f"Consulta inválida: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar workflows: {str(e)}")
 
+@app.get("/api/duplicates")
+def get_duplicates(
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(20, ge=1, le=100, description="Grupos por página")
+):
+    """Lista grupos de workflows duplicados (cópias exatas e quase idênticas)."""
+    require_single_database('get_duplicate_groups')
+    try:
+        offset = (page - 1) * per_page
+        groups, total = db.get_duplicate_groups(limit=per_page, offset=offset)
+        return {
+            "groups": groups,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar duplicados: {str(e)}")
+
+@app.get("/api/pattern-search")
+def pattern_search(
+    pattern: str = Query(..., min_length=1, description='Padrão de tipos de nós, ex.: "Webhook -> IF -> Slack" ou "Webhook -> c:IF -> Slack; c -> Gmail"'),
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(20, ge=1, le=100, description="Itens por página")
+):
+    """Busca workflows que contêm uma cadeia ou subgrafo de tipos de nós."""
+    try:
+        offset = (page - 1) * per_page
+        workflows, total = db.search_graph_pattern(pattern, limit=per_page, offset=offset)
+        return {
+            "workflows": workflows,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page,
+            "pattern": pattern
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Padrão inválido: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na busca por padrão: {str(e)}")
+
+def require_single_database(method: str) -> None:
+    """501 para recursos que relacionam workflows entre si e não existem num índice particionado."""
+    if method in getattr(db, 'SINGLE_DATABASE_FEATURES', ()):
+        raise HTTPException(status_code=501,
+                            detail="Recurso indisponível com o índice particionado (WORKFLOW_DB_SHARDS > 1)")
+
+def load_json_file(path: str) -> Any:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def current_variants(endpoint: str, filename: str, file_path: str) -> Optional[Dict[str, Any]]:
+    """Variantes pré-comprimidas do workflow, ou None se o arquivo mudou desde a indexação.
+
+    Compara o stat do arquivo (mtime_ns e tamanho) com o registrado na indexação,
+    sem ler o arquivo; o tamanho servido entra nas métricas de leitura do endpoint.
+    """
+    variants = db.get_workflow_variants(filename)
+    if not variants:
+        return None
+    stat = os.stat(file_path)
+    if (stat.st_mtime_ns, stat.st_size) != (variants['file_mtime_ns'], variants['file_size']):
+        return None
+    file_read_bytes.inc(endpoint, amount=stat.st_size)
+    return variants
+
 @app.get("/api/workflows/{filename}")
-async def get_workflow_detail(filename: str):
+def get_workflow_detail(filename: str):
     """Obtém detalhes completos do workflow, incluindo JSON bruto."""
     try:
         workflows, _ = db.search_workflows(f'filename:"{filename}"', limit=1)
@@ -200,8 +796,13 @@ async def get_workflow_detail(filename: str):
         if not os.path.exists(file_path):
             print(f"Aviso: Arquivo {file_path} não encontrado no sistema, mas está no banco")
             raise HTTPException(status_code=404, detail=f"Arquivo '{filename}' não encontrado")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            raw_json = json.load(f)
+        variants = current_variants('detail', filename, file_path)
+        if variants:
+            # JSON já minificado na indexação: embutido sem decodificar e recodificar
+            metadata = json.dumps(workflow_meta, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+            content = b'{"metadata":' + metadata + b',"raw_json":' + decompress_identity(variants) + b'}'
+            return Response(content=content, media_type="application/json")
+        raw_json = timed_read('detail', file_path, load_json_file)
         return {
             "metadata": workflow_meta,
             "raw_json": raw_json
@@ -212,18 +813,26 @@ async def get_workflow_detail(filename: str):
         raise HTTPException(status_code=500, detail=f"Erro ao carregar workflow: {str(e)}")
 
 @app.get("/api/workflows/{filename}/download")
-async def download_workflow(filename: str):
-    """Baixa o arquivo JSON do workflow."""
+def download_workflow(filename: str, request: Request):
+    """Baixa o arquivo JSON do workflow (minificado e pré-comprimido quando indexado)."""
     try:
         file_path = os.path.join("workflows", filename)
         if not os.path.exists(file_path):
             print(f"Aviso: Download solicitado para arquivo ausente: {file_path}")
             raise HTTPException(status_code=404, detail=f"Arquivo '{filename}' não encontrado")
-        return FileResponse(
-            file_path,
+        variants = current_variants('download', filename, file_path)
+        if variants:
+            quoted = quote(filename)
+            disposition = (f'attachment; filename="{filename}"' if quoted == filename
+                           else f"attachment; filename*=utf-8''{quoted}")
+            return precompressed_response(variants, request.headers, "application/json",
+                                          etag=f'"{variants["file_hash"]}"',
+                                          headers={"Content-Disposition": disposition})
+        return timed_read('download', file_path, lambda path: FileResponse(
+            path,
             media_type="application/json",
             filename=filename
-        )
+        ))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Arquivo '{filename}' não encontrado")
     except Exception as e:
@@ -238,8 +847,7 @@ async def get_workflow_diagram(filename: str):
         if not os.path.exists(file_path):
             print(f"Aviso: Diagrama solicitado para arquivo ausente: {file_path}")
             raise HTTPException(status_code=404, detail=f"Arquivo '{filename}' não encontrado")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = timed_read('diagram', file_path, load_json_file)
         nodes = data.get('nodes', [])
         connections = data.get('connections', {})
         diagram = generate_mermaid_diagram(nodes, connections)
@@ -255,6 +863,24 @@ async def get_workflow_diagram(filename: str):
         print(f"Erro ao gerar diagrama para {filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao gerar diagrama: {str(e)}")
 
+@app.get("/api/workflows/{filename}/dependencies")
+def get_workflow_dependencies(
+    filename: str,
+    transitive: bool = Query(False, description="Inclui chamadas indiretas (fecho transitivo)"),
+    max_depth: int = Query(20, ge=1, le=100, description="Profundidade máxima do fecho transitivo")
+):
+    """Sub-workflows chamados por este workflow e workflows que o chamam (executeWorkflow)."""
+    require_single_database('get_workflow_dependencies')
+    try:
+        dependencies = db.get_workflow_dependencies(filename, transitive=transitive, max_depth=max_depth)
+        if dependencies is None:
+            raise HTTPException(status_code=404, detail="Workflow não encontrado no banco")
+        return dependencies
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar dependências: {str(e)}")
+
 def generate_mermaid_diagram(nodes: List[Dict], connections: Dict) -> str:
     """Gera código Mermaid.js a partir dos nós e conexões do workflow."""
     if not nodes:
@@ -304,22 +930,173 @@ def generate_mermaid_diagram(nodes: List[Dict], connections: Dict) -> str:
     return "\n".join(mermaid_code)
 
 @app.post("/api/reindex")
-async def reindex_workflows(background_tasks: BackgroundTasks, force: bool = False):
-    """Reindexa workflows em segundo plano."""
-    def run_indexing():
-        db.index_all_workflows(force_reindex=force)
-    background_tasks.add_task(run_indexing)
-    return {"mensagem": "Reindexação iniciada em segundo plano"}
+async def reindex_workflows(force: bool = False):
+    """Reindexa workflows num processo separado.
+    
+    O índice é reconstruído numa cópia do banco (shadow), validado e trocado
+    atomicamente; as buscas continuam no banco atual até a troca. Pedidos
+    simultâneos são agrupados no job em andamento.
+    """
+    if snapshot_follower:
+        raise HTTPException(
+            status_code=409,
+            detail="Este nó segue snapshots publicados; reindexe no host de indexação com workflow_db.py --index --publish"
+        )
+    job = reindex_jobs.submit(force_reindex=force)
+    mensagem = ("Reindexação já em andamento" if job['coalesced']
+                else "Reindexação iniciada em segundo plano")
+    return {"mensagem": mensagem, **job}
+
+@app.get("/api/snapshot")
+async def get_snapshot_status():
+    """Versão do snapshot instalada neste nó e a mais recente publicada."""
+    if not snapshot_follower:
+        return {"following": False}
+    return {
+        "following": True,
+        "directory": SNAPSHOT_DIR,
+        "installed_version": snapshot_follower.installed_version(),
+        "latest_version": latest_version(SNAPSHOT_DIR),
+        "poll_interval": snapshot_follower.interval,
+    }
+
+@app.get("/api/reindex/{job_id}")
+async def get_reindex_job(job_id: str):
+    """Progresso de um job de reindexação: contagens, arquivos/s e tempo restante estimado."""
+    job = reindex_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job de reindexação '{job_id}' não encontrado")
+    return job
 
 @app.get("/api/integrations")
-async def get_integrations():
-    """Obtém lista de todas as integrações únicas."""
+def get_integrations():
+    """Obtém lista de todas as integrações únicas com o número de workflows de cada uma."""
     try:
-        stats = db.get_stats()
-        return {"integrations": [], "count": stats['unique_integrations']}
+        integrations = db.get_integration_counts()
+        return {"integrations": integrations, "count": len(integrations)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar integrações: {str(e)}")
 
+@app.get("/api/node-types")
+def get_node_types(
+    prefix: str = Query("", description="Filtra por prefixo do tipo, ex.: @n8n/ ou n8n-nodes-base."),
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(50, ge=1, le=500, description="Itens por página")
+):
+    """Catálogo de tipos de nós com contagem de workflows e nós por typeVersion."""
+    try:
+        offset = (page - 1) * per_page
+        node_types, total = db.get_node_type_catalog(prefix=prefix, limit=per_page, offset=offset)
+        return {
+            "node_types": node_types,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar tipos de nós: {str(e)}")
+
+@app.get("/api/node-types/co-occurrence")
+def get_node_type_cooccurrence(
+    type: str = Query(..., min_length=1, description="Tipo de nó completo, ex.: n8n-nodes-base.slack"),
+    limit: int = Query(20, ge=1, le=200, description="Número de tipos retornados")
+):
+    """Tipos de nós que mais aparecem nos mesmos workflows que o tipo informado."""
+    try:
+        result = db.get_cooccurring_node_types(type, limit=limit)
+        if not result['workflows']:
+            raise HTTPException(status_code=404, detail=f"Tipo de nó '{type}' não encontrado")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar coocorrências: {str(e)}")
+
+@app.get("/api/facts/{key}")
+def get_fact_values(
+    key: str,
+    prefix: str = Query("", description="Filtra valores por prefixo"),
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(50, ge=1, le=500, description="Itens por página")
+):
+    """Lista os valores de um fato (host, model, credential, webhook_path) com contagem de workflows."""
+    if key not in db.FACT_KEYS:
+        raise HTTPException(status_code=404, detail=f"Fato desconhecido: {key}. Use um de {list(db.FACT_KEYS)}")
+    try:
+        offset = (page - 1) * per_page
+        values, total = db.get_fact_values(key, prefix=prefix, limit=per_page, offset=offset)
+        return {
+            "key": key,
+            "values": values,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar fatos: {str(e)}")
+
+@app.get("/api/facts/{key}/workflows", response_model=SearchResponse)
+def search_workflows_by_fact(
+    key: str,
+    value: str = Query(..., min_length=1, description="Valor do fato, ex.: api.openai.com ou gpt-4o; '*' no final busca por prefixo"),
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(20, ge=1, le=100, description="Itens por página")
+):
+    """Busca workflows por fato estruturado, ex.: host=api.openai.com, model=gpt-4o, credential=postgres."""
+    if key not in db.FACT_KEYS:
+        raise HTTPException(status_code=404, detail=f"Fato desconhecido: {key}. Use um de {list(db.FACT_KEYS)}")
+    try:
+        offset = (page - 1) * per_page
+        workflows, total = db.search_by_fact(key, value, limit=per_page, offset=offset)
+        return SearchResponse(
+            workflows=[WorkflowSummary(**workflow) for workflow in workflows],
+            total=total,
+            page=page,
+            per_page=per_page,
+            pages=(total + per_page - 1) // per_page,
+            query=f"{key}:{value}",
+            filters={"key": key, "value": value}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar workflows por fato: {str(e)}")
+
+@app.get("/api/credential-coverage", response_model=SearchResponse)
+def search_by_credential_coverage(
+    credentials: List[str] = Query(..., description="Tipos de credencial disponíveis, ex.: openAiApi, postgres (repita o parâmetro)"),
+    integrations: Optional[List[str]] = Query(None, description="Integrações disponíveis; se omitido, integrações não restringem"),
+    include_no_credentials: bool = Query(False, description="Inclui workflows que não exigem credenciais"),
+    page: int = Query(1, ge=1, description="Página"),
+    per_page: int = Query(20, ge=1, le=100, description="Itens por página")
+):
+    """Workflows que podem ser executados só com as credenciais informadas."""
+    try:
+        offset = (page - 1) * per_page
+        workflows, total, unknown = db.search_by_credentials(
+            credentials,
+            integrations=integrations,
+            include_no_credentials=include_no_credentials,
+            limit=per_page,
+            offset=offset
+        )
+        return SearchResponse(
+            workflows=[WorkflowSummary(**workflow) for workflow in workflows],
+            total=total,
+            page=page,
+            per_page=per_page,
+            pages=(total + per_page - 1) // per_page,
+            query="credentials:" + ",".join(credentials),
+            filters={
+                "credentials": credentials,
+                "integrations": integrations,
+                "include_no_credentials": include_no_credentials,
+                "unknown_credentials": unknown
+            }
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar cobertura de credenciais: {str(e)}")
+
 @app.get("/api/categories")
 async def get_categories():
     """Obtém categorias disponíveis para filtragem."""
@@ -368,48 +1145,34 @@ async def get_category_mappings():
         print(f"Erro ao carregar mapeamentos de categoria: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao buscar mapeamentos de categoria: {str(e)}")
 
-@app.get("/api/workflows/category/{category}", response_model=SearchResponse)
-async def search_workflows_by_category(
+@app.get("/api/workflows/category/{category}", response_model=WorkflowListResponse)
+def search_workflows_by_category(
     category: str,
+    fields: Optional[str] = Query(None, description="Campos de cada workflow, separados por vírgula (ex.: name,trigger_type,integrations); id é sempre incluído"),
+    response_format: str = Query("objects", alias="format", pattern="^(objects|columnar)$", description="objects: lista de workflows; columnar: um array por campo em columns, sem repetir as chaves"),
     page: int = Query(1, ge=1, description="Página"),
     per_page: int = Query(20, ge=1, le=100, description="Itens por página")
 ):
     """Busca workflows por categoria de serviço."""
+    selected = parse_fields(fields, response_format == "columnar")
     try:
         offset = (page - 1) * per_page
         workflows, total = db.search_by_category(
             category=category,
             limit=per_page,
-            offset=offset
+            offset=offset,
+            serialized=True,
+            columns=None if selected is None else [field for field in selected if field != 'matches']
         )
-        workflow_summaries = []
-        for workflow in workflows:
-            try:
-                clean_workflow = {
-                    'id': workflow.get('id'),
-                    'filename': workflow.get('filename', ''),
-                    'name': workflow.get('name', ''),
-                    'active': workflow.get('active', False),
-                    'description': workflow.get('description', ''),
-                    'trigger_type': workflow.get('trigger_type', 'Manual'),
-                    'complexity': workflow.get('complexity', 'low'),
-                    'node_count': workflow.get('node_count', 0),
-                    'integrations': workflow.get('integrations', []),
-                    'tags': workflow.get('tags', []),
-                    'created_at': workflow.get('created_at'),
-                    'updated_at': workflow.get('updated_at')
-                }
-                workflow_summaries.append(WorkflowSummary(**clean_workflow))
-            except Exception as e:
-                print(f"Erro ao converter workflow {workflow.get('filename', 'desconhecido')}: {e}")
-                continue
-        pages = (total + per_page - 1) // per_page
-        return SearchResponse(
-            workflows=workflow_summaries,
+        if selected is not None:
+            return projected_search_response(workflows, selected, response_format == "columnar",
+                                             total=total, page=page, per_page=per_page,
+                                             query=f"category:{category}", filters={"category": category})
+        return serialized_search_response(
+            workflows,
             total=total,
             page=page,
             per_page=per_page,
-            pages=pages,
             query=f"category:{category}",
             filters={"category": category}
         )
@@ -423,37 +1186,48 @@ async def global_exception_handler(request, exc):
         content={"detail": f"Erro interno no servidor: {str(exc)}"}
     )
 
-static_dir = Path("static")
-if static_dir.exists():
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-    print(f"✅ Arquivos estáticos carregados de {static_dir.absolute()}")
-else:
-    print(f"❌ Atenção: Diretório static não encontrado em {static_dir.absolute()}")
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles que serve variantes gzip/brotli calculadas uma vez por precompress()."""
+
+    # Imagens PNG já são comprimidas
+    COMPRESSIBLE_SUFFIXES = ('.html', '.css', '.js', '.svg', '.json', '.txt')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.variants: Dict[str, Dict[str, Any]] = {}
+
+    def precompress(self) -> None:
+        """Comprime os arquivos de texto do diretório; alterações posteriores exigem reiniciar."""
+        variants = {}
+        for path in Path(self.directory).rglob('*'):
+            if path.is_file() and path.suffix.lower() in self.COMPRESSIBLE_SUFFIXES:
+                content = path.read_bytes()
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                variants[str(path.relative_to(self.directory))] = dict(
+                    compress_variants(content), identity=content,
+                    etag=content_etag(content), media_type=media_type)
+        self.variants = variants
+
+    async def get_response(self, path: str, scope) -> Response:
+        variants = self.variants.get(path)
+        if variants is None or scope["method"] not in ("GET", "HEAD"):
+            # StaticFiles answers other methods with 405
+            return await super().get_response(path, scope)
+        return precompressed_response(variants, Headers(scope=scope), variants["media_type"], etag=variants["etag"])
+
+static_files = PrecompressedStaticFiles(directory="static") if Path("static").exists() else None
+if static_files:
+    app.mount("/static", static_files, name="static")
 
 def create_static_directory():
     static_dir = Path("static")
     static_dir.mkdir(exist_ok=True)
     return static_dir
 
-def run_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False):
+def run_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False, workers: int = 1):
     create_static_directory()
-    try:
-        stats = db.get_stats()
-        print(f"✅ Banco de dados conectado: {stats['total']} workflows encontrados")
-        if stats['total'] == 0:
-            print("🔄 Banco vazio. Indexando workflows...")
-            db.index_all_workflows()
-            stats = db.get_stats()
-    except Exception as e:
-        print(f"❌ Erro no banco de dados: {e}")
-        print("🔄 Tentando criar e indexar banco de dados...")
-        try:
-            db.index_all_workflows()
-            stats = db.get_stats()
-            print(f"✅ Banco criado: {stats['total']} workflows indexados")
-        except Exception as e2:
-            print(f"❌ Falha ao criar banco: {e2}")
-            stats = {'total': 0}
     static_path = Path("static")
     if static_path.exists():
         files = list(static_path.glob("*"))
@@ -461,14 +1235,17 @@ def run_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False):
     else:
         print(f"❌ Diretório static não encontrado: {static_path.absolute()}")
     print(f"🚀 Iniciando GG.AI Labs - API de Documentação de Workflows N8N")
-    print(f"📊 Banco contém {stats['total']} workflows")
     print(f"🌐 Servidor disponível em: http://{host}:{port}")
     print(f"📁 Arquivos estáticos em: http://{host}:{port}/static/")
+    if workers > 1 and not reload:
+        print(f"👥 Processos de trabalho: {workers}")
+    import uvicorn
     uvicorn.run(
         "api_server:app",
         host=host,
         port=port,
         reload=reload,
+        workers=1 if reload else workers,
         access_log=True,
         log_level="info"
     )
@@ -480,7 +1257,8 @@ if __name__ == "__main__":
     parser.add_argument('--host', default='127.0.0.1', help='Host')
     parser.add_argument('--port', type=int, default=8000, help='Porta')
     parser.add_argument('--reload', action='store_true', help='Auto-reload para desenvolvimento')
+    parser.add_argument('--workers', type=int, default=1, help='Número de processos de trabalho')
 
     args = parser.parse_args()
 
-    run_server(host=args.host, port=args.port, reload=args.reload)
+    run_server(host=args.host, port=args.port, reload=args.reload, workers=args.workers)
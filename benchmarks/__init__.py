@@ -0,0 +1 @@
+"""Performance benchmarks for the workflow database and API."""
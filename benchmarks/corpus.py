@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Synthetic n8n workflow corpus.
+
+Learns the shape of the real workflows in workflows/ (node counts, trigger
+and node type frequencies, node parameters per type, active ratio, tags) and
+writes any number of new workflow files drawn from those distributions.
+Generation is deterministic for a given seed.
+
+    python -m benchmarks.corpus --size 100k --out /tmp/corpus-100k
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+# Not *.json, so the indexer does not pick it up
+MANIFEST_NAME = 'corpus.manifest'
+
+# Node parameter samples kept per node type
+EXAMPLES_PER_TYPE = 8
+# Node types whose outputs branch (connections on output 0 and 1)
+BRANCHING_TYPES = ('n8n-nodes-base.if', 'n8n-nodes-base.switch', 'n8n-nodes-base.filter')
+NON_FLOW_TYPES = ('n8n-nodes-base.stickyNote',)
+FILENAME_SUFFIXES = ('Automation', 'Automate', 'Create', 'Send', 'Update', 'Process', 'Sync', 'Import')
+FILENAME_TRIGGERS = ('Triggered', 'Scheduled', 'Webhook', '')
+
+
+def parse_size(value: str) -> int:
+    """'10k', '100k', '1m' or a plain number of workflows."""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def is_trigger_type(node_type: str) -> bool:
+    lowered = node_type.lower()
+    return 'trigger' in lowered or lowered.endswith(('.webhook', '.cron', '.start', '.interval'))
+
+
+def type_title(node_type: str) -> str:
+    """'n8n-nodes-base.googleSheets' -> 'GoogleSheets'."""
+    short = node_type.rsplit('.', 1)[-1]
+    short = re.sub(r'(Trigger|Tool)$', '', short) or short
+    return short[:1].upper() + short[1:]
+
+
+class CorpusModel:
+    """Distributions sampled from a directory of real workflows."""
+
+    def __init__(self, node_counts: List[int], trigger_types: Counter, body_types: Counter,
+                 examples: Dict[str, List[Dict[str, Any]]], active_ratio: float, tags: List[Any]):
+        self.node_counts = node_counts
+        self.trigger_types = list(trigger_types)
+        self.trigger_weights = list(trigger_types.values())
+        self.body_types = list(body_types)
+        self.body_weights = list(body_types.values())
+        self.examples = examples
+        self.active_ratio = active_ratio
+        self.tags = tags
+
+    @classmethod
+    def from_directory(cls, workflows_dir: str, seed: int = 0) -> 'CorpusModel':
+        rng = random.Random(seed)
+        node_counts, tags = [], []
+        trigger_types, body_types = Counter(), Counter()
+        examples: Dict[str, List[Dict[str, Any]]] = {}
+        seen: Counter = Counter()
+        active = total = 0
+        for path in sorted(glob.glob(os.path.join(workflows_dir, '*.json'))):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                nodes = data['nodes']
+            except (ValueError, KeyError, TypeError):
+                continue
+            total += 1
+            active += bool(data.get('active'))
+            tags.extend(tag for tag in data.get('tags') or [] if isinstance(tag, (str, dict)))
+            node_counts.append(len(nodes))
+            triggers = [node['type'] for node in nodes if is_trigger_type(node.get('type') or '')]
+            trigger_types[triggers[0] if triggers else None] += 1
+            for node in nodes:
+                node_type = node.get('type')
+                if not node_type:
+                    continue
+                if not is_trigger_type(node_type):
+                    body_types[node_type] += 1
+                # Reservoir sample of full node definitions per type
+                seen[node_type] += 1
+                sample = {key: node[key] for key in ('parameters', 'typeVersion', 'credentials', 'notes')
+                          if key in node}
+                bucket = examples.setdefault(node_type, [])
+                if len(bucket) < EXAMPLES_PER_TYPE:
+                    bucket.append(sample)
+                else:
+                    slot = rng.randrange(seen[node_type])
+                    if slot < EXAMPLES_PER_TYPE:
+                        bucket[slot] = sample
+        if not total:
+            raise ValueError(f"no workflows found in {workflows_dir}")
+        return cls(node_counts, trigger_types, body_types, examples, active / total, tags)
+
+    def _node(self, rng: random.Random, node_type: str, name: str, position: Tuple[int, int]) -> Dict[str, Any]:
+        node = {
+            'id': f"{rng.getrandbits(64):016x}",
+            'name': name,
+            'type': node_type,
+            'position': list(position),
+        }
+        node.update(json.loads(json.dumps(rng.choice(self.examples[node_type]))))
+        node.setdefault('typeVersion', 1)
+        node.setdefault('parameters', {})
+        return node
+
+    def workflow(self, rng: random.Random, index: int) -> Tuple[str, Dict[str, Any]]:
+        """One synthetic workflow: (filename, workflow JSON)."""
+        node_count = max(1, rng.choice(self.node_counts))
+        trigger = rng.choices(self.trigger_types, self.trigger_weights)[0]
+        types = ([trigger] if trigger else []) + rng.choices(
+            self.body_types, self.body_weights, k=node_count - (1 if trigger else 0))
+
+        nodes, names, flow = [], Counter(), []
+        connections: Dict[str, Dict[str, List[List[Dict[str, Any]]]]] = {}
+        for position, node_type in enumerate(types):
+            title = type_title(node_type)
+            names[title] += 1
+            name = title if names[title] == 1 else f"{title}{names[title] - 1}"
+            nodes.append(self._node(rng, node_type, name, (250 + 200 * position, 300)))
+            if node_type in NON_FLOW_TYPES:
+                continue
+            if flow:
+                # Mostly a chain, with some branches off earlier nodes
+                source_index = len(flow) - 1 if rng.random() < 0.75 else rng.randrange(len(flow))
+                source_name, source_type = flow[source_index]
+                output = rng.randint(0, 1) if source_type in BRANCHING_TYPES else 0
+                outputs = connections.setdefault(source_name, {}).setdefault('main', [])
+                while len(outputs) <= output:
+                    outputs.append([])
+                outputs[output].append({'node': name, 'type': 'main', 'index': 0})
+            flow.append((name, node_type))
+
+        services = [type_title(node_type) for node_type in dict.fromkeys(types)
+                    if node_type not in NON_FLOW_TYPES][:2] or ['Manual']
+        words = services + [rng.choice(FILENAME_SUFFIXES), rng.choice(FILENAME_TRIGGERS)]
+        filename = f"{index:07d}_{'_'.join(word for word in words if word)}.json"
+        created = datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+        workflow = {
+            'id': str(index),
+            'name': ' '.join(word for word in words if word),
+            'nodes': nodes,
+            'connections': connections,
+            'active': rng.random() < self.active_ratio,
+            'tags': rng.sample(self.tags, k=min(len(self.tags), rng.choice((0, 0, 1, 2)))),
+            'createdAt': created.isoformat() + 'Z',
+            'updatedAt': created.isoformat() + 'Z',
+        }
+        return filename, workflow
+
+
+def read_manifest(out_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def generate_corpus(out_dir: str, count: int, seed: int = 0,
+                    source_dir: str = str(ROOT / 'workflows')) -> Dict[str, Any]:
+    """Write `count` synthetic workflows to out_dir, reusing a matching corpus already there."""
+    manifest = read_manifest(out_dir)
+    if manifest and manifest['count'] == count and manifest['seed'] == seed:
+        return manifest
+    os.makedirs(out_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(out_dir, '*.json')):
+        os.unlink(stale)
+
+    start = time.perf_counter()
+    model = CorpusModel.from_directory(source_dir, seed)
+    rng = random.Random(seed)
+    total_bytes = 0
+    for index in range(1, count + 1):
+        filename, workflow = model.workflow(rng, index)
+        content = json.dumps(workflow, ensure_ascii=False)
+        total_bytes += len(content)
+        with open(os.path.join(out_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    manifest = {
+        'count': count,
+        'seed': seed,
+        'source_workflows': len(model.node_counts),
+        'bytes': total_bytes,
+        'generation_seconds': round(time.perf_counter() - start, 1),
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic n8n workflow corpus')
+    parser.add_argument('--size', default='10k', help='10k, 100k, 1m or a number of workflows')
+    parser.add_argument('--out', required=True, help='Output directory')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--source', default=str(ROOT / 'workflows'), help='Real workflows to sample from')
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.out, parse_size(args.size), args.seed, args.source)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+HTTP load test of the API with a mixed traffic profile.
+
+Starts `uvicorn api_server:app` on a free port and runs concurrent keep-alive
+clients that pick each request from a weighted mix of routes (search,
+detail, diagram, stats, categories, download). Reports throughput and
+p50/p95/p99 latency per route.
+
+The `reindex` scenario posts `/api/reindex?force=true` once the run is
+--reindex-at of the way through and splits every route's numbers into
+before / during / after the reindex job, showing how much indexing degrades
+serving.
+
+    python -m benchmarks.load_test --db database/workflows.db --duration 60
+    python -m benchmarks.load_test --scenario reindex --mix search=50,detail=20,stats=30
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.serving_modes import percentile
+from benchmarks.worker_scaling import ROOT, free_port, wait_until_ready
+
+DEFAULT_MIX = 'search=40,detail=15,diagram=10,stats=10,categories=15,download=10'
+SEARCH_TERMS = ['slack', 'google sheets', 'openai', 'telegram', 'http', 'webhook', 'email', 'notion',
+                'goog*', '"google drive"', 'airtable', 'discord']
+TRIGGERS = ['all', 'all', 'Webhook', 'Agendamento', 'Manual', 'Complexo']
+COMPLEXITIES = ['all', 'all', 'baixa', 'media', 'alta']
+SORTS = ['', '', '', 'nodes', 'name', 'depth']
+SERVICE_CATEGORIES = ['messaging', 'email', 'cloud_storage', 'database', 'project_management', 'ai_ml',
+                      'social_media', 'ecommerce', 'analytics', 'calendar_tasks', 'forms', 'development']
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'search=40,detail=15' -> {'search': 40.0, 'detail': 15.0}."""
+    mix = {}
+    for part in value.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route '{route}' (choose from {', '.join(ROUTES)})")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def search_path(rng: random.Random, filenames: List[str]) -> str:
+    params = [f"per_page={rng.choice((20, 20, 50))}", f"page={rng.choice((1, 1, 1, 2, 5))}"]
+    if rng.random() < 0.6:
+        params.append(f"q={quote(rng.choice(SEARCH_TERMS))}")
+    trigger, complexity, sort = rng.choice(TRIGGERS), rng.choice(COMPLEXITIES), rng.choice(SORTS)
+    if trigger != 'all':
+        params.append(f"trigger={trigger}")
+    if complexity != 'all':
+        params.append(f"complexity={complexity}")
+    if sort:
+        params.append(f"sort={sort}")
+    return '/api/workflows?' + '&'.join(params)
+
+
+def categories_path(rng: random.Random, filenames: List[str]) -> str:
+    if rng.random() < 0.2:
+        return '/api/categories'
+    return f"/api/workflows/category/{rng.choice(SERVICE_CATEGORIES)}?per_page=20"
+
+
+# Route name -> builder of a request path
+ROUTES: Dict[str, Callable[[random.Random, List[str]], str]] = {
+    'search': search_path,
+    'detail': lambda rng, filenames: f"/api/workflows/{quote(rng.choice(filenames))}",
+    'diagram': lambda rng, filenames: f"/api/workflows/{quote(rng.choice(filenames))}/diagram",
+    'stats': lambda rng, filenames: '/api/stats',
+    'categories': categories_path,
+    'download': lambda rng, filenames: f"/api/workflows/{quote(rng.choice(filenames))}/download",
+}
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str) -> Tuple[int, bytes]:
+    conn.request(method, path)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def fetch_filenames(port: int, limit: int) -> List[str]:
+    """Filenames of indexed workflows, used by the detail, diagram and download routes."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    filenames: List[str] = []
+    page = 1
+    while len(filenames) < limit:
+        status, body = request(conn, 'GET', f'/api/workflows?per_page=100&page={page}')
+        workflows = json.loads(body)['workflows'] if status == 200 else []
+        if not workflows:
+            break
+        filenames.extend(workflow['filename'] for workflow in workflows)
+        page += 1
+    if not filenames:
+        raise RuntimeError("the server returned no workflows; index the database first")
+    return filenames[:limit]
+
+
+class ReindexProbe(threading.Thread):
+    """Posts a forced reindex at a given time and follows the job until it finishes."""
+
+    def __init__(self, port: int, start_at: float):
+        super().__init__(daemon=True)
+        self.port = port
+        self.start_at = start_at
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.job: Dict = {}
+
+    def run(self):
+        time.sleep(max(0.0, self.start_at - time.time()))
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        self.started = time.time()
+        status, body = request(conn, 'POST', '/api/reindex?force=true')
+        if status != 200:
+            self.job = {'status': f'http {status}'}
+            self.finished = time.time()
+            return
+        job_id = json.loads(body)['job_id']
+        while True:
+            time.sleep(0.5)
+            status, body = request(conn, 'GET', f'/api/reindex/{job_id}')
+            self.job = json.loads(body) if status == 200 else {'status': f'http {status}'}
+            if self.job.get('status') not in ('queued', 'running'):
+                self.finished = time.time()
+                return
+
+    def phase(self, at: float) -> str:
+        if self.started is None or at < self.started:
+            return 'before'
+        if self.finished is None or at < self.finished:
+            return 'during'
+        return 'after'
+
+
+def drive(port: int, clients: int, duration: float, mix: Dict[str, float], filenames: List[str],
+          seed: int, probe: Optional[ReindexProbe] = None) -> List[Tuple[str, float, float, int]]:
+    """Run the traffic mix; returns (route, start time, latency s, status) per request."""
+    routes, weights = list(mix), list(mix.values())
+    samples: List[Tuple[str, float, float, int]] = []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(number: int):
+        rng = random.Random(seed * 1000 + number)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = []
+        while time.time() < stop_at:
+            route = rng.choices(routes, weights)[0]
+            path = ROUTES[route](rng, filenames)
+            started_at = time.time()
+            start = time.perf_counter()
+            try:
+                status, _ = request(conn, 'GET', path)
+            except OSError:
+                status = 0
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            local.append((route, started_at, time.perf_counter() - start, status))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    if probe:
+        probe.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples: List[Tuple[str, float, float, int]], seconds: float) -> Dict[str, float]:
+    latencies = [latency * 1000 for _, _, latency, _ in samples]
+    if not latencies or seconds <= 0:
+        return {'requests': len(latencies), 'errors': 0, 'requests_per_second': 0.0,
+                'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for _, _, _, status in samples if status != 200),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+
+def report(samples: List[Tuple[str, float, float, int]], started: float, ended: float,
+           probe: Optional[ReindexProbe]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Per phase ('all', or before/during/after a reindex), per route and 'total'."""
+    windows = {'all': (started, ended)}
+    if probe and probe.started:
+        reindex_end = min(probe.finished or ended, ended)
+        windows = {'before': (started, probe.started), 'during': (probe.started, reindex_end)}
+        if reindex_end < ended:
+            windows['after'] = (reindex_end, ended)
+    results = {}
+    for phase, (begin, end) in windows.items():
+        in_phase = [sample for sample in samples if begin <= sample[1] < end]
+        routes = sorted({sample[0] for sample in in_phase})
+        results[phase] = {route: summarize([s for s in in_phase if s[0] == route], end - begin)
+                          for route in routes}
+        results[phase]['total'] = summarize(in_phase, end - begin)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-traffic HTTP load test of the API')
+    parser.add_argument('--db', default='database/workflows.db', help='Database file to serve')
+    parser.add_argument('--scenario', choices=('steady', 'reindex'), default='steady',
+                        help='reindex: POST /api/reindex?force=true during the run')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Route weights (default {DEFAULT_MIX})')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load')
+    parser.add_argument('--reindex-at', type=float, default=0.2,
+                        help='Fraction of the run after which the reindex is posted')
+    parser.add_argument('--workers', type=int, default=1, help='Server worker processes')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds of untimed load first')
+    parser.add_argument('--seed', type=int, default=0, help='Traffic seed')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON')
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"database not found: {args.db} (run 'python run.py --reindex' first)")
+
+    port = free_port()
+    env = dict(os.environ, WORKFLOW_DB_PATH=os.path.abspath(args.db))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_server:app', '--port', str(port),
+         '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        filenames = fetch_filenames(port, 2000)
+        if args.warmup:
+            drive(port, args.clients, args.warmup, args.mix, filenames, args.seed + 1)
+        probe = None
+        started = time.time()
+        if args.scenario == 'reindex':
+            probe = ReindexProbe(port, started + args.reindex_at * args.duration)
+        samples = drive(port, args.clients, args.duration, args.mix, filenames, args.seed, probe)
+        ended = time.time()
+        if probe:
+            # the job may outlive the load; wait so the next run does not overlap it
+            probe.join(timeout=600)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    results = report(samples, started, ended, probe)
+    print(f"CPUs: {os.cpu_count()}, workers: {args.workers}, clients: {args.clients}, "
+          f"duration: {args.duration}s, scenario: {args.scenario}")
+    if probe:
+        reindex_seconds = (probe.finished or ended) - (probe.started or ended)
+        print(f"Reindex job: {probe.job.get('status')} in {reindex_seconds:.1f}s "
+              f"({probe.job.get('processed', 0)} files)")
+    print(f"{'phase':<8}{'route':<12}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'errors':>8}")
+    for phase, routes in results.items():
+        for route, row in routes.items():
+            print(f"{phase:<8}{route:<12}{row['requests']:>9}{row['requests_per_second']:>9}"
+                  f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['errors']:>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'scenario': args.scenario,
+            'mix': args.mix,
+            'clients': args.clients,
+            'workers': args.workers,
+            'duration': args.duration,
+            'reindex': probe and {'started': probe.started, 'finished': probe.finished, 'job': probe.job},
+            'results': results,
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
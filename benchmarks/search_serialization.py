@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Compare search response serialization through Pydantic models with the
+pre-serialized summaries the API now assembles directly, at per_page=100.
+
+    python -m benchmarks.search_serialization --db database/workflows.db --repeat 200
+
+Both paths run as routes of a throwaway FastAPI app driven in-process over
+ASGI, so the models path pays FastAPI's response_model validation and
+serialization exactly as the API did before summaries were stored.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI
+
+from api_server import SearchResponse, WorkflowSummary, serialized_search_response
+from benchmarks.serving_modes import percentile
+from workflow_db import WorkflowDatabase
+
+PER_PAGE = 100
+
+
+def build_searches(db: WorkflowDatabase) -> Dict[str, Callable[..., Tuple[List[Dict], int]]]:
+    """Search shapes served by /api/workflows and /api/workflows/category."""
+    return {
+        'search_all': lambda **kw: db.search_workflows(limit=PER_PAGE, **kw),
+        'search_text': lambda **kw: db.search_workflows(query='slack', limit=PER_PAGE, **kw),
+        'search_sorted': lambda **kw: db.search_workflows(sort='nodes', limit=PER_PAGE, **kw),
+        'search_content': lambda **kw: db.search_node_content('http', limit=PER_PAGE, **kw),
+        'category': lambda **kw: db.search_by_category('messaging', limit=PER_PAGE, **kw),
+    }
+
+
+def models_response(workflows: List[Dict[str, Any]], total: int) -> SearchResponse:
+    """The API's search response as built before summaries were stored."""
+    summaries = []
+    for workflow in workflows:
+        try:
+            summaries.append(WorkflowSummary(
+                id=workflow.get('id'),
+                filename=workflow.get('filename', ''),
+                name=workflow.get('name', ''),
+                active=workflow.get('active', False),
+                description=workflow.get('description', ''),
+                trigger_type=workflow.get('trigger_type', 'Manual'),
+                complexity=workflow.get('complexity', 'baixa'),
+                node_count=workflow.get('node_count', 0),
+                integrations=workflow.get('integrations', []),
+                tags=workflow.get('tags', []),
+                created_at=workflow.get('created_at'),
+                updated_at=workflow.get('updated_at'),
+                duplicate_count=workflow.get('duplicate_count') or 0,
+                graph_depth=workflow.get('graph_depth') or 0,
+                max_fan_out=workflow.get('max_fan_out') or 0,
+                branch_count=workflow.get('branch_count') or 0,
+                has_cycle=workflow.get('has_cycle') or False,
+                disconnected_nodes=workflow.get('disconnected_nodes') or 0,
+                entry_points=workflow.get('entry_points') or 0,
+                matches=workflow.get('matches'),
+            ))
+        except Exception:
+            continue
+    return SearchResponse(workflows=summaries, total=total, page=1, per_page=PER_PAGE,
+                          pages=(total + PER_PAGE - 1) // PER_PAGE, query='', filters={})
+
+
+def build_app(db: WorkflowDatabase) -> FastAPI:
+    """/models/<shape> and /fast/<shape> routes for every search shape."""
+    app = FastAPI()
+    for name, search in build_searches(db).items():
+        def models(search=search):
+            return models_response(*search())
+
+        def fast(search=search):
+            workflows, total = search(serialized=True)
+            return serialized_search_response(workflows, total=total, page=1, per_page=PER_PAGE,
+                                              query='', filters={})
+
+        app.add_api_route(f'/models/{name}', models, response_model=SearchResponse)
+        app.add_api_route(f'/fast/{name}', fast, response_model=SearchResponse)
+    return app
+
+
+async def asgi_get(app: FastAPI, path: str) -> bytes:
+    """Run one GET request through the ASGI app and return the response body."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'root_path': '', 'headers': [], 'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80)}
+    body = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start' and message['status'] != 200:
+            raise RuntimeError(f"{path} returned HTTP {message['status']}")
+        if message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return b''.join(body)
+
+
+def time_route(loop: asyncio.AbstractEventLoop, app: FastAPI, path: str,
+               repeat: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        loop.run_until_complete(asgi_get(app, path))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loop.run_until_complete(asgi_get(app, path))
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark search response serialization')
+    parser.add_argument('--db', default='database/workflows.db', help='Database file to benchmark')
+    parser.add_argument('--repeat', type=int, default=100, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON')
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"database not found: {args.db} (run 'python run.py --reindex' first)")
+
+    db = WorkflowDatabase(args.db)
+    conn = db._connect()
+    stored, rows = conn.execute("SELECT COUNT(summary_json), COUNT(*) FROM workflows").fetchone()
+    conn.close()
+    if stored < rows:
+        print(f"warning: {rows - stored} of {rows} rows have no stored summary and are serialized "
+              f"on the fly; reindex to measure the stored path", file=sys.stderr)
+
+    app = build_app(db)
+    loop = asyncio.new_event_loop()
+    report = {'per_page': PER_PAGE, 'rows': rows, 'stored_summaries': stored, 'queries': {}}
+    for name in build_searches(db):
+        # Both paths must produce the same document before their timings mean anything
+        models_body = loop.run_until_complete(asgi_get(app, f'/models/{name}'))
+        fast_body = loop.run_until_complete(asgi_get(app, f'/fast/{name}'))
+        report['queries'][name] = {
+            'identical': json.loads(models_body) == json.loads(fast_body),
+            'bytes': len(fast_body),
+            'models': time_route(loop, app, f'/models/{name}', args.repeat, args.warmup),
+            'fast': time_route(loop, app, f'/fast/{name}', args.repeat, args.warmup),
+        }
+    loop.close()
+
+    print(f"{'query':<16}{'models p50':>12}{'models p95':>12}{'fast p50':>10}{'fast p95':>10}{'speedup':>9}  same")
+    for name, stats in report['queries'].items():
+        models, fast = stats['models'], stats['fast']
+        speedup = models['p50_ms'] / fast['p50_ms'] if fast['p50_ms'] else 0.0
+        print(f"{name:<16}{models['p50_ms']:>12.3f}{models['p95_ms']:>12.3f}"
+              f"{fast['p50_ms']:>10.3f}{fast['p95_ms']:>10.3f}{speedup:>8.2f}x  {stats['identical']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if not all(stats['identical'] for stats in report['queries'].values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare query latency when serving from the database file and from the
+in-memory copy.
+
+    python -m benchmarks.serving_modes --db database/workflows.db --repeat 200
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from workflow_db import WorkflowDatabase
+
+
+def build_queries(db: WorkflowDatabase) -> Dict[str, Callable[[], object]]:
+    """Representative read paths of the API."""
+    return {
+        'search_all': lambda: db.search_workflows(limit=20),
+        'search_text': lambda: db.search_workflows(query='slack', limit=20),
+        'search_filtered': lambda: db.search_workflows(
+            trigger_filter='Webhook', complexity_filter='alta', limit=20),
+        'search_sorted': lambda: db.search_workflows(sort='nodes', limit=20),
+        'stats': db.get_stats,
+        'category': lambda: db.search_by_category('messaging', limit=20),
+        'node_types': lambda: db.get_node_type_catalog(limit=50),
+    }
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(db: WorkflowDatabase, repeat: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    """Time every query `repeat` times; returns milliseconds per query."""
+    results = {}
+    for name, query in build_queries(db).items():
+        for _ in range(warmup):
+            query()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'mean_ms': round(statistics.mean(samples), 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark file vs in-memory serving')
+    parser.add_argument('--db', default='database/workflows.db', help='Database file to benchmark')
+    parser.add_argument('--repeat', type=int, default=100, help='Timed runs per query')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed runs per query')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON')
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"database not found: {args.db} (run 'python run.py --reindex' first)")
+
+    report = {}
+    for mode, in_memory in (('file', False), ('memory', True)):
+        start = time.perf_counter()
+        db = WorkflowDatabase(args.db, in_memory=in_memory)
+        setup_ms = (time.perf_counter() - start) * 1000
+        report[mode] = {'setup_ms': round(setup_ms, 1),
+                        'queries': run_mode(db, args.repeat, args.warmup)}
+
+    print(f"{'query':<18}{'file p50':>10}{'file p95':>10}{'mem p50':>10}{'mem p95':>10}{'speedup':>9}")
+    for name, file_stats in report['file']['queries'].items():
+        mem_stats = report['memory']['queries'][name]
+        speedup = file_stats['p50_ms'] / mem_stats['p50_ms'] if mem_stats['p50_ms'] else 0.0
+        print(f"{name:<18}{file_stats['p50_ms']:>10.3f}{file_stats['p95_ms']:>10.3f}"
+              f"{mem_stats['p50_ms']:>10.3f}{mem_stats['p95_ms']:>10.3f}{speedup:>8.2f}x")
+    print(f"setup: file {report['file']['setup_ms']} ms, memory {report['memory']['setup_ms']} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
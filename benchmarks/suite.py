@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of indexing and queries on a synthetic corpus.
+
+Generates (or reuses) a corpus of N workflows sampled from workflows/ (see
+benchmarks.corpus), then times:
+
+- index_all_workflows: cold (empty database), warm (nothing changed) and
+  forced (every file reprocessed)
+- search_workflows across query shapes (browse, common/rare/prefix/phrase
+  text, filters, sorts, deep pages), search_node_content
+- get_stats uncached and cached, search_by_category for every category
+- generate_mermaid_diagram on a sample of the corpus
+- API cold start: import time of api_server, time until uvicorn answers and
+  until the first /api/stats response
+
+Results are written as flat metrics (e.g. ``query.search_text.p95_ms``) so
+runs can be diffed. The run fails (exit status 1) when a metric exceeds its
+budget in benchmarks/thresholds.json for the corpus size, or when --baseline
+is given and a metric is slower than the baseline by more than --tolerance.
+
+    python -m benchmarks.suite --size 10k --json results.json
+    python -m benchmarks.suite --size 100k --baseline results.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import SIZES, generate_corpus, parse_size
+from benchmarks.worker_scaling import free_port
+
+ROOT = Path(__file__).resolve().parent.parent
+THRESHOLDS = Path(__file__).resolve().parent / 'thresholds.json'
+# Metrics below this many milliseconds are too noisy to compare against a baseline
+MIN_COMPARABLE_MS = 1.0
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_call(call: Callable[[], object], repeat: int, warmup: int) -> Dict[str, float]:
+    """Time call `repeat` times; returns milliseconds."""
+    for _ in range(warmup):
+        call()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_indexing(db_path: str, corpus_dir: str) -> Dict[str, float]:
+    from workflow_db import WorkflowDatabase
+
+    metrics = {}
+    WorkflowDatabase.remove_database_files(db_path)
+    for phase, force in (('cold', False), ('warm', False), ('force', True)):
+        start = time.perf_counter()
+        db = WorkflowDatabase(db_path, in_memory=False)
+        db.workflows_dir = corpus_dir
+        stats = db.index_all_workflows(force_reindex=force)
+        seconds = time.perf_counter() - start
+        handled = stats['processed'] + stats['skipped'] + stats['errors']
+        metrics[f'index.{phase}_s'] = round(seconds, 2)
+        metrics[f'index.{phase}_files_per_s'] = round(handled / seconds, 1)
+    metrics['index.db_mb'] = round(os.path.getsize(db_path) / 1024 / 1024, 1)
+    return metrics
+
+
+def rare_integration(db) -> str:
+    """An integration used by few (but some) workflows, for selective text queries."""
+    counts = [row for row in db.get_integration_counts() if row['workflows'] >= 3]
+    return min(counts, key=lambda row: row['workflows'])['name'] if counts else 'slack'
+
+
+def build_queries(db, total: int) -> Dict[str, Callable[[], object]]:
+    """Query shapes of the API at page size 20."""
+    rare = rare_integration(db)
+    deep = max(0, min(total - 20, 5000))
+    queries = {
+        'search_all': lambda: db.search_workflows(limit=20),
+        'search_text': lambda: db.search_workflows(query='slack', limit=20),
+        'search_text_rare': lambda: db.search_workflows(query=rare, limit=20),
+        'search_prefix': lambda: db.search_workflows(query='goog*', limit=20),
+        'search_phrase': lambda: db.search_workflows(query='"google sheets"', limit=20),
+        'search_filtered': lambda: db.search_workflows(
+            trigger_filter='Webhook', complexity_filter='alta', limit=20),
+        'search_active': lambda: db.search_workflows(active_only=True, limit=20),
+        'search_sorted_nodes': lambda: db.search_workflows(sort='nodes', limit=20),
+        'search_sorted_name': lambda: db.search_workflows(sort='name', limit=20),
+        'search_text_sorted': lambda: db.search_workflows(query='http', sort='nodes', limit=20),
+        'search_deep_page': lambda: db.search_workflows(limit=20, offset=deep),
+        'search_content': lambda: db.search_node_content('openai', limit=20),
+        'stats_uncached': db._load_stats,
+        'stats_cached': db.get_stats,
+    }
+    for category in db.get_service_categories():
+        queries[f'category_{category}'] = lambda category=category: db.search_by_category(category, limit=20)
+    return queries
+
+
+def bench_mermaid(corpus_dir: str, sample: int, repeat: int, seed: int) -> Dict[str, float]:
+    # api_server opens WORKFLOW_DB_PATH at import; main() points it at the benchmark database
+    from api_server import generate_mermaid_diagram
+
+    files = sorted(name for name in os.listdir(corpus_dir) if name.endswith('.json'))
+    workflows = []
+    for name in random.Random(seed).sample(files, min(sample, len(files))):
+        with open(os.path.join(corpus_dir, name), encoding='utf-8') as f:
+            data = json.load(f)
+        workflows.append((data.get('nodes', []), data.get('connections', {})))
+    samples = []
+    for _ in range(repeat):
+        for nodes, connections in workflows:
+            start = time.perf_counter()
+            generate_mermaid_diagram(nodes, connections)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+    }
+
+
+def first_response(port: int, path: str, started: float, timeout: float = 300.0,
+                   status: int = None) -> float:
+    """Seconds from `started` until path answers (with `status`, when given)."""
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if status is None or response.status == status:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"no response from {path} within {timeout}s")
+
+
+def bench_startup(db_path: str, runs: int = 3) -> Dict[str, float]:
+    """Median cold start of the API over `runs` server processes."""
+    env = dict(os.environ, WORKFLOW_DB_PATH=db_path)
+    timings: Dict[str, List[float]] = {'import_s': [], 'listen_s': [], 'first_stats_s': []}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', 'import time; t = time.perf_counter(); import api_server; '
+                                   'print(time.perf_counter() - t)'],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        timings['import_s'].append(float(output.split()[-1]))
+
+        port = free_port()
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'api_server:app', '--port', str(port), '--log-level', 'warning'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            timings['listen_s'].append(first_response(port, '/health', started))
+            timings['first_stats_s'].append(first_response(port, '/api/stats', started, status=200))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return {key: round(statistics.median(values), 3) for key, values in timings.items()}
+
+
+def check_regressions(metrics: Dict[str, float], budgets: Dict[str, float],
+                      baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Metrics over their budget or slower than the baseline by more than tolerance."""
+    failures = []
+    for name, limit in sorted(budgets.items()):
+        if name in metrics and metrics[name] > limit:
+            failures.append(f"{name}: {metrics[name]} > budget {limit}")
+    for name, previous in sorted(baseline.items()):
+        current = metrics.get(name)
+        # only latencies regress upwards; throughput and sizes are informational
+        if current is None or not name.endswith(('_ms', '_s')):
+            continue
+        if name.endswith('_ms') and max(current, previous) < MIN_COMPARABLE_MS:
+            continue
+        if current > previous * (1 + tolerance):
+            failures.append(f"{name}: {current} vs baseline {previous} (+{(current / previous - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark indexing and queries on a synthetic corpus')
+    parser.add_argument('--size', default='10k', help='Corpus size: 10k, 100k, 1m or a number of workflows')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus and sampling seed')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'n8n-workflows-bench'),
+                        help='Where the corpus and database are kept (corpora are reused across runs)')
+    parser.add_argument('--repeat', type=int, default=30, help='Timed runs per query')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed runs per query')
+    parser.add_argument('--diagram-sample', type=int, default=200, help='Workflows rendered as Mermaid')
+    parser.add_argument('--skip-index', action='store_true', help='Reuse the existing benchmark database')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON')
+    parser.add_argument('--thresholds', default=str(THRESHOLDS), help='Budgets per corpus size (JSON)')
+    parser.add_argument('--baseline', metavar='PATH', help='Previous --json results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    count = parse_size(args.size)
+    corpus_dir = os.path.join(args.work_dir, f'corpus-{count}-seed{args.seed}')
+    db_path = os.path.join(args.work_dir, f'bench-{count}.db')
+    os.environ['WORKFLOW_DB_PATH'] = db_path
+
+    start = time.perf_counter()
+    manifest = generate_corpus(corpus_dir, count, args.seed)
+    print(f"Corpus: {count} workflows in {corpus_dir} ({time.perf_counter() - start:.1f}s)")
+
+    metrics: Dict[str, float] = {}
+    if not (args.skip_index and os.path.exists(db_path)):
+        metrics.update(bench_indexing(db_path, corpus_dir))
+
+    from workflow_db import WorkflowDatabase
+    db = WorkflowDatabase(db_path, in_memory=False)
+    db.workflows_dir = corpus_dir
+    total = db.get_stats()['total']
+    for name, query in build_queries(db, total).items():
+        for key, value in time_call(query, args.repeat, args.warmup).items():
+            metrics[f'query.{name}.{key}'] = value
+    for key, value in bench_mermaid(corpus_dir, args.diagram_sample, 3, args.seed).items():
+        metrics[f'diagram.mermaid.{key}'] = value
+    for key, value in bench_startup(db_path).items():
+        metrics[f'startup.{key}'] = value
+
+    budgets = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds) as f:
+            size_names = {value: name for name, value in SIZES.items()}
+            budgets = json.load(f).get(size_names.get(count, str(count)), {})
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['metrics']
+    failures = check_regressions(metrics, budgets, baseline, args.tolerance)
+
+    report: Dict[str, Any] = {
+        'meta': {
+            'size': count,
+            'seed': args.seed,
+            'corpus_bytes': manifest['bytes'],
+            'indexed_workflows': total,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'metrics': metrics,
+        'failures': failures,
+    }
+
+    print(f"\n{'metric':<44}{'value':>12}{'budget':>10}")
+    for name, value in metrics.items():
+        budget = budgets.get(name, '')
+        print(f"{name:<44}{value:>12}{budget:>10}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Measure API throughput as the number of server worker processes grows.
+
+Starts `uvicorn api_server:app --workers N` for each N, drives it with
+concurrent keep-alive clients for a fixed duration and reports requests per
+second and latency percentiles.
+
+    python -m benchmarks.worker_scaling --db database/workflows.db --workers 1 2 4
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PATHS = [
+    '/api/workflows?per_page=20',
+    '/api/workflows?q=slack&per_page=20',
+    '/api/workflows?trigger=Webhook&complexity=alta',
+    '/api/stats',
+    '/api/workflows/category/messaging?per_page=20',
+    '/api/node-types?per_page=50',
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port: int, timeout: float = 60.0, path: str = '/ready'):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def drive(port: int, clients: int, duration: float) -> Dict[str, float]:
+    """Run `clients` keep-alive clients for `duration` seconds."""
+    latencies: List[float] = []
+    failures = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(offset: int):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        samples, errors, i = [], 0, offset
+        while time.time() < stop_at:
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+            except OSError:
+                errors += 1
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            samples.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(samples)
+            failures[0] += errors
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    pick = lambda fraction: round(latencies[int(fraction * (len(latencies) - 1))] * 1000, 2) if latencies else 0.0
+    return {
+        'requests': len(latencies),
+        'errors': failures[0],
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def run_workers(workers: int, args) -> Dict[str, float]:
+    port = free_port()
+    env = dict(os.environ, WORKFLOW_DB_PATH=os.path.abspath(args.db))
+    if args.in_memory:
+        env['WORKFLOW_DB_IN_MEMORY'] = '1'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_server:app', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        drive(port, args.clients, min(2.0, args.duration))  # warm every worker
+        return dict(drive(port, args.clients, args.duration), workers=workers)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API throughput by worker count')
+    parser.add_argument('--db', default='database/workflows.db', help='Database file to serve')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to test')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per worker count')
+    parser.add_argument('--in-memory', action='store_true', help='Serve from the in-memory database copy')
+    parser.add_argument('--json', metavar='PATH', help='Also write results as JSON')
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"database not found: {args.db} (run 'python run.py --reindex' first)")
+
+    print(f"CPUs: {os.cpu_count()}, clients: {args.clients}, duration: {args.duration}s")
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    results = []
+    for workers in args.workers:
+        result = run_workers(workers, args)
+        results.append(result)
+        print(f"{workers:>8}{result['requests_per_second']:>10}{result['p50_ms']:>9}"
+              f"{result['p95_ms']:>9}{result['p99_ms']:>9}{result['errors']:>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
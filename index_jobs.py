@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Reindex job manager.
+
+Runs WorkflowDatabase.rebuild_index in a separate process so indexing does not
+compete with request handling for the GIL, and coalesces concurrent reindex
+requests into a single job (single-flight).
+
+Job state lives in a directory next to the database (<db>.jobs/) and is
+guarded by a file lock, so every server worker sees the same jobs and
+single-flight holds across workers.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from workflow_metrics import record_index_run, reindex_jobs
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process coordination only
+    fcntl = None
+
+
+def _run_rebuild(db_path: str, workflows_dir: str, force_reindex: bool, events) -> None:
+    """Child process entry point: rebuild the index and stream progress back."""
+    from workflow_shards import open_workflow_database
+
+    try:
+        db = open_workflow_database(db_path, in_memory=False)
+        db.workflows_dir = workflows_dir
+        stats = db.rebuild_index(
+            force_reindex=force_reindex,
+            progress=lambda counts: events.put(('progress', counts))
+        )
+        events.put(('completed', stats))
+    except Exception as e:
+        events.put(('failed', str(e)))
+
+
+class ReindexJobManager:
+    """Single-flight, out-of-process reindex jobs with progress reporting.
+
+    At most one job runs at a time. A request that arrives while a job is
+    running joins it, unless it asks for a forced rebuild the running job does
+    not cover; then one follow-up job is queued, and later requests join that.
+    """
+
+    # Finished jobs kept for status queries
+    HISTORY_SIZE = 20
+
+    def __init__(self, db_path: str, workflows_dir: str = "workflows"):
+        self.db_path = db_path
+        self.workflows_dir = workflows_dir
+        self.state_dir = os.path.abspath(db_path) + '.jobs'
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # spawn: never fork a server process that holds threads and SQLite handles
+        self._context = multiprocessing.get_context('spawn')
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive access to the job queue across threads and processes."""
+        with self._lock:
+            with open(os.path.join(self.state_dir, 'lock'), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.state_dir, name + '.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, name: str, data: Dict[str, Any]):
+        """Replace a state file atomically so readers never see a partial write."""
+        path = os.path.join(self.state_dir, name + '.json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def submit(self, force_reindex: bool = False) -> Dict[str, Any]:
+        """Start a reindex or join the one already covering this request."""
+        with self._locked():
+            state = self._reap(self._read('queue') or {'active': None, 'pending': None})
+            for job_id in (state['pending'], state['active']):
+                job = job_id and self._read(job_id)
+                if job and (job['force'] or not force_reindex):
+                    self._write('queue', state)
+                    return dict(self._snapshot(job), coalesced=True)
+
+            job = {
+                'job_id': uuid.uuid4().hex[:12],
+                'status': 'queued',
+                'force': force_reindex,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'pid': None,
+                'total': 0,
+                'processed': 0,
+                'skipped': 0,
+                'errors': 0,
+                'generation': None,
+                'swapped': None,
+                'error': None,
+            }
+            self._write(job['job_id'], job)
+            if state['active'] is None:
+                self._start(job)
+                state['active'] = job['job_id']
+            else:
+                state['pending'] = job['job_id']
+            self._write('queue', state)
+            self._trim_history()
+            return dict(self._snapshot(job), coalesced=False)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None when unknown."""
+        if not job_id.isalnum():
+            return None
+        job = self._read(job_id)
+        if job is None:
+            return None
+        if job['status'] == 'running' and not self._alive(job['pid']):
+            with self._locked():
+                self._write('queue', self._reap(self._read('queue') or {'active': None, 'pending': None}))
+            job = self._read(job_id)
+        return self._snapshot(job)
+
+    @staticmethod
+    def _alive(pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _reap(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Fail an active job whose process is gone and promote the pending one.
+
+        Covers servers restarted or killed mid-job. Caller holds the lock.
+        """
+        job = state['active'] and self._read(state['active'])
+        if state['active'] and (job is None or not self._alive(job.get('pid'))):
+            if job and job['status'] == 'running':
+                job.update(status='failed', finished_at=time.time(),
+                           error='indexer process is no longer running')
+                self._write(job['job_id'], job)
+            state['active'] = None
+        if state['active'] is None and state['pending']:
+            pending = self._read(state['pending'])
+            state['pending'] = None
+            if pending:
+                self._start(pending)
+                state['active'] = pending['job_id']
+        return state
+
+    def _start(self, job: Dict[str, Any]):
+        """Launch the worker process for a job. Caller holds the lock."""
+        events = self._context.Queue()
+        process = self._context.Process(
+            target=_run_rebuild,
+            args=(self.db_path, self.workflows_dir, job['force'], events),
+            name=f"reindex-{job['job_id']}",
+            # Not a daemon: a sharded index builds its shards in child processes
+            daemon=False
+        )
+        process.start()
+        job.update(status='running', started_at=time.time(), pid=process.pid)
+        self._write(job['job_id'], job)
+        threading.Thread(
+            target=self._monitor, args=(dict(job), process, events),
+            name=f"reindex-monitor-{job['job_id']}", daemon=True
+        ).start()
+
+    def _monitor(self, job: Dict[str, Any], process, events):
+        """Record progress events from the worker until it exits."""
+        outcome = None
+        while outcome is None:
+            try:
+                kind, payload = events.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    outcome = ('failed', f"indexer exited with code {process.exitcode}")
+                continue
+            if kind == 'progress':
+                job.update(payload)
+                self._write(job['job_id'], job)
+            else:
+                outcome = (kind, payload)
+        process.join()
+
+        kind, payload = outcome
+        job.update(status=kind, finished_at=time.time())
+        if kind == 'completed':
+            job.update({key: payload[key] for key in ('processed', 'skipped', 'errors') if key in payload})
+            job['swapped'] = payload.get('swapped')
+            job['generation'] = payload.get('generation')
+        else:
+            job['error'] = payload
+        reindex_jobs.inc(kind)
+        if kind == 'completed':
+            record_index_run('job', job, job['finished_at'] - job['started_at'])
+        with self._locked():
+            self._write(job['job_id'], job)
+            state = self._read('queue') or {'active': None, 'pending': None}
+            if state['active'] == job['job_id']:
+                state['active'] = None
+            self._write('queue', self._reap(state))
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job state with derived throughput and ETA."""
+        job = dict(job)
+        job.pop('pid', None)
+        done = job['processed'] + job['skipped'] + job['errors']
+        elapsed = None
+        if job['started_at']:
+            elapsed = (job['finished_at'] or time.time()) - job['started_at']
+        files_per_second = done / elapsed if elapsed and done else 0.0
+        eta = None
+        if job['status'] == 'running' and files_per_second and job['total']:
+            eta = round(max(job['total'] - done, 0) / files_per_second, 1)
+        elif job['status'] == 'completed':
+            eta = 0.0
+        job.update({
+            'elapsed_seconds': round(elapsed, 2) if elapsed is not None else None,
+            'files_per_second': round(files_per_second, 1),
+            'eta_seconds': eta,
+        })
+        return job
+
+    def _trim_history(self):
+        """Drop the oldest finished jobs beyond HISTORY_SIZE. Caller holds the lock."""
+        jobs = []
+        for name in os.listdir(self.state_dir):
+            if name.endswith('.json') and name != 'queue.json':
+                job = self._read(name[:-5])
+                if job and job['status'] in ('completed', 'failed'):
+                    jobs.append((job['created_at'], job['job_id']))
+        for _, job_id in sorted(jobs)[:max(0, len(jobs) - self.HISTORY_SIZE)]:
+            os.unlink(os.path.join(self.state_dir, job_id + '.json'))
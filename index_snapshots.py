@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Versioned index snapshots.
+
+An indexing host publishes immutable, checksummed copies of the database to a
+shared directory; API nodes install the newest one and poll for later
+versions instead of indexing workflows/ themselves.
+
+Layout of the snapshot directory:
+
+    <dir>/<version>/workflows.db      read-only database (rollback journal mode)
+    <dir>/<version>/manifest.json     version, sha256, size, generation, counts
+    <dir>/LATEST                      name of the newest complete version
+
+A version directory is renamed into place only when complete, and LATEST is
+replaced atomically afterwards, so readers never see a partial snapshot.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process install lock
+    fcntl = None
+
+SNAPSHOT_DB_NAME = 'workflows.db'
+MANIFEST_NAME = 'manifest.json'
+LATEST_NAME = 'LATEST'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def latest_version(snapshot_dir: str) -> Optional[str]:
+    """Name of the newest published version, or None."""
+    try:
+        with open(os.path.join(snapshot_dir, LATEST_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(snapshot_dir: str, version: str) -> Dict[str, Any]:
+    with open(os.path.join(snapshot_dir, version, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def publish_snapshot(db, snapshot_dir: str, keep: int = 5) -> Dict[str, Any]:
+    """Publish the database of `db` (a WorkflowDatabase) as a new snapshot version.
+
+    Keeps the newest `keep` versions. Returns the manifest.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=snapshot_dir)
+    try:
+        snapshot_path = os.path.join(staging, SNAPSHOT_DB_NAME)
+        source = sqlite3.connect(db.db_path)
+        target = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(target)
+            # One self-contained file: no -wal/-shm next to a read-only snapshot
+            target.execute("PRAGMA journal_mode=DELETE")
+            generation = target.execute(
+                "SELECT value FROM index_meta WHERE key = 'generation'").fetchone()
+            workflows = target.execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+        finally:
+            source.close()
+            target.close()
+
+        problems = db.validate_database(snapshot_path, min_workflows=1)
+        if problems:
+            raise ValueError("; ".join(problems))
+
+        checksum = file_sha256(snapshot_path)
+        current = latest_version(snapshot_dir)
+        if current:
+            manifest = read_manifest(snapshot_dir, current)
+            if manifest['sha256'] == checksum:
+                # Identical index: keep serving the current version
+                shutil.rmtree(staging, ignore_errors=True)
+                return manifest
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        version = f"{created_at.strftime('%Y%m%dT%H%M%S%fZ')}-{checksum[:12]}"
+        manifest = {
+            'version': version,
+            'created_at': created_at.isoformat(),
+            'sha256': checksum,
+            'size': os.path.getsize(snapshot_path),
+            'generation': int(generation[0]) if generation else 0,
+            'workflows': workflows,
+            'file': SNAPSHOT_DB_NAME,
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        for name in (SNAPSHOT_DB_NAME, MANIFEST_NAME):
+            os.chmod(os.path.join(staging, name), 0o444)
+        os.chmod(staging, 0o755)  # mkdtemp creates it private to this user
+
+        os.rename(staging, os.path.join(snapshot_dir, version))
+        _write_atomic(os.path.join(snapshot_dir, LATEST_NAME), version + '\n')
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    versions = sorted(name for name in os.listdir(snapshot_dir)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(snapshot_dir, name)))
+    for old in versions[:max(0, len(versions) - keep)]:
+        if old != version:
+            shutil.rmtree(os.path.join(snapshot_dir, old), ignore_errors=True)
+    return manifest
+
+
+class SnapshotFollower:
+    """Keep a local database in sync with the newest published snapshot.
+
+    Installing copies the snapshot next to db_path, verifies its checksum and
+    swaps it in with WorkflowDatabase.swap_database_file, so readers move to it
+    on their next connection. Server workers share an install lock and the
+    installed version marker, so each version is installed once per host.
+    """
+
+    def __init__(self, db, snapshot_dir: str, interval: float = 30.0):
+        self.db = db
+        self.snapshot_dir = snapshot_dir
+        self.interval = interval
+        self.marker_path = db.db_path + '.snapshot'
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def installed_version(self) -> Optional[str]:
+        try:
+            with open(self.marker_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def sync(self) -> Optional[str]:
+        """Install the latest snapshot if it is newer than the local one.
+
+        Returns the installed version, or None when nothing changed.
+        """
+        version = latest_version(self.snapshot_dir)
+        if not version or version == self.installed_version():
+            return None
+        with open(self.marker_path + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another worker may have installed it while we waited
+                if version == self.installed_version():
+                    return None
+                self._install(version)
+                return version
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _install(self, version: str):
+        manifest = read_manifest(self.snapshot_dir, version)
+        source = os.path.join(self.snapshot_dir, version, manifest['file'])
+        directory = os.path.dirname(os.path.abspath(self.db.db_path))
+        local_path = os.path.join(directory, f"{os.path.basename(self.db.db_path)}.v{time.time_ns()}")
+        shutil.copyfile(source, local_path)
+        try:
+            checksum = file_sha256(local_path)
+            if checksum != manifest['sha256']:
+                raise ValueError(f"snapshot {version}: checksum mismatch ({checksum} != {manifest['sha256']})")
+            problems = self.db.validate_database(local_path, min_workflows=1)
+            if problems:
+                raise ValueError(f"snapshot {version}: " + "; ".join(problems))
+            conn = sqlite3.connect(local_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.close()
+            self.db.swap_database_file(local_path)
+        except Exception:
+            self.db.remove_database_files(local_path)
+            raise
+        _write_atomic(self.marker_path, version + '\n')
+        print(f"✅ Snapshot {version} instalado ({manifest['workflows']} workflows)")
+
+    def start(self):
+        """Poll for new versions in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='snapshot-follower', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"❌ Falha ao instalar snapshot: {e}")
@@ -35,6 +35,11 @@ def check_requirements() -> bool:
     except ImportError:
         missing_deps.append("fastapi")
     
+    try:
+        import numpy
+    except ImportError:
+        missing_deps.append("numpy")
+    
     if missing_deps:
         print(f"❌ Missing dependencies: {', '.join(missing_deps)}")
         print("💡 Install with: pip install -r requirements.txt")
@@ -56,16 +61,25 @@ def setup_directories():
 
 def setup_database(force_reindex: bool = False) -> str:
     """Setup and initialize the database."""
-    from workflow_db import WorkflowDatabase
+    from workflow_shards import open_workflow_database
     
     db_path = "database/workflows.db"
     
     print(f"🔄 Setting up database: {db_path}")
-    db = WorkflowDatabase(db_path)
-    
-    # Check if database has data or force reindex
-    stats = db.get_stats()
-    if stats['total'] == 0 or force_reindex:
+    db = open_workflow_database(db_path)
+    
+    snapshot_dir = os.environ.get('WORKFLOW_SNAPSHOT_DIR')
+    if snapshot_dir:
+        # API nodes install published snapshots instead of indexing locally
+        from index_snapshots import SnapshotFollower
+        follower = SnapshotFollower(db, snapshot_dir)
+        follower.sync()
+        version = follower.installed_version()
+        print(f"📦 Following snapshots in {snapshot_dir} (installed: {version or 'none yet'})")
+        return db_path
+    
+    # An empty database is indexed by the server in the background (see /ready)
+    if force_reindex:
         print("📚 Indexing workflows...")
         index_stats = db.index_all_workflows(force_reindex=True)
         print(f"✅ Indexed {index_stats['processed']} workflows")
@@ -73,13 +87,16 @@ def setup_database(force_reindex: bool = False) -> str:
         # Show final stats
         final_stats = db.get_stats()
         print(f"📊 Database contains {final_stats['total']} workflows")
+    elif db.has_workflows():
+        print("✅ Database ready")
     else:
-        print(f"✅ Database ready: {stats['total']} workflows")
+        print("📚 Database is empty: the server will index it in the background (progress at /ready)")
     
     return db_path
 
 
-def start_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False):
+def start_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False,
+                 in_memory: bool = False, workers: int = 1):
     """Start the FastAPI server."""
     print(f"🌐 Starting server at http://{host}:{port}")
     print(f"📊 API Documentation: http://{host}:{port}/docs")
@@ -90,6 +107,16 @@ def start_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False
     
     # Configure database path
     os.environ['WORKFLOW_DB_PATH'] = "database/workflows.db"
+    if in_memory:
+        # Serve reads from a RAM copy of the database, refreshed on reindex
+        os.environ['WORKFLOW_DB_IN_MEMORY'] = "1"
+        print("🧠 Serving queries from an in-memory copy of the database")
+    if workers > 1:
+        if reload:
+            print("⚠️  --workers is ignored in development mode (--dev)")
+            workers = 1
+        else:
+            print(f"👥 Starting {workers} worker processes")
     
     # Start uvicorn with better configuration
     import uvicorn
@@ -98,6 +125,7 @@ def start_server(host: str = "127.0.0.1", port: int = 8000, reload: bool = False
         host=host, 
         port=port, 
         reload=reload,
+        workers=workers,
         log_level="info",
         access_log=False  # Reduce log noise
     )
@@ -115,6 +143,10 @@ Examples:
   python run.py --host 0.0.0.0     # Accept external connections
   python run.py --reindex          # Force database reindexing
   python run.py --dev              # Development mode with auto-reload
+  python run.py --in-memory        # Serve queries from an in-memory database copy
+  python run.py --workers 4        # Serve with 4 worker processes
+  python run.py --shards 8         # Split the index into 8 shard files
+  python run.py --snapshots /shared/index  # Serve published snapshots, never index locally
         """
     )
     
@@ -139,9 +171,40 @@ Examples:
         action="store_true", 
         help="Development mode with auto-reload"
     )
+    parser.add_argument(
+        "--in-memory", 
+        action="store_true", 
+        help="Load the database into memory and serve read-only queries from it"
+    )
+    parser.add_argument(
+        "--workers", 
+        type=int, 
+        default=1, 
+        help="Number of server worker processes (default: 1)"
+    )
+    parser.add_argument(
+        "--shards", 
+        type=int, 
+        default=1, 
+        help="Split the index into N shard files searched in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--snapshots", 
+        metavar="DIR", 
+        help="Install and follow index snapshots published with 'workflow_db.py --publish DIR'"
+    )
     
     args = parser.parse_args()
     
+    if args.snapshots and args.shards > 1:
+        # Snapshots are single database files; a sharded index cannot install them
+        parser.error("--snapshots cannot be combined with --shards > 1")
+    if args.shards > 1:
+        # Read by every WorkflowDatabase opened from here on, including server workers
+        os.environ['WORKFLOW_DB_SHARDS'] = str(args.shards)
+    if args.snapshots:
+        os.environ['WORKFLOW_SNAPSHOT_DIR'] = os.path.abspath(args.snapshots)
+    
     print_banner()
     
     # Check dependencies
@@ -163,7 +226,9 @@ Examples:
         start_server(
             host=args.host, 
             port=args.port, 
-            reload=args.dev
+            reload=args.dev,
+            in_memory=args.in_memory,
+            workers=args.workers
         )
     except KeyboardInterrupt:
         print("\n👋 Server stopped!")
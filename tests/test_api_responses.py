@@ -0,0 +1,139 @@
+"""
+API response serialization tests.
+
+Serves a fixture corpus of workflows that require credentials (and so carry a
+packed requirement_mask in their rows) and checks that the detail, search and
+credential coverage endpoints answer with valid JSON without internal columns.
+Requests go through the ASGI app in process, without a server.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import api_server  # noqa: E402
+from workflow_fixtures import index_workflows, node, workflow  # noqa: E402
+
+CORPUS = {
+    '0001_Notify_Slack_Webhook.json': workflow(
+        [node('Webhook', 'webhook', {'path': 'orders'}),
+         node('Slack', 'slack', {'channel': '#orders'}, credentials=['slackApi'])],
+        [('Webhook', 'Slack')]),
+    '0002_Summarize_Openai_Scheduled.json': workflow(
+        [node('Cron', 'cron'),
+         node('Fetch', 'postgres', {'query': 'SELECT * FROM orders'}, credentials=['postgres']),
+         node('Summarize', 'openAi', {'model': 'gpt-4o'}, credentials=['openAiApi'])],
+        [('Cron', 'Fetch'), ('Fetch', 'Summarize')]),
+}
+
+INTERNAL_COLUMNS = ('requirement_mask', 'summary_json')
+
+
+def asgi_get(app, path, params=None):
+    """Send one GET request through an ASGI app. Returns (status, body bytes)."""
+    query = urlencode(params or {}, doseq=True).encode('ascii')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode('ascii'), 'query_string': query,
+             'root_path': '', 'headers': [(b'host', b'testserver')],
+             'client': ('127.0.0.1', 1234), 'server': ('testserver', 80)}
+    response = {'status': None, 'body': b''}
+
+    async def run():
+        finished = asyncio.Event()
+        pending = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            # The request once; like a real client, disconnect only after the response
+            if pending:
+                return pending.pop()
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+                if not message.get('more_body'):
+                    finished.set()
+
+        await app(scope, receive, send)
+
+    asyncio.run(run())
+    return response['status'], response['body']
+
+
+class ApiResponseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='api-')
+        cls.db = index_workflows(cls.tmp, CORPUS)
+        # The detail endpoints read workflows/<filename> relative to the working directory
+        cls.cwd = os.getcwd()
+        os.chdir(cls.tmp)
+        cls.previous_db, api_server.db = api_server.db, cls.db
+
+    @classmethod
+    def tearDownClass(cls):
+        api_server.db = cls.previous_db
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def get_json(self, path, params=None):
+        status, body = asgi_get(api_server.app, path, params)
+        self.assertEqual(status, 200, body[:300])
+        return json.loads(body)
+
+    def assert_public(self, workflow_meta):
+        for column in INTERNAL_COLUMNS:
+            self.assertNotIn(column, workflow_meta)
+
+    def test_detail(self):
+        for filename in CORPUS:
+            with self.subTest(filename=filename):
+                detail = self.get_json(f'/api/workflows/{filename}')
+                self.assert_public(detail['metadata'])
+                self.assertEqual(detail['metadata']['filename'], filename)
+                self.assertEqual(detail['raw_json']['nodes'], CORPUS[filename]['nodes'])
+
+    def test_detail_after_the_file_changed(self):
+        # A stale stat stamp skips the stored variants and reads the file instead
+        filename = '0001_Notify_Slack_Webhook.json'
+        path = os.path.join('workflows', filename)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        try:
+            detail = self.get_json(f'/api/workflows/{filename}')
+        finally:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assert_public(detail['metadata'])
+        self.assertEqual(detail['raw_json']['nodes'], CORPUS[filename]['nodes'])
+
+    def test_search(self):
+        for params in ({}, {'q': 'slack'}, {'fields': 'name,integrations'}, {'format': 'columnar'}):
+            with self.subTest(params=params):
+                result = self.get_json('/api/workflows', params)
+                self.assertGreater(result['total'], 0)
+                for workflow_meta in result.get('workflows', []):
+                    self.assert_public(workflow_meta)
+                self.assertFalse(set(result.get('columns', {})) & set(INTERNAL_COLUMNS))
+
+    def test_credential_coverage(self):
+        result = self.get_json('/api/credential-coverage',
+                               {'credentials': ['slackApi', 'postgres', 'openAiApi']})
+        self.assertEqual(sorted(w['filename'] for w in result['workflows']), sorted(CORPUS))
+        for workflow_meta in result['workflows']:
+            self.assert_public(workflow_meta)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Credential coverage search tests.
+
+Indexes a small fixture corpus with known credential types and checks that
+search_by_credentials returns exactly the workflows whose credentials are all
+available, including after a reindex changes what a workflow requires.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_fixtures import index_workflows, node, workflow, write_workflows  # noqa: E402
+
+SLACK = '0001_Notify_Slack_Webhook.json'
+SLACK_GMAIL = '0002_Notify_Slack_Gmail_Webhook.json'
+HTTP = '0003_Fetch_Http_Scheduled.json'
+NO_CREDENTIALS = '0004_Echo_Webhook.json'
+
+
+def slack_gmail(gmail_credential='gmailOAuth2'):
+    return workflow(
+        [node('Webhook', 'webhook'),
+         node('Slack', 'slack', credentials=['slackApi']),
+         node('Gmail', 'gmail', credentials=[gmail_credential] if gmail_credential else None)],
+        [('Webhook', 'Slack'), ('Slack', 'Gmail')])
+
+
+CORPUS = {
+    SLACK: workflow([node('Webhook', 'webhook'), node('Slack', 'slack', credentials=['slackApi'])],
+                    [('Webhook', 'Slack')]),
+    SLACK_GMAIL: slack_gmail(),
+    HTTP: workflow([node('Cron', 'cron'), node('Fetch', 'httpRequest', credentials=['httpBasicAuth'])],
+                   [('Cron', 'Fetch')]),
+    NO_CREDENTIALS: workflow([node('Webhook', 'webhook'), node('Set', 'set')], [('Webhook', 'Set')]),
+}
+
+
+class CredentialSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='credentials-')
+        self.db = index_workflows(self.tmp, CORPUS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def search(self, credentials, **kwargs):
+        """(sorted filenames, unknown) of a credential search."""
+        results, total, unknown = self.db.search_by_credentials(credentials, limit=len(CORPUS), **kwargs)
+        self.assertEqual(total, len(results))
+        return sorted(result['filename'] for result in results), unknown
+
+    def test_every_required_credential_must_be_available(self):
+        self.assertEqual(self.search(['slackApi']), ([SLACK], []))
+        self.assertEqual(self.search(['gmailOAuth2']), ([], []))
+        self.assertEqual(self.search(['slackApi', 'gmailOAuth2']), ([SLACK, SLACK_GMAIL], []))
+        self.assertEqual(self.search(['slackApi', 'gmailOAuth2', 'httpBasicAuth']),
+                         ([SLACK, SLACK_GMAIL, HTTP], []))
+
+    def test_unknown_credentials_are_reported(self):
+        self.assertEqual(self.search(['slackApi', 'noSuchCredentialApi']), ([SLACK], ['noSuchCredentialApi']))
+        self.assertEqual(self.search([]), ([], []))
+
+    def test_include_no_credentials(self):
+        self.assertEqual(self.search(['slackApi'], include_no_credentials=True), ([SLACK, NO_CREDENTIALS], []))
+        self.assertEqual(self.search([], include_no_credentials=True), ([NO_CREDENTIALS], []))
+
+    def test_integrations_must_be_available_when_given(self):
+        credentials = ['slackApi', 'gmailOAuth2']
+        self.assertEqual(self.search(credentials, integrations=['Webhook', 'Slack']), ([SLACK], []))
+        self.assertEqual(self.search(credentials, integrations=['Webhook', 'Slack', 'Gmail']),
+                         ([SLACK, SLACK_GMAIL], []))
+        self.assertEqual(self.search(credentials, integrations=[]), ([], []))
+
+    def test_reindex_between_searches(self):
+        self.assertEqual(self.search(['slackApi']), ([SLACK], []))
+        # Drop the Gmail credential: the workflow now only needs slackApi
+        write_workflows(self.db.workflows_dir, {SLACK_GMAIL: slack_gmail(gmail_credential=None)})
+        self.assertEqual(self.db.index_all_workflows()['processed'], 1)
+        self.assertEqual(self.search(['slackApi']), ([SLACK, SLACK_GMAIL], []))
+        # Require a credential type never seen before
+        write_workflows(self.db.workflows_dir, {SLACK_GMAIL: slack_gmail(gmail_credential='gmailApi')})
+        self.db.index_all_workflows()
+        self.assertEqual(self.search(['slackApi']), ([SLACK], []))
+        self.assertEqual(self.search(['slackApi', 'gmailApi']), ([SLACK, SLACK_GMAIL], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
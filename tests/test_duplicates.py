@@ -0,0 +1,99 @@
+"""
+Duplicate clustering tests.
+
+Indexes a small fixture corpus (a base workflow, an exact copy with renamed
+and moved nodes, a near copy with one changed parameter and an unrelated
+workflow) and checks cluster membership, duplicate_of and duplicate_kind.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_fixtures import index_workflows, node, workflow  # noqa: E402
+
+
+def order_alert(channel='#alerts', prefix='', position=(0, 0)):
+    """Webhook -> Set -> Slack with enough parameters for a stable simhash."""
+    fields = {f'field{i}': f'value {i}' for i in range(80)}
+    nodes = [node(prefix + 'Webhook', 'webhook', {'path': 'orders', 'httpMethod': 'POST'}),
+             node(prefix + 'Set', 'set', {'values': fields}),
+             node(prefix + 'Slack', 'slack', {'channel': channel, 'text': 'New order'}, credentials=['slackApi'])]
+    for item in nodes:
+        item['position'] = list(position)
+    return workflow(nodes, [(prefix + 'Webhook', prefix + 'Set'), (prefix + 'Set', prefix + 'Slack')])
+
+
+CORPUS = {
+    '0001_Order_Alert_Webhook.json': order_alert(),
+    '0002_Order_Alert_Copy_Webhook.json': order_alert(prefix='Copy of ', position=(400, 200)),
+    '0003_Order_Alert_Orders_Webhook.json': order_alert(channel='#orders'),
+    '0004_Daily_Report_Scheduled.json': workflow(
+        [node('Cron', 'cron', {'triggerTimes': {'item': [{'hour': 6}]}}),
+         node('Sheets', 'googleSheets', {'operation': 'append', 'sheetId': 'report'})],
+        [('Cron', 'Sheets')]),
+}
+
+
+class DuplicateClusterTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='duplicates-')
+        cls.db = index_workflows(cls.tmp, CORPUS)
+        conn = sqlite3.connect(cls.db.db_path)
+        conn.row_factory = sqlite3.Row
+        cls.rows = {row['filename']: row for row in conn.execute(
+            "SELECT id, filename, content_hash, duplicate_of, duplicate_kind, duplicate_count FROM workflows")}
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def graph(self, filename):
+        document = CORPUS[filename]
+        return {'nodes': document['nodes'], 'connections': document['connections']}
+
+    def test_fixture_copies_fingerprint_as_intended(self):
+        base = self.db.compute_fingerprint(**self.graph('0001_Order_Alert_Webhook.json'))
+        exact = self.db.compute_fingerprint(**self.graph('0002_Order_Alert_Copy_Webhook.json'))
+        near = self.db.compute_fingerprint(**self.graph('0003_Order_Alert_Orders_Webhook.json'))
+        self.assertEqual(exact[0], base[0])
+        self.assertNotEqual(near[0], base[0])
+        distance = bin((base[1] ^ near[1]) & ((1 << 64) - 1)).count('1')
+        self.assertLessEqual(distance, self.db.NEAR_DUPLICATE_DISTANCE)
+
+    def test_copies_point_at_the_canonical_workflow(self):
+        canonical = self.rows['0001_Order_Alert_Webhook.json']
+        exact = self.rows['0002_Order_Alert_Copy_Webhook.json']
+        near = self.rows['0003_Order_Alert_Orders_Webhook.json']
+        self.assertIsNone(canonical['duplicate_of'])
+        self.assertEqual(canonical['duplicate_count'], 2)
+        self.assertEqual((exact['duplicate_of'], exact['duplicate_kind']), (canonical['id'], 'exact'))
+        self.assertEqual((near['duplicate_of'], near['duplicate_kind']), (canonical['id'], 'near'))
+
+    def test_unrelated_workflow_is_not_clustered(self):
+        row = self.rows['0004_Daily_Report_Scheduled.json']
+        self.assertIsNone(row['duplicate_of'])
+        self.assertIsNone(row['duplicate_kind'])
+        self.assertFalse(row['duplicate_count'])
+
+    def test_duplicate_groups(self):
+        groups, total = self.db.get_duplicate_groups()
+        self.assertEqual(total, 1)
+        self.assertEqual(groups[0]['canonical']['filename'], '0001_Order_Alert_Webhook.json')
+        self.assertEqual(groups[0]['size'], 3)
+        self.assertEqual([(d['filename'], d['kind']) for d in groups[0]['duplicates']],
+                         [('0002_Order_Alert_Copy_Webhook.json', 'exact'),
+                          ('0003_Order_Alert_Orders_Webhook.json', 'near')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Graph pattern search tests.
+
+Indexes a small fixture corpus with known node graphs and checks which
+workflows (and which nodes) single node, chain, branch and non-matching
+patterns find.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_fixtures import index_workflows, node, workflow  # noqa: E402
+
+CORPUS = {
+    # Webhook -> IF -> Slack, IF -> Gmail
+    '0001_Route_Order_Webhook.json': workflow(
+        [node('Webhook', 'webhook', {'path': 'orders'}),
+         node('Check Total', 'if'),
+         node('Notify', 'slack', {'channel': '#orders'}),
+         node('Mail Customer', 'gmail')],
+        [('Webhook', 'Check Total'), ('Check Total', 'Notify'), ('Check Total', 'Mail Customer')]),
+    # Webhook -> Slack
+    '0002_Forward_Webhook.json': workflow(
+        [node('Webhook', 'webhook', {'path': 'forward'}),
+         node('Slack', 'slack', {'channel': '#general'})],
+        [('Webhook', 'Slack')]),
+    # Cron -> HTTP Request -> Slack, and an unconnected Code node
+    '0003_Poll_Status_Scheduled.json': workflow(
+        [node('Cron', 'cron'),
+         node('Fetch', 'httpRequest', {'url': 'https://status.example.com'}),
+         node('Post', 'slack', {'channel': '#status'}),
+         node('Scratch', 'code', {'jsCode': 'return items;'})],
+        [('Cron', 'Fetch'), ('Fetch', 'Post')]),
+}
+
+
+class GraphPatternTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='patterns-')
+        cls.db = index_workflows(cls.tmp, CORPUS)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def search(self, pattern):
+        """{filename: matched_nodes} for every workflow matching pattern."""
+        results, total = self.db.search_graph_pattern(pattern, limit=len(CORPUS))
+        self.assertEqual(total, len(results))
+        return {result['filename']: result['matched_nodes'] for result in results}
+
+    def test_single_node(self):
+        self.assertEqual(self.search('Slack'), {
+            '0001_Route_Order_Webhook.json': ['Notify'],
+            '0002_Forward_Webhook.json': ['Slack'],
+            '0003_Poll_Status_Scheduled.json': ['Post'],
+        })
+        # A node without connections is found through workflow_node_types
+        self.assertEqual(self.search('Code'), {'0003_Poll_Status_Scheduled.json': ['Scratch']})
+
+    def test_chain(self):
+        self.assertEqual(self.search('Webhook -> IF -> Slack'),
+                         {'0001_Route_Order_Webhook.json': ['Webhook', 'Check Total', 'Notify']})
+        # Only direct connections count: 0001 has Webhook and Slack two steps apart
+        self.assertEqual(list(self.search('Webhook -> Slack')), ['0002_Forward_Webhook.json'])
+        self.assertEqual(self.search('* -> HttpRequest -> *'),
+                         {'0003_Poll_Status_Scheduled.json': ['Cron', 'Fetch', 'Post']})
+
+    def test_branch(self):
+        self.assertEqual(self.search('Webhook -> c:IF -> Slack; c -> Gmail'),
+                         {'0001_Route_Order_Webhook.json': ['Webhook', 'Check Total', 'Notify', 'Mail Customer']})
+        self.assertEqual(self.search('c:IF -> Slack; c -> Slack'), {})
+
+    def test_no_match(self):
+        self.assertEqual(self.search('Slack -> Webhook'), {})
+        self.assertEqual(self.search('Telegram'), {})
+        self.assertEqual(self.search('Cron -> * -> Gmail'), {})
+
+    def test_invalid_patterns(self):
+        for pattern in ('', 'Webhook -> -> Slack', 'a:IF -> a', 'a:IF -> Slack; a:IF -> Gmail'):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    self.db.search_graph_pattern(pattern)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Query plan regression tests.
+
+Runs EXPLAIN QUERY PLAN on the statements issued by search_workflows for
+every combination of its filters and sort options, and by category search,
+against an index of a sample of workflows/. A plan fails when it reads a
+table without an index, or sorts rows in a temporary B-tree where an index
+order should serve the ORDER BY.
+"""
+
+import glob
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_db import WorkflowDatabase  # noqa: E402
+from workflow_profiling import explain_query_plan  # noqa: E402
+
+# Every SAMPLE_STEP-th file of workflows/ is indexed (a few hundred workflows)
+SAMPLE_STEP = 7
+
+QUERIES = ['', 'slack']
+TRIGGERS = ['all', 'Webhook']
+COMPLEXITIES = ['all', 'alta']
+ACTIVE_ONLY = [False, True]
+
+FULL_SCAN = re.compile(r'^\s*SCAN (?!.*\b(USING (COVERING )?INDEX|VIRTUAL TABLE)\b)')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE')
+
+
+class QueryPlanTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='query-plans-')
+        files = sorted(glob.glob(os.path.join(ROOT, 'workflows', '*.json')))[::SAMPLE_STEP]
+        if not files:
+            raise unittest.SkipTest('workflows/ is empty')
+        cls.db = WorkflowDatabase(os.path.join(cls.tmp, 'workflows.db'), in_memory=False)
+        cls.db.workflows_dir = os.path.join(ROOT, 'workflows')
+        cls.db.index_all_workflows(files=files)
+        cls.explain_conn = sqlite3.connect(cls.db.db_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.explain_conn.close()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def plans(self, method, *args, **kwargs):
+        """(sql, plan lines) of every statement the call runs against the workflow tables."""
+        statements = []
+        connect = self.db._connect
+
+        def traced_connect():
+            conn = connect()
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        self.db._connect = traced_connect
+        try:
+            getattr(self.db, method)(*args, **kwargs)
+        finally:
+            del self.db._connect
+        # Skip FTS5's own reads of its shadow tables
+        return [(sql, explain_query_plan(self.explain_conn, sql)) for sql in statements
+                if sql.lstrip().upper().startswith('SELECT') and "'main'." not in sql]
+
+    def assertNoFullScan(self, sql, plan):
+        scans = [line for line in plan if FULL_SCAN.match(line)]
+        self.assertFalse(scans, f"full table scan in:\n{sql}\n" + "\n".join(plan))
+
+    def assertNoTempBTree(self, sql, plan):
+        sorts = [line for line in plan if TEMP_BTREE.search(line)]
+        self.assertFalse(sorts, f"temp B-tree in:\n{sql}\n" + "\n".join(plan))
+
+    def test_search_workflows_plans(self):
+        sorts = [''] + list(WorkflowDatabase.SORT_OPTIONS)
+        for query, trigger, complexity, active_only, sort in itertools.product(
+                QUERIES, TRIGGERS, COMPLEXITIES, ACTIVE_ONLY, sorts):
+            with self.subTest(query=query, trigger=trigger, complexity=complexity,
+                              active_only=active_only, sort=sort):
+                statements = self.plans('search_workflows', query, trigger, complexity, active_only,
+                                        limit=20, sort=sort)
+                self.assertEqual(len(statements), 2)
+                for sql, plan in statements:
+                    self.assertNoFullScan(sql, plan)
+                    # Text matches come ranked from FTS5; any other sort of them needs a sort step
+                    if not (query and sort):
+                        self.assertNoTempBTree(sql, plan)
+
+    def test_projected_search_plans(self):
+        columns = ('name', 'trigger_type', 'integrations')
+        for query, sort in itertools.product(QUERIES, [''] + list(WorkflowDatabase.SORT_OPTIONS)):
+            with self.subTest(query=query, sort=sort):
+                statements = self.plans('search_workflows', query, limit=20, sort=sort, columns=columns)
+                self.assertEqual(len(statements), 2)
+                for sql, plan in statements:
+                    self.assertNoFullScan(sql, plan)
+                    if not (query and sort):
+                        self.assertNoTempBTree(sql, plan)
+
+    def test_text_search_is_driven_by_fts(self):
+        for sql, plan in self.plans('search_workflows', 'slack', limit=20):
+            self.assertIn('VIRTUAL TABLE', plan[0], "\n".join(plan))
+
+    def test_category_search_plans(self):
+        for category in self.db.get_service_categories():
+            with self.subTest(category=category):
+                statements = self.plans('search_by_category', category, limit=20)
+                self.assertEqual(len(statements), 2)
+                for sql, plan in statements:
+                    self.assertNoFullScan(sql, plan)
+                    # Rows are found through the integration index, never by scanning workflows
+                    self.assertTrue(any('workflow_integrations' in line and line.lstrip().startswith('SEARCH')
+                                        for line in plan), "\n".join(plan))
+                    # Only the matching rows may be sorted
+                    for line in plan:
+                        if TEMP_BTREE.search(line):
+                            self.assertIn('ORDER BY', line)
+
+
+if __name__ == '__main__':
+    unittest.main()
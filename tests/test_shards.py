@@ -0,0 +1,138 @@
+"""
+Sharded index merge tests.
+
+Indexes the same sample of workflows/ into a single database and into a
+two-shard ShardedWorkflowDatabase, and checks that the facade's merged pages
+(sort orders, offsets, totals, ids) and merged catalogs match the single
+database.
+"""
+
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_db import WorkflowDatabase  # noqa: E402
+from workflow_shards import ShardedWorkflowDatabase  # noqa: E402
+
+# Every SAMPLE_STEP-th file of workflows/ is indexed (a few hundred workflows)
+SAMPLE_STEP = 7
+
+PAGE = 7
+
+
+class ShardMergeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix='shards-')
+        files = sorted(glob.glob(os.path.join(ROOT, 'workflows', '*.json')))[::SAMPLE_STEP]
+        if not files:
+            raise unittest.SkipTest('workflows/ is empty')
+        workflows_dir = os.path.join(ROOT, 'workflows')
+        cls.single = WorkflowDatabase(os.path.join(cls.tmp, 'single.db'), in_memory=False)
+        cls.single.workflows_dir = workflows_dir
+        cls.single.index_all_workflows(files=files)
+        cls.sharded = ShardedWorkflowDatabase(os.path.join(cls.tmp, 'sharded.db'), shards=2, in_memory=False)
+        # Index in this process: the facade's process pool is not needed to test merging
+        for shard, part in zip(cls.sharded.shards, cls.sharded.partition_files(files)):
+            shard.workflows_dir = workflows_dir
+            shard.index_all_workflows(files=part)
+        cls.total = len(files)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded._pool.shutdown()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def paged(self, method, *args, **kwargs):
+        """Every result of a sharded search, fetched PAGE rows at a time."""
+        results, offset = [], 0
+        while True:
+            page = getattr(self.sharded, method)(*args, limit=PAGE, offset=offset, **kwargs)[0]
+            results.extend(page)
+            if len(page) < PAGE:
+                return results
+            offset += PAGE
+
+    def test_ids_are_unique_across_shards(self):
+        workflows, total = self.sharded.search_workflows(limit=self.total)
+        self.assertEqual(total, self.total)
+        self.assertEqual(len({w['id'] for w in workflows}), self.total)
+        for workflow in workflows:
+            self.assertEqual(workflow['id'] % 2, self.sharded.shard_for(workflow['filename']))
+
+    def test_serialized_results_carry_global_ids(self):
+        workflows, _ = self.sharded.search_workflows(limit=50, serialized=True)
+        for workflow in workflows:
+            self.assertTrue(workflow['summary'].startswith('{"id":%d,' % workflow['id']), workflow['summary'][:40])
+
+    def test_sorted_pages_match_single_database(self):
+        for sort, key in ShardedWorkflowDatabase.SORT_KEYS.items():
+            with self.subTest(sort=sort):
+                expected, total = self.single.search_workflows(limit=self.total, sort=sort)
+                merged = self.paged('search_workflows', sort=sort)
+                self.assertEqual(self.sharded.search_workflows(limit=1, sort=sort)[1], total)
+                keys = [key(w) for w in merged]
+                if sort == 'recent':
+                    # The two indexes were analyzed at different times: only the order is comparable
+                    self.assertEqual(keys, sorted(keys))
+                else:
+                    self.assertEqual(keys, [key(w) for w in expected])
+                self.assertEqual(sorted(w['filename'] for w in merged), sorted(w['filename'] for w in expected))
+
+    def test_offset_pages_are_slices_of_the_merged_list(self):
+        merged, _ = self.sharded.search_workflows(limit=self.total, sort='nodes')
+        for offset in (0, 3, PAGE, 50):
+            with self.subTest(offset=offset):
+                page, _ = self.sharded.search_workflows(limit=PAGE, offset=offset, sort='nodes')
+                self.assertEqual([w['id'] for w in page], [w['id'] for w in merged[offset:offset + PAGE]])
+
+    def test_fact_merge_matches_single_database(self):
+        values, total = self.single.get_fact_values('host', limit=self.total)
+        if not values:
+            self.skipTest('no host facts in the sample')
+        self.assertEqual(self.sharded.get_fact_values('host', limit=self.total), (values, total))
+        value = values[0]['value']
+        expected, total = self.single.search_by_fact('host', value, limit=self.total)
+        self.assertEqual(self.sharded.search_by_fact('host', value, limit=1)[1], total)
+        self.assertEqual([w['filename'] for w in self.paged('search_by_fact', 'host', value)],
+                         [w['filename'] for w in expected])
+
+    def test_pattern_merge_matches_single_database(self):
+        pattern = 'Webhook -> *'
+        expected, total = self.single.search_graph_pattern(pattern, limit=self.total)
+        self.assertEqual(self.sharded.search_graph_pattern(pattern, limit=1)[1], total)
+        self.assertEqual([w['filename'] for w in self.paged('search_graph_pattern', pattern)],
+                         [w['filename'] for w in expected])
+
+    def test_credential_merge_matches_single_database(self):
+        values, _ = self.single.get_fact_values('credential', limit=3)
+        credentials = [row['value'] for row in values] + ['noSuchCredentialApi']
+        expected, total, unknown = self.single.search_by_credentials(credentials, limit=self.total)
+        merged = self.paged('search_by_credentials', credentials)
+        _, merged_total, merged_unknown = self.sharded.search_by_credentials(credentials, limit=1)
+        self.assertEqual((merged_total, merged_unknown), (total, unknown))
+        self.assertEqual(sorted(w['filename'] for w in merged), sorted(w['filename'] for w in expected))
+        self.assertEqual([w['id'] for w in merged], sorted(w['id'] for w in merged))
+
+    def test_node_type_catalogs_match_single_database(self):
+        def counts(catalog):
+            return [(entry['node_type'], entry['workflows'], entry['nodes']) for entry in catalog]
+
+        expected, total = self.single.get_node_type_catalog(limit=self.total)
+        merged, merged_total = self.sharded.get_node_type_catalog(limit=self.total)
+        self.assertEqual(merged_total, total)
+        self.assertEqual(counts(merged), counts(expected))
+        node_type = expected[0]['node_type']
+        self.assertEqual(self.sharded.get_cooccurring_node_types(node_type, limit=10),
+                         self.single.get_cooccurring_node_types(node_type, limit=10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Small hand-written workflow corpora for tests that need known contents.
+
+Tests describe each workflow as a list of nodes and a list of main
+connections, write them as JSON files into a temporary workflows directory
+and index that directory with WorkflowDatabase.
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workflow_db import WorkflowDatabase  # noqa: E402
+
+
+def node(name: str, node_type: str, parameters: Optional[Dict[str, Any]] = None,
+         credentials: Optional[Iterable[str]] = None, type_version: int = 1) -> Dict[str, Any]:
+    """An n8n node; ``node_type`` without a package prefix is an n8n-nodes-base node."""
+    if '.' not in node_type:
+        node_type = f"n8n-nodes-base.{node_type}"
+    result = {'id': name, 'name': name, 'type': node_type, 'typeVersion': type_version,
+              'position': [0, 0], 'parameters': parameters or {}}
+    if credentials:
+        result['credentials'] = {credential: {'id': '1', 'name': credential} for credential in credentials}
+    return result
+
+
+def workflow(nodes: List[Dict[str, Any]], edges: Iterable[Tuple[str, str]] = ()) -> Dict[str, Any]:
+    """A workflow document with main connections between node names."""
+    connections: Dict[str, Any] = {}
+    for source, target in edges:
+        main = connections.setdefault(source, {'main': [[]]})['main']
+        main[0].append({'node': target, 'type': 'main', 'index': 0})
+    return {'name': 'fixture', 'active': False, 'nodes': nodes, 'connections': connections}
+
+
+def write_workflows(directory: str, workflows: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Write {filename: workflow} into directory. Returns the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, document in workflows.items():
+        path = os.path.join(directory, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        paths.append(path)
+    return paths
+
+
+def index_workflows(tmp: str, workflows: Dict[str, Dict[str, Any]]) -> WorkflowDatabase:
+    """Index a corpus in tmp/workflows into tmp/workflows.db."""
+    db = WorkflowDatabase(os.path.join(tmp, 'workflows.db'), in_memory=False)
+    db.workflows_dir = os.path.join(tmp, 'workflows')
+    write_workflows(db.workflows_dir, workflows)
+    db.index_all_workflows()
+    return db
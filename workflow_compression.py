@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Precompressed response variants.
+
+The indexer stores every workflow file minified and compressed (gzip, and
+brotli when the optional brotli package is installed), keyed by file_hash;
+the API compresses static assets once at startup. Responses then pick a
+stored variant from the request's Accept-Encoding instead of compressing
+the same bytes on every request.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are produced
+    brotli = None
+
+BROTLI_AVAILABLE = brotli is not None
+
+GZIP_LEVEL = 9
+
+# Preference order when a client accepts several encodings equally
+ENCODINGS = ('br', 'gzip')
+
+
+def minify_json(data: object) -> bytes:
+    """Compact UTF-8 JSON of an already parsed document."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress_variants(content: bytes, brotli_quality: int = 11) -> Dict[str, Optional[bytes]]:
+    """gzip and brotli (None without the brotli package) encodings of content.
+
+    gzip output carries no timestamp, so equal content gives equal bytes.
+    """
+    return {
+        'gzip': gzip.compress(content, GZIP_LEVEL, mtime=0),
+        'br': brotli.compress(content, quality=brotli_quality) if brotli else None,
+    }
+
+
+def decompress_identity(variants: Dict[str, Optional[bytes]]) -> bytes:
+    """The uncompressed content of a variant set, stored or decoded from gzip."""
+    identity = variants.get('identity')
+    return identity if identity is not None else gzip.decompress(variants['gzip'])
+
+
+def content_etag(content: bytes) -> str:
+    """Strong ETag of content."""
+    return '"%s"' % hashlib.md5(content).hexdigest()
+
+
+def negotiate_encoding(accept_encoding: str, variants: Dict[str, Optional[bytes]]) -> Optional[str]:
+    """Best stored encoding for an Accept-Encoding header, or None for identity.
+
+    Follows the header's q-values (q=0 refuses an encoding, ``*`` matches any);
+    ties go to the order of ENCODINGS.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if variants.get(encoding) is not None and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
@@ -10,27 +10,357 @@ import os
 import glob
 import datetime
 import hashlib
-from typing import Dict, List, Any, Optional, Tuple
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Iterator, Callable
 from pathlib import Path
+from contextlib import contextmanager
+import contextvars
+
+from workflow_compression import BROTLI_AVAILABLE, compress_variants, minify_json
+from workflow_metrics import cache_requests, observe_query, record_index_run
+from workflow_tracing import span
+from workflow_profiling import run_query
+
+
+class QueryCancelled(Exception):
+    """A query was stopped by its deadline or cancelled (e.g. client disconnect)."""
+    
+    def __init__(self, reason: str, elapsed: float, partial: Dict[str, Any]):
+        super().__init__(f"query {reason} after {elapsed * 1000:.0f} ms")
+        self.reason = reason
+        self.elapsed = elapsed
+        self.partial = partial
+
+
+class QueryDeadline:
+    """Time budget for the SQLite work of one request.
+    
+    Connections opened through WorkflowDatabase while the deadline is active
+    (see query_deadline) get a progress handler that aborts the running
+    statement once the budget is spent, and cancel() interrupts them at once.
+    Methods record what they finished in ``partial`` so a timed-out request
+    can still report it.
+    """
+    
+    # SQLite virtual machine steps between two deadline checks
+    PROGRESS_STEPS = 1000
+    
+    def __init__(self, budget: float, expiry_reason: str = 'deadline'):
+        self.started = time.monotonic()
+        self.budget = budget
+        self.expires_at = self.started + budget
+        self.expiry_reason = expiry_reason
+        self.reason: Optional[str] = None
+        self.partial: Dict[str, Any] = {}
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+    
+    def _progress(self) -> int:
+        """SQLite progress handler: non-zero aborts the statement."""
+        if self.reason is None and time.monotonic() > self.expires_at:
+            self.reason = self.expiry_reason
+        return 1 if self.reason else 0
+    
+    def attach(self, conn: sqlite3.Connection) -> sqlite3.Connection:
+        conn.set_progress_handler(self._progress, self.PROGRESS_STEPS)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+    
+    def cancel(self, reason: str = 'cancelled'):
+        """Stop every statement running under this deadline."""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            for conn in self._connections:
+                try:
+                    conn.interrupt()
+                except sqlite3.ProgrammingError:
+                    pass  # already closed
+    
+    def error(self) -> QueryCancelled:
+        return QueryCancelled(self.reason or 'cancelled', self.elapsed, dict(self.partial))
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar('workflow_query_deadline', default=None)
+
+
+@contextmanager
+def query_deadline(budget: float, expiry_reason: str = 'deadline') -> Iterator[QueryDeadline]:
+    """Run the enclosed WorkflowDatabase queries under a time budget (seconds)."""
+    deadline = QueryDeadline(budget, expiry_reason)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def note_query_progress(**counts: int):
+    """Record partial results of the current request for deadline responses.
+    
+    Counts reported by several calls (e.g. one per shard) add up.
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        with deadline._lock:
+            for key, value in counts.items():
+                deadline.partial[key] = deadline.partial.get(key, 0) + value
+
+
+# Prefixes of the sqlite3.OperationalError messages FTS5 raises for a malformed MATCH expression
+FTS_QUERY_ERRORS = ('fts5: ', 'unterminated string', 'no such column')
+
+
+def is_fts_query_error(error: sqlite3.OperationalError) -> bool:
+    """Whether SQLite rejected the text of a full-text query (a user input error)."""
+    return str(error).startswith(FTS_QUERY_ERRORS)
+
 
 class WorkflowDatabase:
     """High-performance SQLite database for workflow metadata and search."""
     
-    def __init__(self, db_path: str = None):
+    # Maximum Hamming distance between two simhashes to call them near duplicates
+    NEAR_DUPLICATE_DISTANCE = 3
+    
+    # Graph metrics stored as indexed columns, usable as range filters
+    GRAPH_METRIC_COLUMNS = (
+        'graph_depth', 'max_fan_out', 'branch_count',
+        'has_cycle', 'disconnected_nodes', 'entry_points'
+    )
+    
+    # Columns of a search result item besides id, in API order; projected
+    # searches (``columns``) may select any subset of them
+    SUMMARY_COLUMNS = (
+        'filename', 'name', 'active', 'description', 'trigger_type', 'complexity',
+        'node_count', 'integrations', 'tags', 'created_at', 'updated_at', 'duplicate_count',
+        'graph_depth', 'max_fan_out', 'branch_count', 'has_cycle', 'disconnected_nodes', 'entry_points'
+    )
+    
+    # Values the API reports for NULL summary columns
+    SUMMARY_DEFAULTS = {
+        'name': '', 'description': '', 'trigger_type': 'Manual', 'complexity': 'baixa',
+        'node_count': 0, 'integrations': [], 'tags': [], 'duplicate_count': 0,
+        'graph_depth': 0, 'max_fan_out': 0, 'branch_count': 0,
+        'disconnected_nodes': 0, 'entry_points': 0,
+    }
+    
+    # Size caps for the node content index (characters)
+    CONTENT_MIN_CHARS = 3
+    CONTENT_FIELD_MAX_CHARS = 8000
+    CONTENT_NODE_MAX_CHARS = 32000
+    
+    # Structured facts extracted from node parameters and credentials
+    FACT_KEYS = ('host', 'model', 'credential', 'webhook_path')
+    
+    # Tables filled by the indexer. All but workflow_variants are keyed by workflow_id
+    # and cleared by the workflows_*_ad triggers; workflow_variants is keyed by
+    # file_hash and pruned by prune_variants after each indexing run
+    DERIVED_TABLES = ('workflow_edge_types', 'workflow_graphs', 'workflow_node_types', 'node_content',
+                      'workflow_facts', 'workflow_dependencies', 'workflow_variants')
+    
+    # Node types that call another workflow through a workflowId parameter
+    SUBWORKFLOW_NODE_TYPES = ('n8n-nodes-base.executeWorkflow', '@n8n/n8n-nodes-langchain.toolWorkflow')
+    
+    # Sort options for search_workflows
+    SORT_OPTIONS = {
+        'recent': 'w.analyzed_at DESC',
+        'name': 'w.name',
+        'nodes': 'w.node_count DESC',
+        'depth': 'w.graph_depth DESC',
+        'fan_out': 'w.max_fan_out DESC',
+        'branches': 'w.branch_count DESC',
+    }
+    
+    # Seconds between checks for a newer index generation on disk (in-memory mode)
+    MEMORY_REFRESH_INTERVAL = 2.0
+    
+    # Brotli quality of stored workflow variants; 10 and 11 compress a few
+    # percent smaller at several times the indexing cost
+    VARIANT_BROTLI_QUALITY = 9
+    
+    # Seconds a worker waits for another one's schema initialization
+    INIT_LOCK_TIMEOUT = 60.0
+    
+    # Stored in PRAGMA user_version once init_database has brought a file up to
+    # date; bump it with every change to the schema below so older files migrate
+    SCHEMA_VERSION = 5
+    
+    def __init__(self, db_path: str = None, in_memory: bool = None):
         # Use environment variable if no path provided
         if db_path is None:
             db_path = os.environ.get('WORKFLOW_DB_PATH', 'workflows.db')
+        if in_memory is None:
+            in_memory = os.environ.get('WORKFLOW_DB_IN_MEMORY', '').lower() in ('1', 'true', 'yes')
         self.db_path = db_path
         self.workflows_dir = "workflows"
+        # In-process caches of derived data, dropped when the database changes on disk
+        self._cache_lock = threading.Lock()
+        self._caches: Dict[str, Tuple[Any, Any]] = {}
+        # Read-only serving from a resident in-memory copy of the database file
+        self.in_memory = in_memory
+        self._memory_lock = threading.Lock()
+        self._memory_keeper = None
+        self._memory_retired_keeper = None
+        self._memory_uri = None
+        self._memory_generation = None
+        self._memory_stamp = None
+        self._memory_checked_at = 0.0
+        self._memory_loads = 0
+        self._memory_reloading = False
         self.init_database()
+        if self.in_memory:
+            self.load_memory_image()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for read queries: the in-memory image when enabled, else the file."""
+        if self.in_memory:
+            self._check_memory_image()
+            # Opened under the lock so a concurrent swap cannot retire the image in between
+            with self._memory_lock:
+                conn = sqlite3.connect(self._memory_uri, uri=True)
+        else:
+            conn = sqlite3.connect(self.db_path)
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            deadline.attach(conn)
+        return conn
+    
+    def _file_stamp(self) -> Tuple:
+        """Cheap change marker of the database file and its WAL."""
+        stamp = []
+        # Follow the symlink published by rebuild_index to the file being served
+        served = os.path.realpath(self.db_path)
+        for path in (served, served + '-wal'):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def cache_stamp(self) -> Any:
+        """Marker shared by all processes serving this database.
+        
+        Changes whenever an index run writes to the file or a rebuild swaps in
+        a new one; in-memory mode uses the identity of the loaded image.
+        """
+        if self.in_memory:
+            self._check_memory_image()
+            return self._memory_uri
+        return self._file_stamp()
+    
+    def cached(self, name: str, loader: Callable[[], Any]) -> Any:
+        """Return loader() memoized until the database changes (see cache_stamp)."""
+        stamp = self.cache_stamp()
+        entry = self._caches.get(name)
+        if entry is not None and entry[0] == stamp:
+            cache_requests.inc(name, 'hit')
+            return entry[1]
+        with self._cache_lock:
+            entry = self._caches.get(name)
+            if entry is None or entry[0] != stamp:
+                cache_requests.inc(name, 'miss')
+                entry = (stamp, loader())
+                self._caches[name] = entry
+            else:
+                cache_requests.inc(name, 'hit')
+            return entry[1]
+    
+    def load_memory_image(self) -> int:
+        """Copy the database file into a new in-memory database and swap it in.
+        
+        The image is a shared-cache memory database filled through the SQLite
+        backup API. Readers that already hold a connection keep using the old
+        image until they close it; new checkouts see the new one. The replaced
+        image's keeper connection stays open until the next swap. Returns the
+        generation of the loaded image.
+        """
+        stamp = self._file_stamp()
+        self._memory_loads += 1
+        uri = f"file:workflows-memory-{os.getpid()}-{id(self)}-{self._memory_loads}?mode=memory&cache=shared"
+        keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(self.db_path)
+        try:
+            source.backup(keeper)
+        finally:
+            source.close()
+        row = keeper.execute("SELECT value FROM index_meta WHERE key = 'generation'").fetchone()
+        generation = int(row[0]) if row else 0
+        
+        with self._memory_lock:
+            retired = self._memory_retired_keeper
+            self._memory_retired_keeper = self._memory_keeper
+            self._memory_keeper = keeper
+            self._memory_uri = uri
+            self._memory_generation = generation
+            self._memory_stamp = stamp
+            self._memory_checked_at = time.monotonic()
+        if retired is not None:
+            retired.close()
+        return generation
+    
+    def _check_memory_image(self):
+        """Reload the in-memory image in the background when a newer generation is on disk."""
+        now = time.monotonic()
+        if now - self._memory_checked_at < self.MEMORY_REFRESH_INTERVAL or self._memory_reloading:
+            return
+        self._memory_checked_at = now
+        stamp = self._file_stamp()
+        if stamp == self._memory_stamp:
+            return
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            row = conn.execute("SELECT value FROM index_meta WHERE key = 'generation'").fetchone()
+            conn.close()
+        except sqlite3.Error:
+            return
+        if row and int(row[0]) == self._memory_generation:
+            self._memory_stamp = stamp
+            return
+        
+        def reload():
+            try:
+                self.load_memory_image()
+            except Exception as e:
+                print(f"Erro ao recarregar o banco em memória: {e}")
+            finally:
+                with self._memory_lock:
+                    self._memory_reloading = False
+        
+        with self._memory_lock:
+            if self._memory_reloading:
+                return
+            self._memory_reloading = True
+        threading.Thread(target=reload, name="workflow-db-memory-reload", daemon=True).start()
     
     def init_database(self):
         """Initialize SQLite database with optimized schema and indexes."""
-        conn = sqlite3.connect(self.db_path)
+        # Several server workers may initialize at once: wait for each other's
+        # schema transaction instead of failing with "database is locked"
+        conn = sqlite3.connect(self.db_path, timeout=self.INIT_LOCK_TIMEOUT)
+        if conn.execute("PRAGMA user_version").fetchone()[0] == self.SCHEMA_VERSION:
+            # Current schema: skip the DDL and its write lock, which a running
+            # index holds for long stretches
+            conn.close()
+            return
         conn.execute("PRAGMA journal_mode=WAL")  # Write-ahead logging for performance
         conn.execute("PRAGMA synchronous=NORMAL")
         conn.execute("PRAGMA cache_size=10000")
         conn.execute("PRAGMA temp_store=MEMORY")
+        # Inspect and migrate the schema in one write transaction so concurrent
+        # workers never both see a column as missing and both add it
+        conn.execute("BEGIN IMMEDIATE")
+        
+        existing_tables = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
         
         # Create main workflows table
         conn.execute("""
@@ -50,10 +380,42 @@ class WorkflowDatabase:
                 updated_at TEXT,
                 file_hash TEXT,
                 file_size INTEGER,
+                file_mtime_ns INTEGER,       -- with file_size, the stat stamp of the indexed file
+                content_hash TEXT,           -- fingerprint ignoring ids, positions and names
+                simhash INTEGER,             -- 64-bit simhash for near-duplicate detection
+                duplicate_of INTEGER,        -- id of the canonical copy, NULL for canonical rows
+                duplicate_kind TEXT,         -- 'exact' or 'near'
+                duplicate_count INTEGER DEFAULT 0,
+                graph_depth INTEGER DEFAULT 0,        -- longest main path, in nodes
+                max_fan_out INTEGER DEFAULT 0,
+                branch_count INTEGER DEFAULT 0,       -- nodes with more than one main target
+                has_cycle BOOLEAN DEFAULT 0,
+                disconnected_nodes INTEGER DEFAULT 0,
+                entry_points INTEGER DEFAULT 0,
+                requirement_mask BLOB,               -- packed bits of requirement_bits (credentials, integrations)
+                summary_json TEXT,                   -- search result item, pre-serialized (see build_summary_json)
                 analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         
+        # Add columns introduced after the first release to existing databases
+        added_columns = self._ensure_columns(conn, 'workflows', {
+            'content_hash': 'TEXT',
+            'simhash': 'INTEGER',
+            'duplicate_of': 'INTEGER',
+            'duplicate_kind': 'TEXT',
+            'duplicate_count': 'INTEGER DEFAULT 0',
+            'graph_depth': 'INTEGER DEFAULT 0',
+            'max_fan_out': 'INTEGER DEFAULT 0',
+            'branch_count': 'INTEGER DEFAULT 0',
+            'has_cycle': 'BOOLEAN DEFAULT 0',
+            'disconnected_nodes': 'INTEGER DEFAULT 0',
+            'entry_points': 'INTEGER DEFAULT 0',
+            'requirement_mask': 'BLOB',
+            'summary_json': 'TEXT',
+            'file_mtime_ns': 'INTEGER',
+        })
+        
         # Create FTS5 table for full-text search
         conn.execute("""
             CREATE VIRTUAL TABLE IF NOT EXISTS workflows_fts USING fts5(
@@ -67,12 +429,182 @@ class WorkflowDatabase:
             )
         """)
         
+        # Edge-type index: one row per distinct (source type, target type) pair of a workflow
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_edge_types (
+                source_type TEXT NOT NULL,
+                target_type TEXT NOT NULL,
+                workflow_id INTEGER NOT NULL,  -- workflows.id
+                PRIMARY KEY (source_type, target_type, workflow_id)
+            ) WITHOUT ROWID
+        """)
+        
+        # Compact node/edge graph per workflow for exact pattern matching
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_graphs (
+                workflow_id INTEGER PRIMARY KEY,  -- workflows.id
+                graph TEXT NOT NULL               -- JSON {names, types, edges}
+            )
+        """)
+        
+        # New columns and derived tables are only filled by the analyzer:
+        # force re-analysis of every file already in an older database
+        new_tables = [table for table in self.DERIVED_TABLES if table not in existing_tables]
+        if added_columns or ('workflows' in existing_tables and new_tables):
+            conn.execute("UPDATE workflows SET file_hash = NULL")
+        
+        # Node types used by each workflow, per typeVersion
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_node_types (
+                workflow_id INTEGER NOT NULL,  -- workflows.id
+                node_type TEXT NOT NULL,
+                type_version TEXT NOT NULL,
+                nodes INTEGER NOT NULL,
+                PRIMARY KEY (workflow_id, node_type, type_version)
+            ) WITHOUT ROWID
+        """)
+        
+        # Corpus-wide node type catalog, maintained incrementally by the indexer
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS node_type_usage (
+                node_type TEXT NOT NULL,
+                type_version TEXT NOT NULL,
+                workflows INTEGER NOT NULL,
+                nodes INTEGER NOT NULL,
+                PRIMARY KEY (node_type, type_version)
+            ) WITHOUT ROWID
+        """)
+        
+        # Sparse upper-triangular co-occurrence matrix (type_a <= type_b); the
+        # diagonal holds the number of workflows using each type
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS node_type_cooccurrence (
+                type_a TEXT NOT NULL,
+                type_b TEXT NOT NULL,
+                workflows INTEGER NOT NULL,
+                PRIMARY KEY (type_a, type_b)
+            ) WITHOUT ROWID
+        """)
+        
+        # Download variants: each distinct workflow file minified and precompressed
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_variants (
+                file_hash TEXT PRIMARY KEY,  -- workflows.file_hash
+                gzip BLOB NOT NULL,
+                br BLOB                      -- NULL without the brotli package
+            )
+        """)
+        
+        # Deep content index: distinct node texts (code, prompts, SQL...) stored once
+        # and shared by every node and workflow that contains them
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS node_content_blobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash TEXT UNIQUE NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS node_content_fts USING fts5(
+                text,
+                content=node_content_blobs,
+                content_rowid=id,
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS node_content (
+                workflow_id INTEGER NOT NULL,  -- workflows.id
+                node_name TEXT NOT NULL,
+                node_type TEXT NOT NULL,
+                blob_id INTEGER NOT NULL,      -- node_content_blobs.id
+                PRIMARY KEY (workflow_id, node_name)
+            ) WITHOUT ROWID
+        """)
+        
+        # Structured key/value facts (hosts, models, credential types, webhook paths)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_facts (
+                workflow_id INTEGER NOT NULL,  -- workflows.id
+                key TEXT NOT NULL,
+                value TEXT NOT NULL COLLATE NOCASE,
+                PRIMARY KEY (key, value, workflow_id)
+            ) WITHOUT ROWID
+        """)
+        
+        # Sub-workflow calls. Callees are kept by their n8n workflow id and resolved
+        # against workflows.workflow_id at query time, so re-indexing a callee
+        # (which changes its row id) never leaves a stale edge behind
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_dependencies (
+                caller_id INTEGER NOT NULL,  -- workflows.id
+                callee_ref TEXT NOT NULL,    -- n8n id of the called workflow
+                node_name TEXT NOT NULL,
+                callee_name TEXT,            -- cached name from the node, if any
+                PRIMARY KEY (caller_id, callee_ref, node_name)
+            ) WITHOUT ROWID
+        """)
+        
+        # Integrations of each workflow (the workflows.integrations JSON array as rows),
+        # so category search can use an index instead of LIKE '%"name"%' scans
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_integrations (
+                workflow_id INTEGER NOT NULL,  -- workflows.id
+                integration TEXT NOT NULL COLLATE NOCASE,
+                PRIMARY KEY (workflow_id, integration)
+            ) WITHOUT ROWID
+        """)
+        if 'workflows' in existing_tables and 'workflow_integrations' not in existing_tables:
+            # Derivable from the stored JSON: backfill instead of forcing a re-analysis
+            conn.execute("""
+                INSERT OR IGNORE INTO workflow_integrations (workflow_id, integration)
+                SELECT w.id, j.value FROM workflows w, json_each(w.integrations) j
+            """)
+        
+        # Stable bit position of every credential type and integration
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS requirement_bits (
+                kind TEXT NOT NULL,  -- 'credential' or 'integration'
+                name TEXT NOT NULL,
+                bit INTEGER NOT NULL UNIQUE,
+                PRIMARY KEY (kind, name)
+            )
+        """)
+        
+        # Index bookkeeping (generation counter bumped by every index run that changes data)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS index_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO index_meta (key, value) VALUES ('generation', '0')")
+        
         # Create indexes for fast filtering
         conn.execute("CREATE INDEX IF NOT EXISTS idx_trigger_type ON workflows(trigger_type)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_complexity ON workflows(complexity)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_active ON workflows(active)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_node_count ON workflows(node_count)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_filename ON workflows(filename)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON workflows(content_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicate_of ON workflows(duplicate_of)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicate_count ON workflows(duplicate_count)")
+        for column in self.GRAPH_METRIC_COLUMNS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{column} ON workflows({column})")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_edge_target ON workflow_edge_types(target_type, workflow_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_edge_workflow ON workflow_edge_types(workflow_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_node_types_type ON workflow_node_types(node_type, workflow_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cooccurrence_b ON node_type_cooccurrence(type_b, workflows)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_node_content_blob ON node_content(blob_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_workflow ON workflow_facts(workflow_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dependencies_callee ON workflow_dependencies(callee_ref)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_workflow_id ON workflows(workflow_id)")
+        # Sort orders of search_workflows, read in index order (see tests/test_query_plans.py)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analyzed_at ON workflows(analyzed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_name ON workflows(name)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_integrations_name ON workflow_integrations(integration, workflow_id)")
         
         # Create triggers to keep FTS table in sync
         conn.execute("""
@@ -90,7 +622,64 @@ class WorkflowDatabase:
         """)
         
         conn.execute("""
-            CREATE TRIGGER IF NOT EXISTS workflows_au AFTER UPDATE ON workflows BEGIN
+            CREATE TRIGGER IF NOT EXISTS workflows_graph_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM workflow_edge_types WHERE workflow_id = old.id;
+                DELETE FROM workflow_graphs WHERE workflow_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_node_types_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM workflow_node_types WHERE workflow_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_node_content_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM node_content WHERE workflow_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_facts_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM workflow_facts WHERE workflow_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_dependencies_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM workflow_dependencies WHERE caller_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_integrations_ad AFTER DELETE ON workflows BEGIN
+                DELETE FROM workflow_integrations WHERE workflow_id = old.id;
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS node_content_blobs_ai AFTER INSERT ON node_content_blobs BEGIN
+                INSERT INTO node_content_fts(rowid, text) VALUES (new.id, new.text);
+            END
+        """)
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS node_content_blobs_ad AFTER DELETE ON node_content_blobs BEGIN
+                INSERT INTO node_content_fts(node_content_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+        """)
+        
+        # Only resync FTS when indexed columns change, not on duplicate bookkeeping updates
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'workflows_au'"
+        ).fetchone()
+        if row and 'UPDATE OF' not in row[0]:
+            conn.execute("DROP TRIGGER workflows_au")
+        
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS workflows_au
+            AFTER UPDATE OF filename, name, description, integrations, tags ON workflows BEGIN
                 INSERT INTO workflows_fts(workflows_fts, rowid, filename, name, description, integrations, tags)
                 VALUES ('delete', old.id, old.filename, old.name, old.description, old.integrations, old.tags);
                 INSERT INTO workflows_fts(rowid, filename, name, description, integrations, tags)
@@ -98,9 +687,48 @@ class WorkflowDatabase:
             END
         """)
         
+        # Indexes without planner statistics (new database or new indexes)
+        if self._missing_statistics(conn):
+            self.update_planner_statistics(conn)
+        
+        conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
         conn.commit()
         conn.close()
     
+    def _missing_statistics(self, conn: sqlite3.Connection) -> bool:
+        """Whether a populated workflows table has indexes that ANALYZE has not seen."""
+        if not conn.execute("SELECT 1 FROM workflows LIMIT 1").fetchone():
+            return False
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            return True
+        return conn.execute("""
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'workflows'
+              AND name NOT IN (SELECT idx FROM sqlite_stat1 WHERE idx IS NOT NULL)
+            LIMIT 1
+        """).fetchone() is not None
+    
+    def update_planner_statistics(self, conn: sqlite3.Connection):
+        """Refresh the query planner statistics.
+        
+        The filter columns (trigger, complexity, active) have few distinct values;
+        with statistics the planner knows it and reads pages in sort-index order
+        instead of sorting every matching row. analysis_limit bounds the cost on
+        large databases.
+        """
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+    
+    def _ensure_columns(self, conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add missing columns to an existing table (lightweight schema migration)."""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for column, definition in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                added.append(column)
+        return added
+    
     def get_file_hash(self, file_path: str) -> str:
         """Get MD5 hash of file for change detection."""
         hash_md5 = hashlib.md5()
@@ -157,7 +785,7 @@ class WorkflowDatabase:
             return None
         
         filename = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
+        stat = os.stat(file_path)
         file_hash = self.get_file_hash(file_path)
         
         # Extract basic metadata
@@ -172,7 +800,9 @@ class WorkflowDatabase:
             'created_at': data.get('createdAt', ''),
             'updated_at': data.get('updatedAt', ''),
             'file_hash': file_hash,
-            'file_size': file_size
+            'file_size': stat.st_size,
+            'file_mtime_ns': stat.st_mtime_ns,
+            'minified': minify_json(data)
         }
         
         # Use JSON name if available and meaningful, otherwise use formatted filename
@@ -202,6 +832,14 @@ class WorkflowDatabase:
         # Generate description
         workflow['description'] = self.generate_description(workflow, trigger_type, integrations)
         
+        # Graph structure metrics from connections
+        workflow.update(self.analyze_graph(workflow['nodes'], workflow['connections']))
+        
+        # Content fingerprint for duplicate detection
+        content_hash, simhash = self.compute_fingerprint(workflow['nodes'], workflow['connections'])
+        workflow['content_hash'] = content_hash
+        workflow['simhash'] = simhash
+        
         return workflow
     
     def analyze_nodes(self, nodes: List[Dict]) -> Tuple[str, set]:
@@ -435,27 +1073,601 @@ class WorkflowDatabase:
         
         return desc + "."
     
-    def index_all_workflows(self, force_reindex: bool = False) -> Dict[str, int]:
-        """Index all workflow files. Only reprocesses changed files unless force_reindex=True."""
+    def short_node_type(self, node_type: str) -> str:
+        """Package-independent node type ('n8n-nodes-base.httpRequest' -> 'httprequest')."""
+        return node_type.rsplit('.', 1)[-1].lower()
+    
+    def iter_connections(self, connections: Dict) -> Iterator[Tuple[str, str, int, str]]:
+        """Yield (source, connection kind, output index, target) for every edge."""
+        if not isinstance(connections, dict):
+            return
+        for source_name, outputs in connections.items():
+            if not isinstance(outputs, dict):
+                continue
+            for kind, branches in outputs.items():
+                if not isinstance(branches, list):
+                    continue
+                for output_index, targets in enumerate(branches):
+                    if not isinstance(targets, list):
+                        continue
+                    for target in targets:
+                        if isinstance(target, dict) and 'node' in target:
+                            yield source_name, kind, output_index, target['node']
+    
+    def analyze_graph(self, nodes: List[Dict], connections: Dict) -> Dict[str, int]:
+        """Compute structural metrics of the workflow graph.
+        
+        Depth, fan-out, branches and cycles follow the ``main`` data flow only;
+        AI sub-node links (``ai_languageModel``, ``ai_tool``...) still count as
+        connections when looking for disconnected nodes and entry points.
+        Sticky notes are ignored.
+        """
+        names = [
+            node.get('name') for node in nodes
+            if isinstance(node, dict) and node.get('type') != 'n8n-nodes-base.stickyNote'
+        ]
+        known = set(names)
+        successors = {name: [] for name in names}
+        linked = set()
+        has_incoming = set()
+        for source, kind, _, target in self.iter_connections(connections):
+            if source not in known or target not in known:
+                continue
+            linked.update((source, target))
+            has_incoming.add(target)
+            if kind == 'main' and target not in successors[source]:
+                successors[source].append(target)
+        
+        # Iterative DFS colouring to find back edges (cycles)
+        back_edges = set()
+        state = {}
+        for root in names:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(successors[root]))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    state[node] = 2
+                    stack.pop()
+                elif state.get(child) == 1:
+                    back_edges.add((node, child))
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+        
+        # Longest path over the DAG left after dropping back edges (Kahn order)
+        indegree = {name: 0 for name in names}
+        for source in names:
+            for target in successors[source]:
+                if (source, target) not in back_edges:
+                    indegree[target] += 1
+        depth = {name: 1 for name in names}
+        ready = [name for name in names if indegree[name] == 0]
+        while ready:
+            source = ready.pop()
+            for target in successors[source]:
+                if (source, target) in back_edges:
+                    continue
+                depth[target] = max(depth[target], depth[source] + 1)
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    ready.append(target)
+        
+        fan_outs = [len(targets) for targets in successors.values()]
+        return {
+            'graph_depth': max(depth.values(), default=0),
+            'max_fan_out': max(fan_outs, default=0),
+            'branch_count': sum(1 for fan_out in fan_outs if fan_out > 1),
+            'has_cycle': bool(back_edges),
+            'disconnected_nodes': len(known - linked) if len(known) > 1 else 0,
+            'entry_points': sum(
+                1 for name in names
+                if name not in has_incoming and successors[name]
+            ),
+        }
+    
+    def _iter_parameter_leaves(self, value: Any, path: str = '') -> Iterator[Tuple[str, Any]]:
+        """Yield (path, value) for every scalar inside node parameters."""
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from self._iter_parameter_leaves(item, f"{path}.{key}")
+        elif isinstance(value, list):
+            for item in value:
+                yield from self._iter_parameter_leaves(item, f"{path}[]")
+        else:
+            yield path, value
+    
+    def compute_fingerprint(self, nodes: List[Dict], connections: Dict) -> Tuple[str, int]:
+        """Compute (content_hash, simhash) of a workflow ignoring ids, positions and names.
+        
+        Nodes are reduced to type, version, parameters and credential types, and
+        edges are expressed between node signatures instead of node names, so two
+        copies of the same workflow hash identically no matter how they were
+        renamed or laid out on the canvas.
+        """
+        signatures = {}
+        node_types = {}
+        features = []
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            node_type = node.get('type', '')
+            credentials = node.get('credentials')
+            canonical = json.dumps({
+                'type': node_type,
+                'typeVersion': node.get('typeVersion'),
+                'parameters': node.get('parameters', {}),
+                'credentials': sorted(credentials) if isinstance(credentials, dict) else [],
+            }, sort_keys=True, ensure_ascii=False)
+            signature = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+            signatures[node.get('name')] = signature
+            node_types[node.get('name')] = node_type
+            features.append(f"type:{node_type}")
+            for path, leaf in self._iter_parameter_leaves(node.get('parameters', {})):
+                features.append(f"param:{node_type}{path}={leaf}")
+        
+        edges = []
+        for source, kind, output_index, target in self.iter_connections(connections):
+            if source in signatures and target in signatures:
+                edges.append(f"{signatures[source]}:{kind}:{output_index}>{signatures[target]}")
+                features.append(f"edge:{node_types[source]}:{kind}>{node_types[target]}")
+        
+        canonical_workflow = json.dumps([sorted(signatures.values()), sorted(edges)])
+        content_hash = hashlib.sha1(canonical_workflow.encode('utf-8')).hexdigest()
+        return content_hash, self.compute_simhash(features)
+    
+    def compute_simhash(self, features: List[str]) -> int:
+        """64-bit simhash of a feature list, as a signed integer for SQLite storage."""
+        unique = set(features)
+        if not unique:
+            return 0
+        rows = [
+            format(int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+            for feature in unique
+        ]
+        # Count set bits per position column-wise; a bit is set when most features set it
+        value = int(''.join('1' if column.count('1') * 2 > len(rows) else '0' for column in zip(*rows)), 2)
+        return value - (1 << 64) if value >= (1 << 63) else value
+    
+    def store_workflow(self, conn: sqlite3.Connection, workflow_data: Dict[str, Any],
+                       update_catalog: bool = True) -> int:
+        """Insert or update an analyzed workflow and its derived rows. Returns workflows.id.
+        
+        With ``update_catalog`` the node type catalog and co-occurrence matrix are
+        adjusted by the difference between the previous and the new version of
+        the file; indexers that rebuild the catalog at the end pass False.
+        """
+        previous_usage = {}
+        if update_catalog:
+            cursor = conn.execute("""
+                SELECT t.node_type, t.type_version, t.nodes
+                FROM workflows w
+                JOIN workflow_node_types t ON t.workflow_id = w.id
+                WHERE w.filename = ?
+            """, (workflow_data['filename'],))
+            previous_usage = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+        
+        facts = self.extract_facts(workflow_data['nodes'])
+        requirements = [('credential', value) for key, value in sorted(facts) if key == 'credential']
+        requirements += [('integration', name) for name in workflow_data['integrations']]
+        
+        cursor = conn.execute("""
+            INSERT OR REPLACE INTO workflows (
+                filename, name, workflow_id, active, description, trigger_type,
+                complexity, node_count, integrations, tags, created_at, updated_at,
+                file_hash, file_size, file_mtime_ns, content_hash, simhash,
+                graph_depth, max_fan_out, branch_count, has_cycle,
+                disconnected_nodes, entry_points, requirement_mask, summary_json, analyzed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                      ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (
+            workflow_data['filename'],
+            workflow_data['name'],
+            workflow_data['workflow_id'],
+            workflow_data['active'],
+            workflow_data['description'],
+            workflow_data['trigger_type'],
+            workflow_data['complexity'],
+            workflow_data['node_count'],
+            json.dumps(workflow_data['integrations']),
+            json.dumps(workflow_data['tags']),
+            workflow_data['created_at'],
+            workflow_data['updated_at'],
+            workflow_data['file_hash'],
+            workflow_data['file_size'],
+            workflow_data['file_mtime_ns'],
+            workflow_data['content_hash'],
+            workflow_data['simhash'],
+            workflow_data['graph_depth'],
+            workflow_data['max_fan_out'],
+            workflow_data['branch_count'],
+            workflow_data['has_cycle'],
+            workflow_data['disconnected_nodes'],
+            workflow_data['entry_points'],
+            self.pack_requirements(conn, requirements),
+            self.build_summary_json(dict(workflow_data, tags=self.clean_tags(workflow_data['tags'] or [])))
+        ))
+        workflow_id = cursor.lastrowid
+        self.store_variants(conn, workflow_data['file_hash'], workflow_data['minified'])
+        self.index_workflow_graph(conn, workflow_id, workflow_data['nodes'], workflow_data['connections'])
+        
+        usage = self.count_node_types(workflow_data['nodes'])
+        conn.executemany(
+            "INSERT INTO workflow_node_types (workflow_id, node_type, type_version, nodes) VALUES (?, ?, ?, ?)",
+            [(workflow_id, node_type, type_version, count) for (node_type, type_version), count in usage.items()]
+        )
+        if update_catalog:
+            self.update_node_type_catalog(conn, previous_usage, usage)
+        
+        self.index_node_content(conn, workflow_id, workflow_data['nodes'])
+        
+        conn.executemany(
+            "INSERT INTO workflow_facts (workflow_id, key, value) VALUES (?, ?, ?)",
+            [(workflow_id, key, value) for key, value in sorted(facts)]
+        )
+        
+        conn.executemany(
+            "INSERT OR IGNORE INTO workflow_integrations (workflow_id, integration) VALUES (?, ?)",
+            [(workflow_id, name) for name in workflow_data['integrations']]
+        )
+        
+        conn.executemany(
+            "INSERT OR IGNORE INTO workflow_dependencies (caller_id, callee_ref, node_name, callee_name) VALUES (?, ?, ?, ?)",
+            [(workflow_id,) + call for call in self.extract_subworkflow_calls(
+                workflow_data['nodes'], workflow_data['workflow_id'])]
+        )
+        return workflow_id
+    
+    def get_requirement_bit(self, conn: sqlite3.Connection, kind: str, name: str,
+                            create: bool = True) -> Optional[int]:
+        """Bit position of a credential type or integration, assigning the next free one if new."""
+        row = conn.execute(
+            "SELECT bit FROM requirement_bits WHERE kind = ? AND name = ?", (kind, name)
+        ).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            return None
+        conn.execute("""
+            INSERT INTO requirement_bits (kind, name, bit)
+            SELECT ?, ?, COALESCE(MAX(bit) + 1, 0) FROM requirement_bits
+        """, (kind, name))
+        return self.get_requirement_bit(conn, kind, name, create=False)
+    
+    def pack_requirements(self, conn: sqlite3.Connection, requirements: List[Tuple[str, str]]) -> bytes:
+        """Pack (kind, name) requirements into a little-endian bitmask."""
+        mask = 0
+        for kind, name in requirements:
+            mask |= 1 << self.get_requirement_bit(conn, kind, name)
+        return mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    
+    def index_workflow_graph(self, conn: sqlite3.Connection, workflow_id: int,
+                             nodes: List[Dict], connections: Dict):
+        """Store the compact graph and the distinct edge types of a workflow."""
+        names = []
+        types = []
+        positions = {}
+        for node in nodes:
+            if not isinstance(node, dict) or node.get('type') == 'n8n-nodes-base.stickyNote':
+                continue
+            positions[node.get('name')] = len(names)
+            names.append(node.get('name'))
+            types.append(self.short_node_type(node.get('type', '')))
+        
+        edges = set()
+        for source, _, _, target in self.iter_connections(connections):
+            if source in positions and target in positions:
+                edges.add((positions[source], positions[target]))
+        
+        conn.execute(
+            "INSERT OR REPLACE INTO workflow_graphs (workflow_id, graph) VALUES (?, ?)",
+            (workflow_id, json.dumps({'names': names, 'types': types, 'edges': sorted(edges)}))
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO workflow_edge_types (source_type, target_type, workflow_id) VALUES (?, ?, ?)",
+            {(types[source], types[target], workflow_id) for source, target in edges}
+        )
+    
+    def extract_node_text(self, node: Dict) -> str:
+        """Collect the searchable text of a node: string parameters and notes.
+        
+        Each field is capped at CONTENT_FIELD_MAX_CHARS, repeated strings are kept
+        once, and the whole node at CONTENT_NODE_MAX_CHARS.
+        """
+        fields = []
+        seen = set()
+        size = 0
+        values = [value for _, value in self._iter_parameter_leaves(node.get('parameters', {}))]
+        values.append(node.get('notes'))
+        for value in values:
+            if not isinstance(value, str):
+                continue
+            value = value.strip()
+            if len(value) < self.CONTENT_MIN_CHARS or value in seen:
+                continue
+            seen.add(value)
+            value = value[:self.CONTENT_FIELD_MAX_CHARS]
+            if size + len(value) > self.CONTENT_NODE_MAX_CHARS:
+                value = value[:self.CONTENT_NODE_MAX_CHARS - size]
+            fields.append(value)
+            size += len(value) + 1
+            if size >= self.CONTENT_NODE_MAX_CHARS:
+                break
+        return "\n".join(fields)
+    
+    def index_node_content(self, conn: sqlite3.Connection, workflow_id: int, nodes: List[Dict]):
+        """Map each node of a workflow to its (deduplicated) text blob."""
+        rows = []
+        for node in nodes:
+            if not isinstance(node, dict) or not node.get('name'):
+                continue
+            text = self.extract_node_text(node)
+            if not text:
+                continue
+            text_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+            conn.execute(
+                "INSERT OR IGNORE INTO node_content_blobs (hash, text) VALUES (?, ?)",
+                (text_hash, text)
+            )
+            blob_id = conn.execute(
+                "SELECT id FROM node_content_blobs WHERE hash = ?", (text_hash,)
+            ).fetchone()[0]
+            rows.append((workflow_id, node['name'], node.get('type', ''), blob_id))
+        conn.executemany(
+            "INSERT OR REPLACE INTO node_content (workflow_id, node_name, node_type, blob_id) VALUES (?, ?, ?, ?)",
+            rows
+        )
+    
+    def store_variants(self, conn: sqlite3.Connection, file_hash: str, minified: bytes) -> None:
+        """Store the precompressed variants of a workflow file, once per file_hash."""
+        row = conn.execute("SELECT br IS NOT NULL FROM workflow_variants WHERE file_hash = ?",
+                           (file_hash,)).fetchone()
+        # Already stored, unless brotli became available since
+        if row and (row[0] or not BROTLI_AVAILABLE):
+            return
+        variants = compress_variants(minified, self.VARIANT_BROTLI_QUALITY)
+        conn.execute("INSERT OR REPLACE INTO workflow_variants (file_hash, gzip, br) VALUES (?, ?, ?)",
+                     (file_hash, variants['gzip'], variants['br']))
+    
+    def prune_variants(self, conn: sqlite3.Connection) -> int:
+        """Delete variants of files no longer indexed. Returns the number removed."""
+        cursor = conn.execute("""
+            DELETE FROM workflow_variants
+            WHERE file_hash NOT IN (SELECT file_hash FROM workflows WHERE file_hash IS NOT NULL)
+        """)
+        return cursor.rowcount
+    
+    @observe_query
+    def get_workflow_variants(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Stored variants of an indexed workflow file, or None.
+        
+        Returns {'gzip', 'br', 'file_hash', 'file_size', 'file_mtime_ns'}: the last
+        two are the stat stamp of the file when it was indexed, so callers can
+        tell whether the variants still match the file without reading it.
+        """
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT v.gzip, v.br, v.file_hash, w.file_size, w.file_mtime_ns FROM workflows w
+            JOIN workflow_variants v ON v.file_hash = w.file_hash
+            WHERE w.filename = ?
+        """, (filename,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {'gzip': row[0], 'br': row[1], 'file_hash': row[2], 'file_size': row[3], 'file_mtime_ns': row[4]}
+    
+    def prune_node_content(self, conn: sqlite3.Connection) -> int:
+        """Delete text blobs no longer referenced by any node. Returns the number removed."""
+        cursor = conn.execute("""
+            DELETE FROM node_content_blobs
+            WHERE NOT EXISTS (SELECT 1 FROM node_content nc WHERE nc.blob_id = node_content_blobs.id)
+        """)
+        return cursor.rowcount
+    
+    def extract_facts(self, nodes: List[Dict]) -> set:
+        """Extract (key, value) facts from node parameters and credentials.
+        
+        - host: URL host of HTTP Request nodes, also inside expressions
+        - model: AI model names (plain values or resource locators)
+        - credential: credential type names
+        - webhook_path: paths of Webhook nodes
+        """
+        facts = set()
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            parameters = node.get('parameters') or {}
+            if not isinstance(parameters, dict):
+                parameters = {}
+            short_type = self.short_node_type(node.get('type', ''))
+            
+            if 'httprequest' in short_type:
+                url = parameters.get('url', parameters.get('requestUrl'))
+                if isinstance(url, str):
+                    for host in re.findall(r"https?://([^/\s'\"{}?#:]+)", url):
+                        facts.add(('host', host.lower()))
+            
+            for key in ('model', 'modelId', 'modelName'):
+                model = parameters.get(key)
+                if isinstance(model, dict):
+                    model = model.get('value')
+                if isinstance(model, str) and model and not model.startswith('='):
+                    if model.startswith('models/'):
+                        model = model[len('models/'):]
+                    facts.add(('model', model))
+            
+            credentials = node.get('credentials')
+            if isinstance(credentials, dict):
+                for credential_type in credentials:
+                    facts.add(('credential', credential_type))
+            
+            if short_type == 'webhook':
+                path = parameters.get('path')
+                if isinstance(path, str) and path and not path.startswith('='):
+                    facts.add(('webhook_path', path))
+        return facts
+    
+    def extract_subworkflow_calls(self, nodes: List[Dict], own_workflow_id: str = '') -> List[Tuple[str, str, Optional[str]]]:
+        """Find (callee n8n id, node name, cached callee name) of sub-workflow calls.
+        
+        Handles plain ids and resource locators; ``={{ $workflow.id }}`` is a call
+        to the workflow itself. Other expressions and inline/URL/file sources
+        cannot be resolved statically and are skipped.
+        """
+        calls = []
+        for node in nodes:
+            if not isinstance(node, dict) or node.get('type') not in self.SUBWORKFLOW_NODE_TYPES:
+                continue
+            parameters = node.get('parameters') or {}
+            if parameters.get('source', 'database') != 'database':
+                continue
+            reference = parameters.get('workflowId')
+            callee_name = None
+            if isinstance(reference, dict):
+                callee_name = reference.get('cachedResultName')
+                reference = reference.get('value')
+            if not isinstance(reference, str):
+                continue
+            reference = reference.strip()
+            if reference.replace(' ', '') == '={{$workflow.id}}':
+                reference = own_workflow_id or ''
+            if not reference or reference.startswith('='):
+                continue
+            calls.append((reference, node.get('name', ''), callee_name))
+        return calls
+    
+    def count_node_types(self, nodes: List[Dict]) -> Dict[Tuple[str, str], int]:
+        """Count nodes per (node type, typeVersion)."""
+        usage = {}
+        for node in nodes:
+            if not isinstance(node, dict) or not node.get('type'):
+                continue
+            key = (node['type'], str(node.get('typeVersion', '')))
+            usage[key] = usage.get(key, 0) + 1
+        return usage
+    
+    def update_node_type_catalog(self, conn: sqlite3.Connection,
+                                 previous_usage: Dict[Tuple[str, str], int],
+                                 usage: Dict[Tuple[str, str], int]):
+        """Apply the change of one workflow's node types to the catalog and co-occurrence matrix."""
+        usage_deltas = {}
+        for key, count in previous_usage.items():
+            workflows, nodes = usage_deltas.get(key, (0, 0))
+            usage_deltas[key] = (workflows - 1, nodes - count)
+        for key, count in usage.items():
+            workflows, nodes = usage_deltas.get(key, (0, 0))
+            usage_deltas[key] = (workflows + 1, nodes + count)
+        conn.executemany("""
+            INSERT INTO node_type_usage (node_type, type_version, workflows, nodes) VALUES (?, ?, ?, ?)
+            ON CONFLICT (node_type, type_version) DO UPDATE SET
+                workflows = workflows + excluded.workflows,
+                nodes = nodes + excluded.nodes
+        """, [key + delta for key, delta in usage_deltas.items() if delta != (0, 0)])
+        
+        def pairs(types):
+            ordered = sorted(types)
+            return {(a, b) for i, a in enumerate(ordered) for b in ordered[i:]}
+        
+        previous_pairs = pairs({node_type for node_type, _ in previous_usage})
+        current_pairs = pairs({node_type for node_type, _ in usage})
+        conn.executemany("""
+            INSERT INTO node_type_cooccurrence (type_a, type_b, workflows) VALUES (?, ?, ?)
+            ON CONFLICT (type_a, type_b) DO UPDATE SET workflows = workflows + excluded.workflows
+        """, [pair + (-1,) for pair in previous_pairs - current_pairs]
+             + [pair + (1,) for pair in current_pairs - previous_pairs])
+        
+        conn.execute("DELETE FROM node_type_usage WHERE workflows <= 0")
+        conn.execute("DELETE FROM node_type_cooccurrence WHERE workflows <= 0")
+    
+    def rebuild_node_type_catalog(self, conn: sqlite3.Connection, chunk_size: int = 4096):
+        """Recompute the catalog and co-occurrence matrix from workflow_node_types.
+        
+        The co-occurrence counts are X^T X of the binary workflow x type incidence
+        matrix, accumulated with NumPy over chunks of workflows and stored sparse.
+        """
+        import numpy as np
+        
+        conn.execute("DELETE FROM node_type_usage")
+        conn.execute("""
+            INSERT INTO node_type_usage (node_type, type_version, workflows, nodes)
+            SELECT node_type, type_version, COUNT(*), SUM(nodes)
+            FROM workflow_node_types
+            GROUP BY node_type, type_version
+        """)
+        conn.execute("DELETE FROM node_type_cooccurrence")
+        
+        pairs = conn.execute(
+            "SELECT DISTINCT workflow_id, node_type FROM workflow_node_types ORDER BY workflow_id"
+        ).fetchall()
+        if not pairs:
+            return
+        types = sorted({node_type for _, node_type in pairs})
+        type_index = {node_type: position for position, node_type in enumerate(types)}
+        workflow_ids = np.array([workflow_id for workflow_id, _ in pairs], dtype=np.int64)
+        columns = np.array([type_index[node_type] for _, node_type in pairs], dtype=np.int32)
+        # Dense row number per workflow (pairs are sorted by workflow_id)
+        rows = np.concatenate(([0], np.cumsum(workflow_ids[1:] != workflow_ids[:-1])))
+        
+        matrix = np.zeros((len(types), len(types)), dtype=np.int64)
+        for start in range(0, int(rows[-1]) + 1, chunk_size):
+            selected = (rows >= start) & (rows < start + chunk_size)
+            incidence = np.zeros((chunk_size, len(types)), dtype=np.float32)
+            incidence[rows[selected] - start, columns[selected]] = 1.0
+            matrix += (incidence.T @ incidence).astype(np.int64)
+        
+        type_a, type_b = np.nonzero(np.triu(matrix))
+        conn.executemany(
+            "INSERT INTO node_type_cooccurrence (type_a, type_b, workflows) VALUES (?, ?, ?)",
+            zip((types[a] for a in type_a.tolist()), (types[b] for b in type_b.tolist()),
+                matrix[type_a, type_b].tolist())
+        )
+    
+    # Files between two progress callbacks during indexing
+    PROGRESS_INTERVAL = 50
+    
+    def index_all_workflows(self, force_reindex: bool = False,
+                            progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                            files: Optional[List[str]] = None) -> Dict[str, int]:
+        """Index all workflow files. Only reprocesses changed files unless force_reindex=True.
+        
+        progress, when given, is called every PROGRESS_INTERVAL files with the
+        running counts and the total number of files. files restricts the run
+        to the given paths instead of every JSON file in workflows_dir.
+        """
         if not os.path.exists(self.workflows_dir):
             print(f"Warning: Workflows directory '{self.workflows_dir}' not found.")
             return {'processed': 0, 'skipped': 0, 'errors': 0}
         
-        json_files = glob.glob(os.path.join(self.workflows_dir, "*.json"))
+        json_files = files if files is not None else glob.glob(os.path.join(self.workflows_dir, "*.json"))
         
         if not json_files:
             print(f"Warning: No JSON files found in '{self.workflows_dir}' directory.")
             return {'processed': 0, 'skipped': 0, 'errors': 0}
         
         print(f"Indexing {len(json_files)} workflow files...")
+        total_files = len(json_files)
+        started = time.perf_counter()
         
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        # INSERT OR REPLACE only fires the delete triggers (FTS cleanup) with recursive triggers on
+        conn.execute("PRAGMA recursive_triggers = ON")
         
         stats = {'processed': 0, 'skipped': 0, 'errors': 0}
         
-        for file_path in json_files:
+        # Full runs (and first runs) rebuild the node type catalog once at the end
+        # instead of applying per-file deltas
+        rebuild_catalog = force_reindex or not conn.execute(
+            "SELECT 1 FROM node_type_usage LIMIT 1"
+        ).fetchone()
+        
+        for position, file_path in enumerate(json_files):
             filename = os.path.basename(file_path)
+            if progress and position % self.PROGRESS_INTERVAL == 0:
+                progress(dict(stats, total=total_files))
             
             try:
                 # Check if file needs to be reprocessed
@@ -467,6 +1679,13 @@ class WorkflowDatabase:
                     )
                     row = cursor.fetchone()
                     if row and row['file_hash'] == current_hash:
+                        # Same content, possibly touched or checked out again: refresh the stat stamp
+                        stat = os.stat(file_path)
+                        conn.execute(
+                            "UPDATE workflows SET file_size = ?, file_mtime_ns = ? WHERE filename = ? "
+                            "AND (file_mtime_ns IS NOT ? OR file_size IS NOT ?)",
+                            (stat.st_size, stat.st_mtime_ns, filename, stat.st_mtime_ns, stat.st_size)
+                        )
                         stats['skipped'] += 1
                         continue
                 
@@ -476,29 +1695,7 @@ class WorkflowDatabase:
                     stats['errors'] += 1
                     continue
                 
-                # Insert or update in database
-                conn.execute("""
-                    INSERT OR REPLACE INTO workflows (
-                        filename, name, workflow_id, active, description, trigger_type,
-                        complexity, node_count, integrations, tags, created_at, updated_at,
-                        file_hash, file_size, analyzed_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    workflow_data['filename'],
-                    workflow_data['name'],
-                    workflow_data['workflow_id'],
-                    workflow_data['active'],
-                    workflow_data['description'],
-                    workflow_data['trigger_type'],
-                    workflow_data['complexity'],
-                    workflow_data['node_count'],
-                    json.dumps(workflow_data['integrations']),
-                    json.dumps(workflow_data['tags']),
-                    workflow_data['created_at'],
-                    workflow_data['updated_at'],
-                    workflow_data['file_hash'],
-                    workflow_data['file_size']
-                ))
+                self.store_workflow(conn, workflow_data, update_catalog=not rebuild_catalog)
                 
                 stats['processed'] += 1
                 
@@ -507,17 +1704,357 @@ class WorkflowDatabase:
                 stats['errors'] += 1
                 continue
         
+        if stats['processed']:
+            self.update_duplicate_clusters(conn)
+            self.prune_node_content(conn)
+            self.prune_variants(conn)
+            if rebuild_catalog:
+                self.rebuild_node_type_catalog(conn)
+            self.update_planner_statistics(conn)
+            self.bump_index_generation(conn)
+        
         conn.commit()
         conn.close()
+        if progress:
+            progress(dict(stats, total=total_files))
+        record_index_run('inline', stats, time.perf_counter() - started)
         
         print(f"✅ Indexação completa: {stats['processed']} processados, {stats['skipped']} ignorados, {stats['errors']} erros")
         return stats
     
+    def rebuild_index(self, force_reindex: bool = False,
+                      progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                      files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Reindex into a shadow database file and atomically swap it in.
+        
+        The shadow starts as a copy of the live database (or empty when
+        force_reindex), is indexed and validated, and then published by
+        pointing db_path at it through a symlink replaced with os.replace.
+        SQLite resolves the link when a connection opens, so readers move to
+        the new file on their next connection while open ones finish on the
+        old file, each with its own WAL and shared-memory files. An incremental
+        rebuild with no new or changed file returns before copying anything.
+        """
+        live_path = os.path.realpath(self.db_path)
+        if not force_reindex and os.path.exists(live_path):
+            json_files = files if files is not None else glob.glob(os.path.join(self.workflows_dir, "*.json"))
+            if not self.changed_files(json_files):
+                stats = {'processed': 0, 'skipped': len(json_files), 'errors': 0, 'swapped': False}
+                if progress:
+                    progress(dict(stats, total=len(json_files)))
+                return stats
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        shadow_path = os.path.join(directory, f"{os.path.basename(self.db_path)}.v{time.time_ns()}")
+        live_generation = self.get_index_generation() if os.path.exists(live_path) else 0
+        
+        try:
+            if not force_reindex and os.path.exists(live_path):
+                source = sqlite3.connect(live_path)
+                target = sqlite3.connect(shadow_path)
+                try:
+                    source.backup(target)
+                finally:
+                    source.close()
+                    target.close()
+            
+            shadow = WorkflowDatabase(shadow_path, in_memory=False)
+            shadow.workflows_dir = self.workflows_dir
+            conn = sqlite3.connect(shadow_path)
+            # Continue the live generation so caches always see it move forward
+            conn.execute(
+                "UPDATE index_meta SET value = ? WHERE key = 'generation' AND CAST(value AS INTEGER) < ?",
+                (str(live_generation), live_generation)
+            )
+            conn.commit()
+            conn.close()
+            
+            stats = shadow.index_all_workflows(force_reindex=force_reindex, progress=progress, files=files)
+            stats['swapped'] = False
+            if not stats['processed'] and not force_reindex:
+                self.remove_database_files(shadow_path)
+                return stats
+            
+            problems = self.validate_database(shadow_path, min_workflows=1)
+            if problems:
+                raise ValueError("; ".join(problems))
+            
+            conn = sqlite3.connect(shadow_path)
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.close()
+            self.swap_database_file(shadow_path)
+            stats['swapped'] = True
+            stats['generation'] = self.get_index_generation()
+            return stats
+        except Exception:
+            self.remove_database_files(shadow_path)
+            raise
+    
+    def changed_files(self, files: List[str]) -> List[str]:
+        """Files that index_all_workflows would analyze: new, or changed since indexed (file_hash)."""
+        conn = sqlite3.connect(self.db_path)
+        indexed = dict(conn.execute("SELECT filename, file_hash FROM workflows"))
+        conn.close()
+        return [file_path for file_path in files
+                if indexed.get(os.path.basename(file_path)) != self.get_file_hash(file_path)]
+    
+    def validate_database(self, path: str, min_workflows: int = 1) -> List[str]:
+        """Check a database file before it is served. Returns a list of problems."""
+        problems = []
+        conn = sqlite3.connect(path)
+        try:
+            # integrity_check rather than quick_check: the latter reports false NOT NULL
+            # violations on WITHOUT ROWID tables in older SQLite releases
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != 'ok':
+                problems.append(f"integrity_check: {result}")
+            for table in ('workflows_fts', 'node_content_fts'):
+                try:
+                    conn.execute(f"INSERT INTO {table}({table}) VALUES ('integrity-check')")
+                except sqlite3.DatabaseError as e:
+                    problems.append(f"{table}: {e}")
+            total = conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+            if total < min_workflows:
+                problems.append(f"only {total} workflows indexed")
+        finally:
+            conn.close()
+        return problems
+    
+    def swap_database_file(self, new_path: str):
+        """Atomically point db_path at new_path and drop superseded files.
+        
+        new_path must be a complete database in the same directory as db_path.
+        """
+        previous = os.path.realpath(self.db_path)
+        replaced_link = os.path.islink(self.db_path)
+        link_tmp = f"{self.db_path}.link-{os.getpid()}"
+        if os.path.lexists(link_tmp):
+            os.unlink(link_tmp)
+        os.symlink(os.path.basename(new_path), link_tmp)
+        os.replace(link_tmp, self.db_path)
+        
+        # The file just replaced may still have readers; keep it until the next
+        # swap (unlinking open files is safe, but they may still be checkpointing)
+        pattern = re.compile(re.escape(os.path.basename(self.db_path)) + r"\.v\d+$")
+        keep = {os.path.realpath(new_path), previous}
+        for candidate in glob.glob(f"{glob.escape(self.db_path)}.v*"):
+            if pattern.search(candidate) and os.path.realpath(candidate) not in keep:
+                self.remove_database_files(candidate)
+        if replaced_link:
+            # WAL files left at db_path by the plain file the first swap replaced;
+            # like the .vN files they were kept for its readers until this swap
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.db_path + suffix):
+                    os.unlink(self.db_path + suffix)
+    
+    @staticmethod
+    def remove_database_files(path: str):
+        """Delete a database file together with its journal, WAL and shared-memory files."""
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+    
+    def update_duplicate_clusters(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Cluster exact and near-duplicate workflows from the stored fingerprints.
+        
+        Exact copies share a content_hash. Near copies are found by splitting each
+        64-bit simhash into four 16-bit bands: any two hashes within
+        NEAR_DUPLICATE_DISTANCE bits agree on at least one band, so only rows that
+        share a band bucket are compared. The alphabetically first filename of a
+        cluster (usually the lowest numeric prefix) becomes the canonical copy.
+        """
+        rows = conn.execute("""
+            SELECT id, filename, content_hash, simhash, duplicate_of, duplicate_kind, duplicate_count
+            FROM workflows
+            WHERE content_hash IS NOT NULL
+            ORDER BY filename
+        """).fetchall()
+        
+        parent = {row[0]: row[0] for row in rows}
+        order = {row[0]: position for position, row in enumerate(rows)}
+        
+        def find(item):
+            while parent[item] != item:
+                parent[item] = parent[parent[item]]
+                item = parent[item]
+            return item
+        
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                # Keep the earliest filename (rows are sorted) as the root
+                if order[root_a] < order[root_b]:
+                    parent[root_b] = root_a
+                else:
+                    parent[root_a] = root_b
+        
+        # Exact duplicates: identical content hash
+        first_by_hash = {}
+        for row in rows:
+            first = first_by_hash.setdefault(row[2], row[0])
+            if first != row[0]:
+                union(first, row[0])
+        
+        # Near duplicates: LSH over simhash bands, one representative per exact hash
+        simhashes = {}
+        buckets = {}
+        for content_hash, row_id in first_by_hash.items():
+            simhash = rows[order[row_id]][3]
+            if simhash is None:
+                continue
+            simhash &= (1 << 64) - 1
+            simhashes[row_id] = simhash
+            for band in range(4):
+                key = (band, (simhash >> (band * 16)) & 0xFFFF)
+                leaders = buckets.setdefault(key, [])
+                for leader in leaders:
+                    if bin(simhash ^ simhashes[leader]).count('1') <= self.NEAR_DUPLICATE_DISTANCE:
+                        union(leader, row_id)
+                        break
+                else:
+                    leaders.append(row_id)
+        
+        clusters = {}
+        for row in rows:
+            clusters.setdefault(find(row[0]), []).append(row)
+        
+        updates = []
+        for root, members in clusters.items():
+            root_hash = rows[order[root]][2]
+            for row in members:
+                if row[0] == root:
+                    new_values = (None, None, len(members) - 1)
+                else:
+                    new_values = (root, 'exact' if row[2] == root_hash else 'near', 0)
+                if (row[4], row[5], row[6] or 0) != new_values:
+                    updates.append(new_values + (row[0],))
+        
+        conn.executemany(
+            "UPDATE workflows SET duplicate_of = ?, duplicate_kind = ?, duplicate_count = ? WHERE id = ?",
+            updates
+        )
+        
+        duplicates = sum(len(members) - 1 for members in clusters.values())
+        return {'clusters': sum(1 for members in clusters.values() if len(members) > 1),
+                'duplicates': duplicates}
+    
+    def bump_index_generation(self, conn: sqlite3.Connection) -> int:
+        """Mark the index as changed so in-memory caches reload. Returns the new generation.
+        
+        Also records the time of the change as index_meta 'last_indexed'.
+        """
+        conn.execute("UPDATE index_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('last_indexed', ?)",
+                     (datetime.datetime.now().isoformat(),))
+        return int(conn.execute("SELECT value FROM index_meta WHERE key = 'generation'").fetchone()[0])
+    
+    def get_index_generation(self) -> int:
+        """Current index generation."""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM index_meta WHERE key = 'generation'").fetchone()
+        conn.close()
+        return int(row[0]) if row else 0
+    
+    def _load_requirements(self) -> Dict[str, Any]:
+        """Load every workflow bitmask into a (workflows x 64-bit words) NumPy array."""
+        import numpy as np
+        
+        conn = self._connect()
+        # One read transaction: masks written by a concurrent index run may use
+        # bits assigned after requirement_bits was read
+        conn.execute("BEGIN")
+        generation = conn.execute("SELECT value FROM index_meta WHERE key = 'generation'").fetchone()
+        bits = {(row[0], row[1]): row[2] for row in conn.execute("SELECT kind, name, bit FROM requirement_bits")}
+        rows = conn.execute("SELECT id, requirement_mask FROM workflows ORDER BY id").fetchall()
+        conn.rollback()
+        conn.close()
+        
+        words = max(1, (max(bits.values(), default=0) + 64) // 64)
+        row_size = words * 8
+        buffer = bytearray(len(rows) * row_size)
+        for position, (_, mask) in enumerate(rows):
+            if mask:
+                # Shorter masks stay zero-padded; longer ones cannot carry known bits past row_size
+                mask = mask[:row_size]
+                start = position * row_size
+                buffer[start:start + len(mask)] = mask
+        return {
+            'generation': int(generation[0]) if generation else 0,
+            'bits': bits,
+            'words': words,
+            'ids': np.array([row[0] for row in rows], dtype=np.int64),
+            'masks': np.frombuffer(bytes(buffer), dtype='<u8').reshape(len(rows), words),
+        }
+    
+    def get_requirements_matrix(self) -> Dict[str, Any]:
+        """The in-memory bitmask matrix, refreshed when the database changes."""
+        return self.cached('requirements', self._load_requirements)
+    
+    @observe_query
+    def search_by_credentials(self, credentials: List[str], integrations: Optional[List[str]] = None,
+                              include_no_credentials: bool = False, limit: int = 50,
+                              offset: int = 0) -> Tuple[List[Dict], int, List[str]]:
+        """Workflows whose required credential types are all in ``credentials``.
+        
+        When ``integrations`` is given, the workflow integrations must be a subset
+        of it as well; otherwise integrations are not constrained. The subset test
+        ``mask & ~available == 0`` runs vectorized over the in-memory matrix.
+        Returns (workflows, total, unknown credential names).
+        """
+        import numpy as np
+        
+        matrix = self.get_requirements_matrix()
+        bits = matrix['bits']
+        available = 0
+        credential_mask = 0
+        for (kind, name), bit in bits.items():
+            if kind == 'credential':
+                credential_mask |= 1 << bit
+                if name in credentials:
+                    available |= 1 << bit
+            elif integrations is None or name in integrations:
+                available |= 1 << bit
+        unknown = [name for name in credentials if ('credential', name) not in bits]
+        
+        def to_words(value):
+            return np.frombuffer(value.to_bytes(matrix['words'] * 8, 'little'), dtype='<u8')
+        
+        masks = matrix['masks']
+        selected = ~np.any(masks & ~to_words(available), axis=1)
+        if not include_no_credentials:
+            selected &= np.any(masks & to_words(credential_mask), axis=1)
+        matching_ids = matrix['ids'][selected]
+        total = int(matching_ids.size)
+        
+        page_ids = matching_ids[offset:offset + limit].tolist()
+        results = []
+        if page_ids:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            placeholders = ",".join("?" * len(page_ids))
+            cursor = conn.execute(f"SELECT * FROM workflows WHERE id IN ({placeholders}) ORDER BY id", page_ids)
+            results = [self._format_workflow_row(row) for row in cursor.fetchall()]
+            conn.close()
+        return results, total, unknown
+    
+    @observe_query
     def search_workflows(self, query: str = "", trigger_filter: str = "all", 
                         complexity_filter: str = "all", active_only: bool = False,
-                        limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
-        """Fast search with filters and pagination."""
-        conn = sqlite3.connect(self.db_path)
+                        limit: int = 50, offset: int = 0,
+                        collapse_duplicates: bool = False, sort: str = "",
+                        metric_ranges: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                        serialized: bool = False, columns: Optional[Sequence[str]] = None
+                        ) -> Tuple[List[Dict], int]:
+        """Fast search with filters and pagination.
+        
+        ``metric_ranges`` maps a graph metric column (see GRAPH_METRIC_COLUMNS) to an
+        inclusive (min, max) range where either bound may be None. ``sort`` is one of
+        SORT_OPTIONS; by default results are ordered by rank for text queries and by
+        most recently analyzed otherwise. With ``serialized`` each result carries its
+        search result JSON in 'summary' instead of decoded fields (see _serialized_row).
+        ``columns`` selects only those SUMMARY_COLUMNS (plus id and ordering keys)
+        and takes precedence over ``serialized``.
+        """
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         
         # Build WHERE clause
@@ -527,6 +2064,10 @@ class WorkflowDatabase:
         if active_only:
             where_conditions.append("w.active = 1")
         
+        if collapse_duplicates:
+            # Only canonical copies; clones are reported through duplicate_count
+            where_conditions.append("w.duplicate_of IS NULL")
+        
         if trigger_filter != "all":
             where_conditions.append("w.trigger_type = ?")
             params.append(trigger_filter)
@@ -535,11 +2076,24 @@ class WorkflowDatabase:
             where_conditions.append("w.complexity = ?")
             params.append(complexity_filter)
         
+        for column, (minimum, maximum) in (metric_ranges or {}).items():
+            if column not in self.GRAPH_METRIC_COLUMNS:
+                raise ValueError(f"Unknown graph metric: {column}")
+            if minimum is not None:
+                where_conditions.append(f"w.{column} >= ?")
+                params.append(minimum)
+            if maximum is not None:
+                where_conditions.append(f"w.{column} <= ?")
+                params.append(maximum)
+        
+        if sort and sort not in self.SORT_OPTIONS:
+            raise ValueError(f"Unknown sort option: {sort}")
+        
         # Use FTS search if query provided
         if query.strip():
             # FTS search with ranking
-            base_query = """
-                SELECT w.*, rank
+            base_query = f"""
+                SELECT {self._projection(columns, sort)}, rank
                 FROM workflows_fts fts
                 JOIN workflows w ON w.id = fts.rowid
                 WHERE workflows_fts MATCH ?
@@ -547,8 +2101,8 @@ class WorkflowDatabase:
             params.insert(0, query)
         else:
             # Regular query without FTS
-            base_query = """
-                SELECT w.*, 0 as rank
+            base_query = f"""
+                SELECT {self._projection(columns, sort)}, 0 as rank
                 FROM workflows w
                 WHERE 1=1
             """
@@ -558,80 +2112,259 @@ class WorkflowDatabase:
         
         # Count total results
         count_query = f"SELECT COUNT(*) as total FROM ({base_query}) t"
-        cursor = conn.execute(count_query, params)
-        total = cursor.fetchone()['total']
+        try:
+            with span('sqlite.count'):
+                total = run_query(conn, 'search_workflows', count_query, params, fetch='one')['total']
+        except sqlite3.OperationalError as e:
+            conn.close()
+            if query.strip() and is_fts_query_error(e):
+                raise ValueError(f"Invalid search query: {e}") from e
+            raise
+        note_query_progress(matches_counted=total)
         
         # Get paginated results
-        if query.strip():
+        if sort and query.strip():
+            base_query += f" ORDER BY {self.SORT_OPTIONS[sort]}, rank"
+        elif sort:
+            # rank is constant without a text query; ordering by it would defeat the sort index
+            base_query += f" ORDER BY {self.SORT_OPTIONS[sort]}"
+        elif query.strip():
             base_query += " ORDER BY rank"
         else:
-            base_query += " ORDER BY w.analyzed_at DESC"
+            base_query += f" ORDER BY {self.SORT_OPTIONS['recent']}"
         
         base_query += f" LIMIT {limit} OFFSET {offset}"
         
-        cursor = conn.execute(base_query, params)
-        rows = cursor.fetchall()
+        with span('sqlite.fts_match' if query.strip() else 'sqlite.select'):
+            rows = run_query(conn, 'search_workflows', base_query, params)
         
         # Convert to dictionaries and parse JSON fields
-        results = []
-        for row in rows:
-            workflow = dict(row)
+        format_row = self._serialized_row if serialized and columns is None else self._format_workflow_row
+        with span('json.decode_rows', rows=len(rows)):
+            results = [format_row(row) for row in rows]
+        
+        conn.close()
+        return results, total
+    
+    def _format_workflow_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a workflows row to a dict, decoding integrations and tags."""
+        workflow = dict(row)
+        # Packed requirement bits are internal (and bytes, which JSON responses cannot carry)
+        workflow.pop('requirement_mask', None)
+        workflow.pop('summary_json', None)
+        # Projected searches may leave out either column
+        if 'integrations' in workflow:
             workflow['integrations'] = json.loads(workflow['integrations'] or '[]')
+        if 'tags' in workflow:
+            workflow['tags'] = self.clean_tags(json.loads(workflow['tags'] or '[]'))
+        return workflow
+    
+    def _projection(self, columns: Optional[Sequence[str]], sort: str = "") -> str:
+        """SELECT list of a search: every column, or the projected ``columns``.
+        
+        Projections always include id and the keys results are ordered on, which
+        the sharded facade needs to merge pages.
+        """
+        if columns is None:
+            return "w.*"
+        unknown = [column for column in columns if column not in self.SUMMARY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown summary column: {', '.join(unknown)}")
+        keys = ['id', 'analyzed_at']
+        if sort:
+            keys.append(self.SORT_OPTIONS[sort].split()[0][len('w.'):])
+        return ", ".join(f"w.{column}" for column in dict.fromkeys(keys + list(columns)))
+    
+    @staticmethod
+    def clean_tags(raw_tags: List[Any]) -> List[str]:
+        """Convert n8n tags, strings or {id, name} dicts, to their display strings."""
+        clean_tags = []
+        for tag in raw_tags:
+            if isinstance(tag, dict):
+                # Extract name from tag dict if available
+                clean_tags.append(tag.get('name', str(tag.get('id', 'tag'))))
+            else:
+                clean_tags.append(str(tag))
+        return clean_tags
+    
+    @classmethod
+    def summary_fields(cls, workflow: Dict[str, Any], columns: Sequence[str]) -> Dict[str, Any]:
+        """Summary columns of a decoded workflow row as the API reports them."""
+        fields = {}
+        for column in columns:
+            value = workflow[column]
+            if column in ('active', 'has_cycle'):
+                value = cls._as_bool(value)
+            elif column in cls.SUMMARY_DEFAULTS:
+                value = value or cls.SUMMARY_DEFAULTS[column]
+            fields[column] = value
+        return fields
+    
+    @classmethod
+    def build_summary_json(cls, workflow: Dict[str, Any]) -> str:
+        """Serialize the fields of a search result item that only change on re-analysis.
+        
+        ``workflow`` carries decoded integrations and clean tags. The object follows
+        the API's WorkflowSummary with its defaults applied; ``id`` and
+        ``duplicate_count`` change after the row is written and are spliced in when
+        the row is read (see _serialized_row).
+        """
+        columns = [column for column in cls.SUMMARY_COLUMNS if column != 'duplicate_count']
+        return json.dumps(cls.summary_fields(workflow, columns), ensure_ascii=False, separators=(',', ':'))
+    
+    @staticmethod
+    def _as_bool(value: Any) -> bool:
+        """Truthiness as the API models read it: some exports store "false" strings."""
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 't', 'yes', 'y', 'on')
+        return bool(value)
+    
+    def _serialized_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a workflows row to a dict whose 'summary' is its search result JSON.
+        
+        Nothing is decoded: the stored summary_json gets the current id and
+        duplicate_count prepended. Rows written before summaries existed are
+        serialized on the fly.
+        """
+        workflow = dict(row)
+        workflow.pop('requirement_mask', None)
+        stored = workflow.pop('summary_json', None) or self.build_summary_json(self._format_workflow_row(row))
+        workflow['summary'] = '{"id":%d,"duplicate_count":%d,%s' % (
+            workflow['id'], workflow['duplicate_count'] or 0, stored[1:])
+        return workflow
+    
+    @observe_query
+    def search_node_content(self, query: str, trigger_filter: str = "all",
+                            complexity_filter: str = "all", active_only: bool = False,
+                            limit: int = 50, offset: int = 0,
+                            max_matches: int = 5, serialized: bool = False,
+                            columns: Optional[Sequence[str]] = None) -> Tuple[List[Dict], int]:
+        """Full-text search inside node parameters (code, prompts, SQL, notes...).
+        
+        Returns workflows ordered by their best matching node, each with a
+        ``matches`` list of up to ``max_matches`` nodes and a highlighted snippet.
+        ``serialized`` and ``columns`` are as in search_workflows; matches stay a
+        separate list.
+        """
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        where_conditions = []
+        params = [query]
+        if active_only:
+            where_conditions.append("w.active = 1")
+        if trigger_filter != "all":
+            where_conditions.append("w.trigger_type = ?")
+            params.append(trigger_filter)
+        if complexity_filter != "all":
+            where_conditions.append("w.complexity = ?")
+            params.append(complexity_filter)
+        filters = "".join(f" AND {condition}" for condition in where_conditions)
+        
+        base_query = f"""
+            SELECT nc.workflow_id, MIN(hits.rank) as best_rank
+            FROM (SELECT rowid, rank FROM node_content_fts WHERE node_content_fts MATCH ?) hits
+            JOIN node_content nc ON nc.blob_id = hits.rowid
+            JOIN workflows w ON w.id = nc.workflow_id
+            WHERE 1=1{filters}
+            GROUP BY nc.workflow_id
+        """
+        try:
+            cursor = conn.execute(f"SELECT COUNT(*) as total FROM ({base_query}) t", params)
+        except sqlite3.OperationalError as e:
+            conn.close()
+            if is_fts_query_error(e):
+                raise ValueError(f"Invalid search query: {e}") from e
+            raise
+        total = cursor.fetchone()['total']
+        note_query_progress(matches_counted=total)
+        
+        cursor = conn.execute(f"{base_query} ORDER BY best_rank LIMIT ? OFFSET ?", params + [limit, offset])
+        ranks = {row['workflow_id']: row['best_rank'] for row in cursor.fetchall()}
+        workflow_ids = list(ranks)
+        
+        results = []
+        if workflow_ids:
+            placeholders = ",".join("?" * len(workflow_ids))
+            cursor = conn.execute(f"SELECT {self._projection(columns)} FROM workflows w WHERE w.id IN ({placeholders})",
+                                  workflow_ids)
+            format_row = self._serialized_row if serialized and columns is None else self._format_workflow_row
+            workflows = {row['id']: format_row(row) for row in cursor.fetchall()}
+            for workflow in workflows.values():
+                workflow['rank'] = ranks[workflow['id']]
+                workflow['matches'] = []
             
-            # Parse tags and convert dict tags to strings
-            raw_tags = json.loads(workflow['tags'] or '[]')
-            clean_tags = []
-            for tag in raw_tags:
-                if isinstance(tag, dict):
-                    # Extract name from tag dict if available
-                    clean_tags.append(tag.get('name', str(tag.get('id', 'tag'))))
-                else:
-                    clean_tags.append(str(tag))
-            workflow['tags'] = clean_tags
-            
-            results.append(workflow)
+            cursor = conn.execute(f"""
+                SELECT nc.workflow_id, nc.node_name, nc.node_type,
+                       snippet(node_content_fts, 0, '<mark>', '</mark>', '…', 16) as snippet
+                FROM node_content_fts
+                JOIN node_content nc ON nc.blob_id = node_content_fts.rowid
+                WHERE node_content_fts MATCH ? AND nc.workflow_id IN ({placeholders})
+                ORDER BY rank
+            """, [query] + workflow_ids)
+            for row in cursor:
+                matches = workflows[row['workflow_id']]['matches']
+                if len(matches) < max_matches:
+                    matches.append({'node_name': row['node_name'], 'node_type': row['node_type'],
+                                    'snippet': row['snippet']})
+            results = [workflows[workflow_id] for workflow_id in workflow_ids]
         
         conn.close()
         return results, total
     
+    def has_workflows(self) -> bool:
+        """Whether any workflow is indexed; a single-row read, unlike get_stats."""
+        conn = self._connect()
+        row = conn.execute("SELECT 1 FROM workflows LIMIT 1").fetchone()
+        conn.close()
+        return row is not None
+    
+    @observe_query
     def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics."""
-        conn = sqlite3.connect(self.db_path)
+        """Get database statistics, cached until the database changes."""
+        return dict(self.cached('stats', self._load_stats))
+    
+    def _load_stats(self) -> Dict[str, Any]:
+        """Compute database statistics."""
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         
         # Basic counts
-        cursor = conn.execute("SELECT COUNT(*) as total FROM workflows")
-        total = cursor.fetchone()['total']
+        total = run_query(conn, 'get_stats', "SELECT COUNT(*) as total FROM workflows", fetch='one')['total']
         
-        cursor = conn.execute("SELECT COUNT(*) as active FROM workflows WHERE active = 1")
-        active = cursor.fetchone()['active']
+        active = run_query(conn, 'get_stats', "SELECT COUNT(*) as active FROM workflows WHERE active = 1",
+                           fetch='one')['active']
         
         # Trigger type breakdown
-        cursor = conn.execute("""
+        rows = run_query(conn, 'get_stats', """
             SELECT trigger_type, COUNT(*) as count 
             FROM workflows 
             GROUP BY trigger_type
         """)
-        triggers = {row['trigger_type']: row['count'] for row in cursor.fetchall()}
+        triggers = {row['trigger_type']: row['count'] for row in rows}
         
         # Complexity breakdown
-        cursor = conn.execute("""
+        rows = run_query(conn, 'get_stats', """
             SELECT complexity, COUNT(*) as count 
             FROM workflows 
             GROUP BY complexity
         """)
-        complexity = {row['complexity']: row['count'] for row in cursor.fetchall()}
+        complexity = {row['complexity']: row['count'] for row in rows}
         
         # Node stats
-        cursor = conn.execute("SELECT SUM(node_count) as total_nodes FROM workflows")
-        total_nodes = cursor.fetchone()['total_nodes'] or 0
+        total_nodes = run_query(conn, 'get_stats', "SELECT SUM(node_count) as total_nodes FROM workflows",
+                                fetch='one')['total_nodes'] or 0
         
         # Unique integrations count
-        cursor = conn.execute("SELECT integrations FROM workflows WHERE integrations != '[]'")
-        all_integrations = set()
-        for row in cursor.fetchall():
-            integrations = json.loads(row['integrations'])
-            all_integrations.update(integrations)
+        unique_integrations = run_query(
+            conn, 'get_stats', "SELECT COUNT(DISTINCT integration) as integrations FROM workflow_integrations",
+            fetch='one'
+        )['integrations']
+        
+        # Written by the indexer; indexes built before it did fall back to the newest analysis
+        row = run_query(conn, 'get_stats', "SELECT value FROM index_meta WHERE key = 'last_indexed'", fetch='one')
+        if row is None:
+            row = run_query(conn, 'get_stats', "SELECT MAX(analyzed_at) as value FROM workflows", fetch='one')
         
         conn.close()
         
@@ -642,10 +2375,11 @@ class WorkflowDatabase:
             'triggers': triggers,
             'complexity': complexity,
             'total_nodes': total_nodes,
-            'unique_integrations': len(all_integrations),
-            'last_indexed': datetime.datetime.now().isoformat()
+            'unique_integrations': unique_integrations,
+            'last_indexed': row['value'] or ''
         }
 
+    @observe_query
     def get_service_categories(self) -> Dict[str, List[str]]:
         """Get service categories for enhanced filtering."""
         return {
@@ -663,55 +2397,509 @@ class WorkflowDatabase:
             'development': ['Webhook', 'HTTP Request', 'GraphQL', 'Server-Sent Events', 'YouTube']
         }
 
-    def search_by_category(self, category: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
-        """Search workflows by service category."""
+    @observe_query
+    def search_by_category(self, category: str, limit: int = 50, offset: int = 0,
+                           serialized: bool = False, columns: Optional[Sequence[str]] = None
+                           ) -> Tuple[List[Dict], int]:
+        """Search workflows by service category.
+        
+        ``serialized`` and ``columns`` are as in search_workflows.
+        """
         categories = self.get_service_categories()
         if category not in categories:
             return [], 0
         
         services = categories[category]
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         conn.row_factory = sqlite3.Row
         
-        # Build OR conditions for all services in category
-        service_conditions = []
-        params = []
-        for service in services:
-            service_conditions.append("integrations LIKE ?")
-            params.append(f'%"{service}"%')
-        
-        where_clause = " OR ".join(service_conditions)
+        # Workflows using any service of the category, found through the integration index
+        placeholders = ",".join("?" * len(services))
+        where_clause = f"id IN (SELECT workflow_id FROM workflow_integrations WHERE integration IN ({placeholders}))"
+        params = list(services)
         
         # Count total results
         count_query = f"SELECT COUNT(*) as total FROM workflows WHERE {where_clause}"
-        cursor = conn.execute(count_query, params)
-        total = cursor.fetchone()['total']
+        with span('sqlite.count'):
+            total = run_query(conn, 'search_by_category', count_query, params, fetch='one')['total']
+        note_query_progress(matches_counted=total)
         
         # Get paginated results
         query = f"""
-            SELECT * FROM workflows 
+            SELECT {self._projection(columns)} FROM workflows w
             WHERE {where_clause}
             ORDER BY analyzed_at DESC
             LIMIT {limit} OFFSET {offset}
         """
         
-        cursor = conn.execute(query, params)
-        rows = cursor.fetchall()
+        with span('sqlite.select'):
+            rows = run_query(conn, 'search_by_category', query, params)
         
         # Convert to dictionaries and parse JSON fields
-        results = []
-        for row in rows:
-            workflow = dict(row)
-            workflow['integrations'] = json.loads(workflow['integrations'] or '[]')
-            raw_tags = json.loads(workflow['tags'] or '[]')
-            clean_tags = []
-            for tag in raw_tags:
-                if isinstance(tag, dict):
-                    clean_tags.append(tag.get('name', str(tag.get('id', 'tag'))))
+        format_row = self._serialized_row if serialized and columns is None else self._format_workflow_row
+        with span('json.decode_rows', rows=len(rows)):
+            results = [format_row(row) for row in rows]
+        
+        conn.close()
+        return results, total
+
+    @observe_query
+    def get_duplicate_groups(self, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        """List duplicate clusters, largest first, with their canonical copy and members."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        cursor = conn.execute("SELECT COUNT(*) as total FROM workflows WHERE duplicate_count > 0")
+        total = cursor.fetchone()['total']
+        
+        cursor = conn.execute("""
+            SELECT id, filename, name, duplicate_count
+            FROM workflows
+            WHERE duplicate_count > 0
+            ORDER BY duplicate_count DESC, filename
+            LIMIT ? OFFSET ?
+        """, (limit, offset))
+        groups = {}
+        for row in cursor.fetchall():
+            groups[row['id']] = {
+                'canonical': {'filename': row['filename'], 'name': row['name']},
+                'size': row['duplicate_count'] + 1,
+                'duplicates': []
+            }
+        
+        if groups:
+            placeholders = ",".join("?" * len(groups))
+            cursor = conn.execute(f"""
+                SELECT filename, name, duplicate_of, duplicate_kind
+                FROM workflows
+                WHERE duplicate_of IN ({placeholders})
+                ORDER BY filename
+            """, list(groups))
+            for row in cursor.fetchall():
+                groups[row['duplicate_of']]['duplicates'].append({
+                    'filename': row['filename'],
+                    'name': row['name'],
+                    'kind': row['duplicate_kind']
+                })
+        
+        conn.close()
+        return list(groups.values()), total
+
+    @observe_query
+    def get_node_type_catalog(self, prefix: str = "", limit: int = 50,
+                              offset: int = 0) -> Tuple[List[Dict], int]:
+        """Node types by number of workflows using them, with per-typeVersion counts."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        where_clause = "WHERE type_a = type_b"
+        params = []
+        if prefix:
+            where_clause += " AND type_a >= ? AND type_a < ?"
+            params.extend((prefix, prefix + '\uffff'))
+        
+        cursor = conn.execute(f"SELECT COUNT(*) as total FROM node_type_cooccurrence {where_clause}", params)
+        total = cursor.fetchone()['total']
+        
+        cursor = conn.execute(f"""
+            SELECT type_a as node_type, workflows
+            FROM node_type_cooccurrence
+            {where_clause}
+            ORDER BY workflows DESC, type_a
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
+        catalog = {row['node_type']: {'node_type': row['node_type'], 'workflows': row['workflows'],
+                                      'nodes': 0, 'versions': []}
+                   for row in cursor.fetchall()}
+        
+        if catalog:
+            placeholders = ",".join("?" * len(catalog))
+            cursor = conn.execute(f"""
+                SELECT node_type, type_version, workflows, nodes
+                FROM node_type_usage
+                WHERE node_type IN ({placeholders})
+                ORDER BY node_type, workflows DESC
+            """, list(catalog))
+            for row in cursor.fetchall():
+                entry = catalog[row['node_type']]
+                entry['nodes'] += row['nodes']
+                entry['versions'].append({'type_version': row['type_version'],
+                                          'workflows': row['workflows'],
+                                          'nodes': row['nodes']})
+        
+        conn.close()
+        return list(catalog.values()), total
+    
+    @observe_query
+    def get_cooccurring_node_types(self, node_type: str, limit: int = 20) -> Dict[str, Any]:
+        """Node types most often used in the same workflows as ``node_type``.
+        
+        Each entry carries the number of shared workflows and the Jaccard index
+        (shared / workflows using either type).
+        """
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        cursor = conn.execute(
+            "SELECT workflows FROM node_type_cooccurrence WHERE type_a = ? AND type_b = ?",
+            (node_type, node_type)
+        )
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return {'node_type': node_type, 'workflows': 0, 'cooccurring': []}
+        own_workflows = row['workflows']
+        
+        cursor = conn.execute("""
+            SELECT other, c.workflows, d.workflows as other_workflows
+            FROM (
+                SELECT type_b as other, workflows FROM node_type_cooccurrence WHERE type_a = ? AND type_b != ?
+                UNION ALL
+                SELECT type_a as other, workflows FROM node_type_cooccurrence WHERE type_b = ? AND type_a != ?
+            ) c
+            JOIN node_type_cooccurrence d ON d.type_a = c.other AND d.type_b = c.other
+            ORDER BY c.workflows DESC, other
+            LIMIT ?
+        """, (node_type, node_type, node_type, node_type, limit))
+        cooccurring = [{
+            'node_type': row['other'],
+            'workflows': row['workflows'],
+            'jaccard': round(row['workflows'] / (own_workflows + row['other_workflows'] - row['workflows']), 4)
+        } for row in cursor.fetchall()]
+        
+        conn.close()
+        return {'node_type': node_type, 'workflows': own_workflows, 'cooccurring': cooccurring}
+    
+    @observe_query
+    def get_fact_values(self, key: str, prefix: str = "", limit: int = 50,
+                        offset: int = 0) -> Tuple[List[Dict], int]:
+        """Distinct values of a fact key with the number of workflows for each."""
+        if key not in self.FACT_KEYS:
+            raise ValueError(f"Unknown fact key: {key}")
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        where_clause = "WHERE key = ?"
+        params = [key]
+        if prefix:
+            where_clause += " AND value >= ? AND value < ?"
+            params.extend((prefix, prefix + '\uffff'))
+        
+        cursor = conn.execute(f"SELECT COUNT(DISTINCT value) as total FROM workflow_facts {where_clause}", params)
+        total = cursor.fetchone()['total']
+        cursor = conn.execute(f"""
+            SELECT value, COUNT(*) as workflows
+            FROM workflow_facts
+            {where_clause}
+            GROUP BY value
+            ORDER BY workflows DESC, value
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
+        values = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return values, total
+    
+    @observe_query
+    def search_by_fact(self, key: str, value: str, limit: int = 50,
+                       offset: int = 0) -> Tuple[List[Dict], int]:
+        """Workflows having a fact, e.g. ('host', 'api.openai.com') or ('model', 'gpt-4o').
+        
+        Values compare case-insensitively; a trailing ``*`` matches by prefix.
+        """
+        if key not in self.FACT_KEYS:
+            raise ValueError(f"Unknown fact key: {key}")
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        if value.endswith('*'):
+            condition = "f.value >= ? AND f.value < ?"
+            params = [key, value[:-1], value[:-1] + '\uffff']
+        else:
+            condition = "f.value = ?"
+            params = [key, value]
+        base_query = f"""
+            SELECT DISTINCT f.workflow_id
+            FROM workflow_facts f
+            WHERE f.key = ? AND {condition}
+        """
+        
+        cursor = conn.execute(f"SELECT COUNT(*) as total FROM ({base_query}) t", params)
+        total = cursor.fetchone()['total']
+        cursor = conn.execute(f"""
+            SELECT w.*
+            FROM workflows w
+            WHERE w.id IN ({base_query})
+            ORDER BY w.filename
+            LIMIT ? OFFSET ?
+        """, params + [limit, offset])
+        results = [self._format_workflow_row(row) for row in cursor.fetchall()]
+        conn.close()
+        return results, total
+    
+    @observe_query
+    def get_workflow_dependencies(self, filename: str, transitive: bool = False,
+                                  max_depth: int = 20) -> Optional[Dict[str, Any]]:
+        """Callers and callees of a workflow, direct or transitive (with call depth).
+        
+        Returns None when the workflow is not indexed. ``unresolved`` lists called
+        workflow ids that match no indexed workflow.
+        """
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        row = conn.execute("SELECT id FROM workflows WHERE filename = ?", (filename,)).fetchone()
+        if not row:
+            conn.close()
+            return None
+        start = row['id']
+        depth_limit = max_depth if transitive else 1
+        
+        callees = conn.execute("""
+            WITH RECURSIVE reach(id, depth) AS (
+                SELECT ?, 0
+                UNION
+                SELECT w.id, r.depth + 1
+                FROM reach r
+                JOIN workflow_dependencies d ON d.caller_id = r.id
+                JOIN workflows w ON w.workflow_id = d.callee_ref
+                WHERE r.depth < ?
+            )
+            SELECT w.filename, w.name, w.workflow_id, MIN(r.depth) as depth
+            FROM reach r JOIN workflows w ON w.id = r.id
+            WHERE r.depth > 0
+            GROUP BY w.id
+            ORDER BY depth, w.filename
+        """, (start, depth_limit)).fetchall()
+        
+        callers = conn.execute("""
+            WITH RECURSIVE reach(id, depth) AS (
+                SELECT ?, 0
+                UNION
+                SELECT d.caller_id, r.depth + 1
+                FROM reach r
+                JOIN workflows callee ON callee.id = r.id
+                JOIN workflow_dependencies d ON d.callee_ref = callee.workflow_id
+                WHERE r.depth < ?
+            )
+            SELECT w.filename, w.name, w.workflow_id, MIN(r.depth) as depth
+            FROM reach r JOIN workflows w ON w.id = r.id
+            WHERE r.depth > 0
+            GROUP BY w.id
+            ORDER BY depth, w.filename
+        """, (start, depth_limit)).fetchall()
+        
+        unresolved = conn.execute("""
+            SELECT d.callee_ref, d.callee_name, d.node_name
+            FROM workflow_dependencies d
+            WHERE d.caller_id = ?
+              AND NOT EXISTS (SELECT 1 FROM workflows w WHERE w.workflow_id = d.callee_ref)
+            ORDER BY d.node_name
+        """, (start,)).fetchall()
+        
+        conn.close()
+        return {
+            'filename': filename,
+            'transitive': transitive,
+            'callees': [dict(row) for row in callees],
+            'callers': [dict(row) for row in callers],
+            'unresolved': [dict(row) for row in unresolved]
+        }
+    
+    @observe_query
+    def get_integration_counts(self) -> List[Dict[str, Any]]:
+        """Number of workflows per detected integration, cached until the database changes."""
+        return [dict(row) for row in self.cached('integration_counts', self._load_integration_counts)]
+    
+    def _load_integration_counts(self) -> List[Dict[str, Any]]:
+        """Count workflows per integration from the workflow_integrations index."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.execute("""
+            SELECT integration as name, COUNT(*) as workflows
+            FROM workflow_integrations
+            GROUP BY integration
+            ORDER BY workflows DESC, name
+        """)
+        integrations = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return integrations
+    
+    def parse_graph_pattern(self, pattern: str) -> Tuple[List[Optional[str]], List[Tuple[int, int]]]:
+        """Parse a node-type pattern into (node types, edges).
+        
+        Paths are written ``Webhook -> IF -> Slack`` and joined with ``;`` to form
+        a subgraph. A node can be named with ``alias:Type`` and referenced again by
+        its alias in another path, e.g. ``Webhook -> c:IF -> Slack; c -> Gmail``.
+        Types are matched by their short name, case-insensitively; ``*`` matches
+        any node type.
+        """
+        types = []
+        edges = []
+        aliases = {}
+        for path in pattern.split(';'):
+            if not path.strip():
+                continue
+            previous = None
+            for token in path.split('->'):
+                token = token.strip()
+                if not token:
+                    raise ValueError(f"Empty node in pattern: {path.strip()}")
+                alias, _, node_type = token.rpartition(':') if ':' in token else ('', '', token)
+                if not alias and node_type in aliases:
+                    position = aliases[node_type]
                 else:
-                    clean_tags.append(str(tag))
-            workflow['tags'] = clean_tags
-            results.append(workflow)
+                    if alias in aliases:
+                        raise ValueError(f"Alias defined twice: {alias}")
+                    position = len(types)
+                    types.append(None if node_type == '*' else self.short_node_type(node_type))
+                    if alias:
+                        aliases[alias] = position
+                if previous is not None:
+                    if previous == position:
+                        raise ValueError(f"Self-loop in pattern: {token}")
+                    edges.append((previous, position))
+                previous = position
+        if not types:
+            raise ValueError("Empty pattern")
+        return types, edges
+    
+    def _match_graph_pattern(self, graph: Dict, types: List[Optional[str]],
+                             edges: List[Tuple[int, int]]) -> Optional[List[int]]:
+        """Find one injective mapping of pattern nodes onto graph nodes, or None."""
+        successors = {}
+        predecessors = {}
+        for source, target in graph['edges']:
+            successors.setdefault(source, set()).add(target)
+            predecessors.setdefault(target, set()).add(source)
+        
+        # Visit pattern nodes so that each one (after the first of its component)
+        # is adjacent to an already assigned node
+        order = []
+        pending = list(range(len(types)))
+        while pending:
+            next_node = next(
+                (node for node in pending
+                 if any((node == s and t in order) or (node == t and s in order) for s, t in edges)),
+                pending[0]
+            )
+            order.append(next_node)
+            pending.remove(next_node)
+        
+        assignment = {}
+        
+        def candidates(node):
+            for source, target in edges:
+                if source == node and target in assignment:
+                    return predecessors.get(assignment[target], ())
+                if target == node and source in assignment:
+                    return successors.get(assignment[source], ())
+            return range(len(graph['types']))
+        
+        def consistent(node, vertex):
+            if types[node] is not None and graph['types'][vertex] != types[node]:
+                return False
+            for source, target in edges:
+                if source == node and target in assignment and assignment[target] not in successors.get(vertex, ()):
+                    return False
+                if target == node and source in assignment and vertex not in successors.get(assignment[source], ()):
+                    return False
+            return True
+        
+        def extend(depth):
+            if depth == len(order):
+                return True
+            node = order[depth]
+            used = set(assignment.values())
+            for vertex in candidates(node):
+                if vertex not in used and consistent(node, vertex):
+                    assignment[node] = vertex
+                    if extend(depth + 1):
+                        return True
+                    del assignment[node]
+            return False
+        
+        if extend(0):
+            return [assignment[node] for node in range(len(types))]
+        return None
+    
+    @observe_query
+    def search_graph_pattern(self, pattern: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Find workflows containing a node-type path or subgraph (see parse_graph_pattern).
+        
+        Candidates are pruned with the workflow_edge_types index (every typed pattern
+        edge must appear in the workflow), or with workflow_node_types for pattern
+        nodes without edges, and then matched exactly against the
+        stored compact graphs, so no workflow file is read.
+        """
+        types, edges = self.parse_graph_pattern(pattern)
+        
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        
+        selects = []
+        params = []
+        for source, target in sorted({(types[s], types[t]) for s, t in edges
+                                      if types[s] is not None and types[t] is not None}):
+            selects.append("SELECT workflow_id FROM workflow_edge_types WHERE source_type = ? AND target_type = ?")
+            params.extend((source, target))
+        if not selects:
+            # No fully typed edge: prune on node type presence alone. Connected
+            # pattern nodes are looked up in workflow_edge_types; a node without
+            # pattern edges may have no connections at all, so it is looked up in
+            # workflow_node_types (full type names) instead
+            connected = {position for edge in edges for position in edge}
+            full_types = {}
+            for node_type in conn.execute("SELECT DISTINCT node_type FROM node_type_usage"):
+                full_types.setdefault(self.short_node_type(node_type[0]), []).append(node_type[0])
+            for node_type, has_edges in sorted({(node_type, position in connected)
+                                                for position, node_type in enumerate(types)
+                                                if node_type is not None}):
+                if has_edges:
+                    selects.append(
+                        "SELECT workflow_id FROM workflow_edge_types WHERE source_type = ? "
+                        "UNION SELECT workflow_id FROM workflow_edge_types WHERE target_type = ?"
+                    )
+                    params.extend((node_type, node_type))
+                else:
+                    names = full_types.get(node_type, [])
+                    selects.append("SELECT workflow_id FROM workflow_node_types WHERE node_type IN (%s)"
+                                   % ",".join("?" * len(names)))
+                    params.extend(names)
+        if selects:
+            candidate_query = " INTERSECT ".join(f"SELECT * FROM ({select})" for select in selects)
+        else:
+            candidate_query = "SELECT workflow_id FROM workflow_graphs"
+        
+        cursor = conn.execute(f"""
+            SELECT g.workflow_id, g.graph
+            FROM workflow_graphs g
+            JOIN workflows w ON w.id = g.workflow_id
+            WHERE g.workflow_id IN ({candidate_query})
+            ORDER BY w.filename
+        """, params)
+        
+        matches = []
+        for row in cursor:
+            graph = json.loads(row['graph'])
+            mapping = self._match_graph_pattern(graph, types, edges)
+            if mapping is not None:
+                matches.append((row['workflow_id'], [graph['names'][vertex] for vertex in mapping]))
+        total = len(matches)
+        page = matches[offset:offset + limit]
+        
+        results = []
+        if page:
+            placeholders = ",".join("?" * len(page))
+            cursor = conn.execute(f"""
+                SELECT id, filename, name, trigger_type, complexity, node_count, integrations
+                FROM workflows WHERE id IN ({placeholders})
+            """, [workflow_id for workflow_id, _ in page])
+            rows = {row['id']: row for row in cursor.fetchall()}
+            for workflow_id, matched_nodes in page:
+                workflow = dict(rows[workflow_id])
+                workflow['integrations'] = json.loads(workflow['integrations'] or '[]')
+                workflow['matched_nodes'] = matched_nodes
+                results.append(workflow)
         
         conn.close()
         return results, total
@@ -724,15 +2912,33 @@ def main():
     parser = argparse.ArgumentParser(description='N8N Workflow Database')
     parser.add_argument('--index', action='store_true', help='Indexar todos os workflows')
     parser.add_argument('--force', action='store_true', help='Reindexar todos os arquivos')
+    parser.add_argument('--shadow', action='store_true',
+                        help='Indexar numa cópia do banco e trocá-la atomicamente ao final')
     parser.add_argument('--search', help='Procurar workflows')
     parser.add_argument('--stats', action='store_true', help='Mostrar estatísticas do banco de dados')
+    parser.add_argument('--duplicates', action='store_true', help='Listar grupos de workflows duplicados')
+    parser.add_argument('--fact', nargs=2, metavar=('CHAVE', 'VALOR'),
+                        help='Procurar workflows por fato (host, model, credential, webhook_path)')
+    parser.add_argument('--pattern', help='Procurar workflows por padrão de nós (ex.: "Webhook -> IF -> Slack")')
+    parser.add_argument('--publish', nargs='?', const='', metavar='DIR',
+                        help='Publicar um snapshot versionado do índice (padrão: $WORKFLOW_SNAPSHOT_DIR); '
+                             'pode ser combinado com --index')
+    parser.add_argument('--keep', type=int, default=5, help='Snapshots mantidos ao publicar')
     
     args = parser.parse_args()
+    snapshot_dir = None
+    if args.publish is not None:
+        snapshot_dir = args.publish or os.environ.get('WORKFLOW_SNAPSHOT_DIR')
+        if not snapshot_dir:
+            parser.error('--publish requer um diretório ou WORKFLOW_SNAPSHOT_DIR')
     
     db = WorkflowDatabase()
     
     if args.index:
-        stats = db.index_all_workflows(force_reindex=args.force)
+        if args.shadow:
+            stats = db.rebuild_index(force_reindex=args.force)
+        else:
+            stats = db.index_all_workflows(force_reindex=args.force)
         print(f"Indexed {stats['processed']} workflows")
     
     elif args.search:
@@ -750,8 +2956,34 @@ def main():
         print(f"  Integrações únicas: {stats['unique_integrations']}")
         print(f"  Tipos de gatilhos: {stats['triggers']}")
     
-    else:
+    elif args.fact:
+        results, total = db.search_by_fact(args.fact[0], args.fact[1], limit=10)
+        print(f"Found {total} workflows:")
+        for workflow in results:
+            print(f"  - {workflow['name']} ({workflow['filename']})")
+    
+    elif args.pattern:
+        results, total = db.search_graph_pattern(args.pattern, limit=10)
+        print(f"Found {total} workflows:")
+        for workflow in results:
+            print(f"  - {workflow['filename']}: {' -> '.join(workflow['matched_nodes'])}")
+    
+    elif args.duplicates:
+        groups, total = db.get_duplicate_groups(limit=20)
+        print(f"{total} grupos de duplicados:")
+        for group in groups:
+            print(f"  - {group['canonical']['filename']} ({group['size']} cópias)")
+            for duplicate in group['duplicates']:
+                print(f"      {duplicate['kind']}: {duplicate['filename']}")
+    
+    elif not snapshot_dir:
         parser.print_help()
+    
+    if snapshot_dir:
+        from index_snapshots import publish_snapshot
+        manifest = publish_snapshot(db, snapshot_dir, keep=args.keep)
+        print(f"Snapshot {manifest['version']} publicado em {snapshot_dir} "
+              f"({manifest['workflows']} workflows, sha256 {manifest['sha256'][:12]})")
 
 
 if __name__ == "__main__":
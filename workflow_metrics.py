@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Hot paths never take a lock: every thread accumulates into its own cells
+(registered once per thread and labelled series), and a scrape sums the
+cells of all threads. Labelled series are created once and cached, so an
+observation does no allocation beyond the label-tuple lookup.
+
+Each server worker keeps its own registry; a scrape returns the numbers of
+the worker that answered it (the ``pid`` label of workflow_process_info
+tells them apart).
+"""
+
+import bisect
+import os
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from workflow_tracing import span
+
+# Latency buckets (seconds) shared by the request, query and file histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+    """One labelled time series with a cell per thread."""
+
+    __slots__ = ('labels', '_size', '_local', '_cells', '_lock')
+
+    def __init__(self, labels: Tuple[str, ...], size: int):
+        self.labels = labels
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:  # once per thread
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(values) for values in zip(*cells)] if cells else [0.0] * self._size
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _size(self) -> int:
+        return 1
+
+    def labels(self, *values) -> _Series:
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, _Series(key, self._size()))
+        return series
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.labels(*labels).cell()[0] += amount
+
+    def value(self, *labels) -> float:
+        return self.labels(*labels).totals()[0]
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        return [(key, series.totals()[0]) for key, series in sorted(self._series.items())]
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in self.items()]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _size(self) -> int:
+        # one cell per bucket plus +Inf, then sum and count
+        return len(self.buckets) + 3
+
+    def observe(self, value: float, *labels):
+        self.observe_series(self.labels(*labels), value)
+
+    def observe_series(self, series: _Series, value: float):
+        cell = series.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            totals = series.totals()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), totals):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                labels = self._label_text(key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(totals[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_number(totals[-1])}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge read from a callback at scrape time (nothing to do on the hot path)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = ()):
+        self.callback = callback
+        super().__init__(name, documentation, labelnames)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}"
+                for key, value in sorted(self.callback().items())]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text format."""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# Metrics shared by the data layer and the API
+
+http_request_duration = Histogram(
+    'workflow_http_request_duration_seconds', 'HTTP request latency by route template.',
+    ('method', 'route'))
+http_requests = Counter(
+    'workflow_http_requests_total', 'HTTP requests by route template and status code.',
+    ('method', 'route', 'status'))
+db_query_duration = Histogram(
+    'workflow_db_query_duration_seconds', 'Duration of WorkflowDatabase query methods.',
+    ('method',))
+db_queries = Counter(
+    'workflow_db_queries_total', 'WorkflowDatabase query method calls by outcome.',
+    ('method', 'outcome'))
+file_read_duration = Histogram(
+    'workflow_file_read_duration_seconds', 'Time spent reading workflow files by endpoint.',
+    ('endpoint',))
+file_read_bytes = Counter(
+    'workflow_file_read_bytes_total', 'Bytes of workflow files read or served by endpoint.',
+    ('endpoint',))
+index_files = Counter(
+    'workflow_index_files_total', 'Workflow files handled by the indexer by outcome.',
+    ('outcome',))
+index_run_duration = Histogram(
+    'workflow_index_run_duration_seconds', 'Duration of index runs (in-process or reindex jobs).',
+    ('kind',), buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800))
+reindex_jobs = Counter(
+    'workflow_reindex_jobs_total', 'Reindex jobs finished by status.',
+    ('status',))
+cache_requests = Counter(
+    'workflow_cache_requests_total', 'In-process cache lookups by cache and result (hit or miss).',
+    ('cache', 'result'))
+slow_queries = Counter(
+    'workflow_slow_queries_total', 'SQLite statements over the slow-query threshold by method.',
+    ('method',))
+query_cancellations = Counter(
+    'workflow_query_cancellations_total', 'SQLite queries cancelled by deadline or client disconnect.',
+    ('route', 'reason'))
+
+_last_index_rate: Dict[Tuple[str, ...], float] = {}
+Gauge('workflow_index_files_per_second', 'Throughput of the last index run.',
+      lambda: dict(_last_index_rate), ('kind',))
+Gauge('workflow_process_info', 'Process serving this scrape.',
+      lambda: {(str(os.getpid()),): 1}, ('pid',))
+
+
+def record_index_run(kind: str, stats: Dict[str, int], seconds: float):
+    """Account one finished index run (kind: 'inline' or 'job')."""
+    for outcome in ('processed', 'skipped', 'errors'):
+        if stats.get(outcome):
+            index_files.inc(outcome, amount=stats[outcome])
+    index_run_duration.observe(seconds, kind)
+    handled = sum(stats.get(outcome, 0) for outcome in ('processed', 'skipped', 'errors'))
+    if seconds > 0:
+        _last_index_rate[(kind,)] = handled / seconds
+
+
+def observe_query(method: Callable) -> Callable:
+    """Decorator: count and time a WorkflowDatabase query method (and trace it as db.<name>)."""
+    name = method.__name__
+    timing = db_query_duration.labels(name)
+    succeeded = db_queries.labels(name, 'ok')
+    failed = db_queries.labels(name, 'error')
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with span(f'db.{name}'):
+                result = method(*args, **kwargs)
+        except Exception:
+            failed.cell()[0] += 1
+            raise
+        finally:
+            db_query_duration.observe_series(timing, time.perf_counter() - start)
+        succeeded.cell()[0] += 1
+        return result
+    return wrapper
+
+
+def timed_read(endpoint: str, path: str, reader: Callable[[str], object]) -> object:
+    """Run reader(path), accounting the file's size and the read time to endpoint."""
+    start = time.perf_counter()
+    result = reader(path)
+    file_read_duration.observe(time.perf_counter() - start, endpoint)
+    file_read_bytes.inc(endpoint, amount=os.path.getsize(path))
+    return result
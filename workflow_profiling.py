@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Slow-query log and opt-in request profiling.
+
+Slow queries: run_query() executes and fetches a statement; when it takes
+longer than WORKFLOW_SLOW_QUERY_MS (default 100) it logs one JSON line with
+the method, SQL, parameters, duration and EXPLAIN QUERY PLAN to
+WORKFLOW_SLOW_QUERY_LOG (rotating file) or, when unset, to stderr.
+
+Request profiling: the API profiles a single request's handler with cProfile
+when it is called with ?profile=1 and the X-Admin-Token header matches
+WORKFLOW_ADMIN_TOKEN. The .prof file is stored in WORKFLOW_PROFILE_DIR
+(default profiles/) and a text report is returned. Only one request is
+profiled at a time.
+"""
+
+import datetime
+import hmac
+import io
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Sequence, Tuple
+
+from workflow_metrics import slow_queries
+
+if TYPE_CHECKING:  # cProfile and pstats are imported when a request is profiled
+    import cProfile
+
+SLOW_QUERY_MS = float(os.environ.get('WORKFLOW_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG = os.environ.get('WORKFLOW_SLOW_QUERY_LOG') or None
+ADMIN_TOKEN = os.environ.get('WORKFLOW_ADMIN_TOKEN') or None
+PROFILE_DIR = os.environ.get('WORKFLOW_PROFILE_DIR', 'profiles')
+# Functions listed in the text report of a profiled request
+PROFILE_REPORT_LINES = 40
+
+_slow_query_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def _get_slow_query_logger() -> logging.Logger:
+    global _slow_query_logger
+    with _logger_lock:
+        if _slow_query_logger is None:
+            logger = logging.getLogger('workflow_db.slow_queries')
+            logger.setLevel(logging.WARNING)
+            logger.propagate = False
+            if SLOW_QUERY_LOG:
+                os.makedirs(os.path.dirname(os.path.abspath(SLOW_QUERY_LOG)), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    SLOW_QUERY_LOG, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8')
+            else:
+                handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            _slow_query_logger = logger
+        return _slow_query_logger
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: Sequence[Any] = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN of a statement as indented lines."""
+    depth = {0: -1}
+    lines = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall():
+        node_id, parent, detail = row[0], row[1], row[3]
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def _loggable(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + '…'
+    return value
+
+
+def log_slow_query(conn: sqlite3.Connection, method: str, sql: str,
+                   params: Sequence[Any], seconds: float):
+    try:
+        plan = explain_query_plan(conn, sql, params)
+    except sqlite3.Error as e:
+        plan = [f"unavailable: {e}"]
+    slow_queries.inc(method)
+    _get_slow_query_logger().warning(json.dumps({
+        'time': datetime.datetime.now().isoformat(),
+        'method': method,
+        'duration_ms': round(seconds * 1000, 2),
+        'sql': ' '.join(sql.split()),
+        'params': [_loggable(value) for value in params],
+        'plan': plan,
+    }, ensure_ascii=False))
+
+
+def run_query(conn: sqlite3.Connection, method: str, sql: str,
+              params: Sequence[Any] = (), fetch: str = 'all') -> Any:
+    """Execute sql and fetch 'all' rows or 'one', logging the statement if it is slow."""
+    start = time.perf_counter()
+    cursor = conn.execute(sql, params)
+    result = cursor.fetchall() if fetch == 'all' else cursor.fetchone()
+    elapsed = time.perf_counter() - start
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        log_slow_query(conn, method, sql, params, elapsed)
+    return result
+
+
+# Request profiling
+
+_active_profile: ContextVar[Optional['cProfile.Profile']] = ContextVar('workflow_profile', default=None)
+# The interpreter runs one profiler at a time
+_profile_lock = threading.Lock()
+
+
+def profile_authorized(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@contextmanager
+def profiling_request() -> Iterator[Optional['cProfile.Profile']]:
+    """Mark the current request as profiled; yields None when another profile is running."""
+    if not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    import cProfile
+    profile = cProfile.Profile()
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+        _profile_lock.release()
+
+
+@contextmanager
+def profiled_call() -> Iterator[None]:
+    """Profile the enclosed code when the current request is being profiled.
+
+    cProfile follows one thread: this wraps the handler call in the thread that
+    runs it. Work the handler hands to other threads is not included.
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        yield
+        return
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+
+
+def save_profile(profile: 'cProfile.Profile', label: str) -> Tuple[str, str]:
+    """Store the profile as a .prof file; returns (path, text report)."""
+    import pstats
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{name}.prof")
+    profile.dump_stats(path)
+    report = io.StringIO()
+    stats = pstats.Stats(profile, stream=report)
+    stats.sort_stats('cumulative').print_stats(PROFILE_REPORT_LINES)
+    return path, report.getvalue()
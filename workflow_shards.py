@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Sharded workflow index.
+
+Splits the index across N SQLite files partitioned by a hash of the workflow
+filename. Searches fan out to every shard on a thread pool (SQLite releases
+the GIL while it executes a query) and the per-shard pages are merged with a
+heap; counts and statistics are aggregated. Indexing writes the shards in
+parallel processes.
+
+Workflow ids are local to a shard file; the facade reports them as
+``local_id * shard_count + shard_index`` so they stay unique across shards.
+Per-workflow searches (facts, credential coverage, graph patterns) and the
+node type and fact catalogs are merged like searches. Duplicate clusters and
+sub-workflow dependencies relate workflows that may live in different shards;
+the facade does not provide them (see SINGLE_DATABASE_FEATURES) and a single
+database is needed for those.
+"""
+
+import contextvars
+import glob
+import hashlib
+import heapq
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from workflow_db import WorkflowDatabase
+
+
+def shard_count_from_env() -> int:
+    """Number of shards configured through WORKFLOW_DB_SHARDS (1 = unsharded)."""
+    return max(1, int(os.environ.get('WORKFLOW_DB_SHARDS', '1') or 1))
+
+
+def open_workflow_database(db_path: str = None, **kwargs):
+    """WorkflowDatabase, or ShardedWorkflowDatabase when WORKFLOW_DB_SHARDS > 1."""
+    shards = shard_count_from_env()
+    if shards > 1:
+        return ShardedWorkflowDatabase(db_path, shards=shards, **kwargs)
+    return WorkflowDatabase(db_path, **kwargs)
+
+
+def _index_shard(db_path: str, workflows_dir: str, files: List[str],
+                 force_reindex: bool, shadow: bool) -> Dict[str, Any]:
+    """Process pool entry point: index one shard's files."""
+    db = WorkflowDatabase(db_path, in_memory=False)
+    db.workflows_dir = workflows_dir
+    if shadow:
+        return db.rebuild_index(force_reindex=force_reindex, files=files)
+    return db.index_all_workflows(force_reindex=force_reindex, files=files)
+
+
+def _analyzed_at_key(workflow: Dict[str, Any]) -> float:
+    """Sort key equivalent to ORDER BY analyzed_at DESC."""
+    try:
+        return -datetime.fromisoformat(workflow.get('analyzed_at') or '').timestamp()
+    except ValueError:
+        return 0.0
+
+
+class ShardedWorkflowDatabase:
+    """WorkflowDatabase facade over N shard files partitioned by filename hash."""
+
+    # WorkflowDatabase methods that cannot be answered from per-shard results
+    SINGLE_DATABASE_FEATURES = ('get_duplicate_groups', 'get_workflow_dependencies')
+
+    # Python equivalents of WorkflowDatabase.SORT_OPTIONS, for merging shard pages
+    SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+        'recent': _analyzed_at_key,
+        'name': lambda w: w['name'] or '',
+        'nodes': lambda w: -(w['node_count'] or 0),
+        'depth': lambda w: -(w['graph_depth'] or 0),
+        'fan_out': lambda w: -(w['max_fan_out'] or 0),
+        'branches': lambda w: -(w['branch_count'] or 0),
+    }
+
+    def __init__(self, db_path: str = None, shards: int = None, in_memory: bool = None):
+        if db_path is None:
+            db_path = os.environ.get('WORKFLOW_DB_PATH', 'workflows.db')
+        if shards is None:
+            shards = shard_count_from_env()
+        self.db_path = db_path
+        self.shard_count = shards
+        self.workflows_dir = "workflows"
+        root, ext = os.path.splitext(db_path)
+        self.shard_paths = [f"{root}.shard{i:02d}-of-{shards:02d}{ext or '.db'}" for i in range(shards)]
+        self.shards = [WorkflowDatabase(path, in_memory=in_memory) for path in self.shard_paths]
+        self._pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='workflow-shard')
+
+    def shard_for(self, filename: str) -> int:
+        """Shard index of a workflow file; stable across processes and runs."""
+        digest = hashlib.md5(os.path.basename(filename).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % self.shard_count
+
+    def _scatter(self, method: str, *args, **kwargs) -> List[Any]:
+        """Call a WorkflowDatabase method on every shard concurrently."""
+        # Each shard runs in a copy of the caller's context so it inherits the request's query deadline
+        futures = [self._pool.submit(contextvars.copy_context().run, getattr(shard, method), *args, **kwargs)
+                   for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def global_id(self, shard_index: int, local_id: int) -> int:
+        """Workflow id unique across shards; ordered like local ids within a shard."""
+        return local_id * self.shard_count + shard_index
+
+    def _scatter_pages(self, method: str, *args, **kwargs) -> List[Tuple]:
+        """_scatter for methods returning (workflows, total, ...), with global workflow ids."""
+        pages = self._scatter(method, *args, **kwargs)
+        for shard_index, page in enumerate(pages):
+            for workflow in page[0]:
+                local_id = workflow['id']
+                workflow['id'] = self.global_id(shard_index, local_id)
+                if 'summary' in workflow:
+                    # Pre-serialized results start with their id (see WorkflowDatabase._serialized_row)
+                    prefix = '{"id":%d,' % local_id
+                    workflow['summary'] = '{"id":%d,' % workflow['id'] + workflow['summary'][len(prefix):]
+        return pages
+
+    @staticmethod
+    def _merge_pages(pages: List[Tuple], key: Callable[[Dict[str, Any]], Any],
+                     limit: int, offset: int) -> Tuple[List[Dict], int]:
+        """Merge per-shard sorted pages into one page with a k-way heap merge."""
+        total = sum(page[1] for page in pages)
+        merged = heapq.merge(*(page[0] for page in pages), key=key)
+        return list(itertools.islice(merged, offset, offset + limit)), total
+
+    # Indexing
+
+    def partition_files(self, files: List[str]) -> List[List[str]]:
+        partitions = [[] for _ in self.shards]
+        for file_path in files:
+            partitions[self.shard_for(file_path)].append(file_path)
+        return partitions
+
+    def _index_shards(self, force_reindex: bool, shadow: bool,
+                      progress: Optional[Callable[[Dict[str, int]], None]]) -> Dict[str, Any]:
+        files = glob.glob(os.path.join(self.workflows_dir, "*.json"))
+        partitions = self.partition_files(files)
+        jobs = [(path, part) for path, part in zip(self.shard_paths, partitions) if part]
+        stats = {'processed': 0, 'skipped': 0, 'errors': 0}
+        if not jobs:
+            return stats
+        # Imported here: only indexing needs process pools, serving does not
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+
+        # spawn: shard indexers must not inherit this process's threads and connections
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1),
+                                 mp_context=get_context('spawn')) as pool:
+            futures = [pool.submit(_index_shard, path, self.workflows_dir, part, force_reindex, shadow)
+                       for path, part in jobs]
+            for future in futures:
+                result = future.result()
+                for key in stats:
+                    stats[key] += result.get(key, 0)
+                if progress:
+                    progress(dict(stats, total=len(files)))
+        return stats
+
+    def index_all_workflows(self, force_reindex: bool = False,
+                            progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """Index every shard in place, one process per shard."""
+        return self._index_shards(force_reindex, shadow=False, progress=progress)
+
+    def rebuild_index(self, force_reindex: bool = False,
+                      progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+        """Shadow-build and swap every shard, one process per shard."""
+        return self._index_shards(force_reindex, shadow=True, progress=progress)
+
+    # Queries
+
+    def search_workflows(self, query: str = "", trigger_filter: str = "all",
+                         complexity_filter: str = "all", active_only: bool = False,
+                         limit: int = 50, offset: int = 0,
+                         collapse_duplicates: bool = False, sort: str = "",
+                         metric_ranges: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                         serialized: bool = False, columns: Optional[Sequence[str]] = None
+                         ) -> Tuple[List[Dict], int]:
+        """Fan-out search merged in the same order as WorkflowDatabase.search_workflows.
+
+        Text queries are merged on each shard's bm25 rank. Shards hold random
+        samples of the corpus, so their term statistics (and ranks) are close.
+        """
+        if sort and sort not in self.SORT_KEYS:
+            raise ValueError(f"Unknown sort option: {sort}")
+        pages = self._scatter_pages(
+            'search_workflows', query, trigger_filter, complexity_filter, active_only,
+            limit=offset + limit, offset=0, collapse_duplicates=collapse_duplicates,
+            sort=sort, metric_ranges=metric_ranges, serialized=serialized, columns=columns
+        )
+        if sort:
+            order = self.SORT_KEYS[sort]
+            key = lambda w: (order(w), w['rank'])
+        elif query.strip():
+            key = lambda w: w['rank']
+        else:
+            key = _analyzed_at_key
+        return self._merge_pages(pages, key, limit, offset)
+
+    def search_node_content(self, query: str, trigger_filter: str = "all",
+                            complexity_filter: str = "all", active_only: bool = False,
+                            limit: int = 50, offset: int = 0,
+                            max_matches: int = 5, serialized: bool = False,
+                            columns: Optional[Sequence[str]] = None) -> Tuple[List[Dict], int]:
+        pages = self._scatter_pages('search_node_content', query, trigger_filter, complexity_filter,
+                                    active_only, limit=offset + limit, offset=0, max_matches=max_matches,
+                                    serialized=serialized, columns=columns)
+        return self._merge_pages(pages, lambda w: w['rank'], limit, offset)
+
+    def search_by_category(self, category: str, limit: int = 50, offset: int = 0,
+                           serialized: bool = False, columns: Optional[Sequence[str]] = None
+                           ) -> Tuple[List[Dict], int]:
+        pages = self._scatter_pages('search_by_category', category, limit=offset + limit, offset=0,
+                                    serialized=serialized, columns=columns)
+        return self._merge_pages(pages, _analyzed_at_key, limit, offset)
+
+    def search_by_fact(self, key: str, value: str, limit: int = 50,
+                       offset: int = 0) -> Tuple[List[Dict], int]:
+        pages = self._scatter_pages('search_by_fact', key, value, limit=offset + limit, offset=0)
+        return self._merge_pages(pages, lambda w: w['filename'], limit, offset)
+
+    def search_by_credentials(self, credentials: List[str], integrations: Optional[List[str]] = None,
+                              include_no_credentials: bool = False, limit: int = 50,
+                              offset: int = 0) -> Tuple[List[Dict], int, List[str]]:
+        """Merged in id order; a credential is unknown when no shard has seen it."""
+        pages = self._scatter_pages('search_by_credentials', credentials, integrations=integrations,
+                                    include_no_credentials=include_no_credentials,
+                                    limit=offset + limit, offset=0)
+        results, total = self._merge_pages(pages, lambda w: w['id'], limit, offset)
+        unknown = [name for name in credentials if all(name in page[2] for page in pages)]
+        return results, total, unknown
+
+    def search_graph_pattern(self, pattern: str, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        pages = self._scatter_pages('search_graph_pattern', pattern, limit=offset + limit, offset=0)
+        return self._merge_pages(pages, lambda w: w['filename'], limit, offset)
+
+    # Catalogs: every shard's full list (LIMIT -1), summed and paginated here
+
+    def get_fact_values(self, key: str, prefix: str = "", limit: int = 50,
+                        offset: int = 0) -> Tuple[List[Dict], int]:
+        counts: Dict[str, int] = {}
+        for values, _ in self._scatter('get_fact_values', key, prefix=prefix, limit=-1, offset=0):
+            for row in values:
+                counts[row['value']] = counts.get(row['value'], 0) + row['workflows']
+        ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return ([{'value': value, 'workflows': workflows} for value, workflows in ordered[offset:offset + limit]],
+                len(ordered))
+
+    def _node_type_catalog(self, prefix: str = "") -> List[Dict[str, Any]]:
+        """Merged node type catalog, most used first."""
+        catalog: Dict[str, Dict[str, Any]] = {}
+        for entries, _ in self._scatter('get_node_type_catalog', prefix=prefix, limit=-1, offset=0):
+            for entry in entries:
+                merged = catalog.setdefault(entry['node_type'], {'node_type': entry['node_type'], 'workflows': 0,
+                                                                 'nodes': 0, 'versions': {}})
+                merged['workflows'] += entry['workflows']
+                merged['nodes'] += entry['nodes']
+                for version in entry['versions']:
+                    counts = merged['versions'].setdefault(version['type_version'], {
+                        'type_version': version['type_version'], 'workflows': 0, 'nodes': 0})
+                    counts['workflows'] += version['workflows']
+                    counts['nodes'] += version['nodes']
+        for entry in catalog.values():
+            entry['versions'] = sorted(entry['versions'].values(),
+                                       key=lambda version: (-version['workflows'], version['type_version']))
+        return sorted(catalog.values(), key=lambda entry: (-entry['workflows'], entry['node_type']))
+
+    def get_node_type_catalog(self, prefix: str = "", limit: int = 50,
+                              offset: int = 0) -> Tuple[List[Dict], int]:
+        catalog = self._node_type_catalog(prefix)
+        return catalog[offset:offset + limit], len(catalog)
+
+    def get_cooccurring_node_types(self, node_type: str, limit: int = 20) -> Dict[str, Any]:
+        """Shared workflow counts summed over shards; Jaccard indexes from the merged totals."""
+        own_workflows = 0
+        shared: Dict[str, int] = {}
+        for result in self._scatter('get_cooccurring_node_types', node_type, limit=-1):
+            own_workflows += result['workflows']
+            for entry in result['cooccurring']:
+                shared[entry['node_type']] = shared.get(entry['node_type'], 0) + entry['workflows']
+        if not own_workflows:
+            return {'node_type': node_type, 'workflows': 0, 'cooccurring': []}
+        totals = {entry['node_type']: entry['workflows'] for entry in self._node_type_catalog()}
+        ordered = sorted(shared.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return {'node_type': node_type, 'workflows': own_workflows, 'cooccurring': [{
+            'node_type': other,
+            'workflows': workflows,
+            'jaccard': round(workflows / (own_workflows + totals[other] - workflows), 4)
+        } for other, workflows in ordered]}
+
+    def get_workflow_variants(self, filename: str) -> Optional[Dict[str, Optional[bytes]]]:
+        return self.shards[self.shard_for(filename)].get_workflow_variants(filename)
+
+    def get_service_categories(self) -> Dict[str, List[str]]:
+        return self.shards[0].get_service_categories()
+
+    def get_integration_counts(self) -> List[Dict[str, Any]]:
+        counts: Dict[str, int] = {}
+        for shard_counts in self._scatter('get_integration_counts'):
+            for row in shard_counts:
+                counts[row['name']] = counts.get(row['name'], 0) + row['workflows']
+        return [{'name': name, 'workflows': workflows}
+                for name, workflows in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistics summed over shards; unique integrations are counted once."""
+        shard_stats = self._scatter('get_stats')
+        stats = {'total': 0, 'active': 0, 'inactive': 0, 'total_nodes': 0,
+                 'triggers': {}, 'complexity': {}}
+        for shard in shard_stats:
+            for key in ('total', 'active', 'inactive', 'total_nodes'):
+                stats[key] += shard[key]
+            for key in ('triggers', 'complexity'):
+                for name, count in shard[key].items():
+                    stats[key][name] = stats[key].get(name, 0) + count
+        stats['unique_integrations'] = len(self.get_integration_counts())
+        stats['last_indexed'] = max(shard['last_indexed'] for shard in shard_stats)
+        return stats
+
+    def get_index_generation(self) -> int:
+        return sum(self._scatter('get_index_generation'))
+
+    def has_workflows(self) -> bool:
+        return any(self._scatter('has_workflows'))
+
+    def __getattr__(self, name: str):
+        # Class constants (SORT_OPTIONS, FACT_KEYS...) are shared with WorkflowDatabase;
+        # methods not defined above are not available on a sharded index
+        if name.isupper() and hasattr(WorkflowDatabase, name):
+            return getattr(WorkflowDatabase, name)
+        raise AttributeError(f"{name} is not available on a sharded index")
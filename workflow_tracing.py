@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Lightweight request tracing.
+
+A request that is traced carries a Trace in a context variable; span()
+records nested, timed stages into it from any layer (handler, SQLite,
+JSON decoding, Pydantic). Context variables follow the request into the
+thread pool, so spans opened in sync handlers and shard fan-out nest under
+the request. Outside a traced request span() does nothing.
+
+Sampled traces are written as Zipkin v2 JSON (one trace per line, a list of
+spans that can be POSTed to /api/v2/spans as-is) to a rotating file by a
+background thread. Every traced request can also report its stages in a
+Server-Timing header.
+
+Configuration (environment):
+    WORKFLOW_TRACE_FILE        trace file; unset disables exporting
+    WORKFLOW_TRACE_SAMPLE      fraction of requests exported (default 0.01);
+                               a W3C traceparent header with the sampled flag
+                               always is
+    WORKFLOW_TRACE_MAX_BYTES   rotation size (default 10 MB), 5 backups kept
+    WORKFLOW_SERVER_TIMING     Server-Timing header on every request (default 1)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TRACE_FILE = os.environ.get('WORKFLOW_TRACE_FILE') or None
+TRACE_SAMPLE = float(os.environ.get('WORKFLOW_TRACE_SAMPLE', '0.01'))
+TRACE_MAX_BYTES = int(os.environ.get('WORKFLOW_TRACE_MAX_BYTES', str(10 * 1024 * 1024)))
+SERVER_TIMING = os.environ.get('WORKFLOW_SERVER_TIMING', '1').lower() in ('1', 'true', 'yes')
+SERVICE_NAME = 'n8n-workflows-api'
+
+TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Trace:
+    """Spans of one request: (name, span_id, parent_id, start_us, duration_s, tags)."""
+
+    __slots__ = ('trace_id', 'parent_id', 'sampled', 'spans')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.spans: List[Tuple[str, str, Optional[str], int, float, Dict[str, Any]]] = []
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('workflow_trace', default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar('workflow_span', default=None)
+
+
+def _new_id(bits: int = 64) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+@contextmanager
+def span(name: str, **tags: Any) -> Iterator[None]:
+    """Record the enclosed block as a span of the current request's trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    span_id = _new_id()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start_us = time.time_ns() // 1000
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        # list.append is atomic: spans from pool threads land safely
+        trace.spans.append((name, span_id, parent_id, start_us, time.perf_counter() - start, tags))
+
+
+def start_trace(traceparent: Optional[str] = None) -> Optional[Trace]:
+    """Begin tracing the current request, or return None when it is not traced.
+
+    An incoming W3C traceparent joins its trace and sets sampling by its flag.
+    """
+    trace_id, parent_id, sampled = None, None, None
+    match = TRACEPARENT.match(traceparent or '')
+    if match:
+        trace_id, parent_id = match.group(1), match.group(2)
+        sampled = bool(int(match.group(3), 16) & 1)
+    if sampled is None:
+        sampled = TRACE_SAMPLE > 0 and random.random() < TRACE_SAMPLE
+    sampled = sampled and TRACE_FILE is not None
+    if not (sampled or SERVER_TIMING):
+        return None
+    trace = Trace(trace_id or _new_id(128), parent_id, sampled)
+    _current_trace.set(trace)
+    return trace
+
+
+def server_timing(trace: Trace) -> str:
+    """Server-Timing header value: total duration per span name, in first-seen order."""
+    totals: Dict[str, List[float]] = {}
+    for name, _, _, _, duration, _ in sorted(trace.spans, key=lambda s: s[3]):
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += duration
+        entry[1] += 1
+    metrics = []
+    for name, (duration, count) in totals.items():
+        metric = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={duration * 1000:.2f}"
+        if count > 1:
+            metric += f';desc="x{count}"'
+        metrics.append(metric)
+    return ', '.join(metrics)
+
+
+def zipkin_spans(trace: Trace) -> List[Dict[str, Any]]:
+    """Spans of a trace in the Zipkin v2 JSON model."""
+    spans = []
+    for name, span_id, parent_id, start_us, duration, tags in trace.spans:
+        record = {
+            'traceId': trace.trace_id,
+            'id': span_id,
+            'name': name,
+            'timestamp': start_us,
+            'duration': max(1, round(duration * 1_000_000)),
+            'localEndpoint': {'serviceName': SERVICE_NAME},
+            'tags': {key: str(value) for key, value in tags.items()},
+        }
+        if parent_id or trace.parent_id:
+            record['parentId'] = parent_id or trace.parent_id
+        if parent_id is None:
+            record['kind'] = 'SERVER'
+        spans.append(record)
+    return spans
+
+
+_exporter: Optional[logging.Logger] = None
+
+
+def _get_exporter() -> logging.Logger:
+    """Logger writing to the rotating trace file through a background thread."""
+    global _exporter
+    if _exporter is None:
+        directory = os.path.dirname(os.path.abspath(TRACE_FILE))
+        os.makedirs(directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=5, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        records: queue.Queue = queue.Queue()
+        listener = logging.handlers.QueueListener(records, handler)
+        listener.start()
+        atexit.register(listener.stop)  # flush queued traces on shutdown
+        logger = logging.getLogger('workflow_tracing.export')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        _exporter = logger
+    return _exporter
+
+
+def finish_trace(trace: Trace):
+    """Export a sampled trace; the request path only enqueues the line."""
+    if trace.sampled and trace.spans:
+        _get_exporter().info(json.dumps(zipkin_spans(trace), separators=(',', ':')))